@@ -16,6 +16,7 @@ class Afiliador:
     def __init__(self):
         self.registro_clientes = []
         self.registro_taxis = []
+        self.version = 0  # se incrementa con cada cambio de los registros
 
     def cargar_base_datos(self):
         """
@@ -24,6 +25,7 @@ class Afiliador:
         DATA_DIR.mkdir(exist_ok=True)
         self.registro_clientes = self._load_or_gen("clientes.json", self._generar_clientes_fake, 40)
         self.registro_taxis = self._load_or_gen("taxis.json", self._generar_taxis_fake, 30)
+        self.version += 1
 
     def _load_or_gen(self, fname, gen_fn, n):
         """
@@ -103,6 +105,7 @@ class Afiliador:
         motivo = "" if admitido else ("Tarjeta inválida" if not ok_tarjeta else "Identidad no verificada")
         rec = {"id": datos_cliente.get("id"), "nombre": nombre, "tarjeta": tarjeta, "estado": "admitido" if admitido else "rechazado", "motivo": motivo}
         self.registro_clientes.append(rec)
+        self.version += 1
         self._persist("clientes.json", self.registro_clientes)
         return rec
 
@@ -132,6 +135,7 @@ class Afiliador:
             "motivo": ", ".join(motivos) if not admitido else ""
         }
         self.registro_taxis.append(rec)
+        self.version += 1
         self._persist("taxis.json", self.registro_taxis)
         return rec
 
@@ -0,0 +1,327 @@
+# almacen_analitico.py
+"""
+Almacén analítico de viajes finalizados (data/analitica/):
+- Un archivo por campo (viaje, taxi, cliente, instante de fin, costo, calificación, coordenadas
+  y distancia) con valores de 8 bytes en little-endian, solo anexado. Cada viaje finalizado se
+  acumula en un búfer O(1) que se vuelca en bloque (por tamaño, por antigüedad o al consultar).
+- Las consultas mapean los archivos sin crear objetos Python por fila: numpy.memmap si NumPy
+  está instalado (es opcional; se importa en la primera consulta, no al arrancar) y mmap +
+  memoryview si no.
+- API de consulta: filtros (campo, operador, valor) con ==, !=, <, <=, >, >= y "entre" [a, b);
+  agrupar(por, valor, agregacion) con cuenta, suma, media, min y max; contar() e histograma().
+  Con NumPy se evalúan vectorizadas por bloques de filas, así la memoria queda acotada aunque
+  haya decenas de millones de viajes.
+- Las calificaciones ausentes se guardan como NaN y no cuentan en agregaciones sobre ese campo.
+- Importación del histórico existente:
+    python -m almacen_analitico importar data/viajes.json   (o data/viajes.bin)
+"""
+
+import argparse
+import functools
+import math
+import mmap
+import operator
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+
+DIRECTORIO = Path("data") / "analitica"
+CAMPOS = {
+    "viaje_id": "q", "taxi_id": "q", "cliente_id": "q",
+    "fin_ts": "d", "costo": "d", "calificacion": "d",
+    "origen_x": "d", "origen_y": "d", "destino_x": "d", "destino_y": "d", "distancia": "d",
+}
+DTYPES = {"q": "<i8", "d": "<f8"}
+ANCHO = 8
+BLOQUE = 1 << 22  # filas por bloque en las consultas vectorizadas
+OPERADORES = {
+    "==": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge,
+    "entre": lambda c, v: (c >= v[0]) & (c < v[1]),
+}
+AGREGACIONES = ("cuenta", "suma", "media", "min", "max")
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """NumPy importado en el primer uso (None si no está instalado): importar el módulo no lo carga."""
+    try:
+        import numpy
+    except ImportError:  # NumPy es opcional
+        return None
+    return numpy
+
+
+def _fila(viaje):
+    """Valores de un viaje finalizado (dict o VistaViaje) en el orden de CAMPOS."""
+    (ox, oy), (dx, dy) = viaje["origen"], viaje["destino"]
+    calificacion = viaje.get("calificacion_cliente")
+    return (viaje.get("id") or 0, viaje["taxi_id"], viaje["cliente_id"],
+            viaje.get("fin_ts") or time.time(), viaje["costo_estimado"],
+            math.nan if calificacion is None else calificacion,
+            ox, oy, dx, dy, math.hypot(ox - dx, oy - dy))
+
+
+class AlmacenAnalitico:
+    def __init__(self, directorio=DIRECTORIO, lote=256, intervalo=5.0, reloj=time.monotonic):
+        self.directorio = Path(directorio)
+        self.lote = lote            # filas en búfer antes de volcar
+        self.intervalo = intervalo  # segundos máximos de una fila en el búfer
+        self.reloj = reloj
+        self._bufer = {c: array(t) for c, t in CAMPOS.items()}
+        self._desde = None
+        self._lock = threading.Lock()
+        self._filas = self._reparar()
+
+    def _ruta(self, campo):
+        return self.directorio / f"{campo}.bin"
+
+    def _reparar(self):
+        """Filas completas en disco; recorta archivos más largos que el resto (volcado interrumpido)."""
+        if not self.directorio.exists():
+            return 0
+        tamanos = {c: (self._ruta(c).stat().st_size if self._ruta(c).exists() else 0) for c in CAMPOS}
+        filas = min(tamanos.values()) // ANCHO
+        for c, tam in tamanos.items():
+            if tam != filas * ANCHO:
+                os.truncate(self._ruta(c), filas * ANCHO)
+        return filas
+
+    def __len__(self):
+        with self._lock:
+            return self._filas + len(self._bufer["viaje_id"])
+
+    # ---------------------------
+    # Escritura
+    # ---------------------------
+    def anexar(self, viaje):
+        """Agrega un viaje finalizado al búfer; vuelca si está lleno o lleva más de 'intervalo' s."""
+        self.anexar_filas([_fila(viaje)])
+
+    def anexar_filas(self, filas):
+        with self._lock:
+            for fila in filas:
+                for col, valor in zip(self._bufer.values(), fila):
+                    col.append(valor)
+            if not self._bufer["viaje_id"]:
+                return
+            if self._desde is None:
+                self._desde = self.reloj()
+            if len(self._bufer["viaje_id"]) >= self.lote or self.reloj() - self._desde >= self.intervalo:
+                self._volcar()
+
+    def importar(self, almacen):
+        """Anexa los viajes finalizados de un almacen_viajes.ColumnasViajes; devuelve cuántos."""
+        indices = almacen.indices_finalizados()
+        self.anexar_filas(_fila(almacen[i]) for i in indices)
+        self.volcar()
+        return len(indices)
+
+    def volcar(self):
+        with self._lock:
+            self._volcar()
+
+    def _volcar(self):
+        n = len(self._bufer["viaje_id"])
+        if not n:
+            return
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        for campo, col in self._bufer.items():
+            if sys.byteorder == "big":
+                col.byteswap()
+            with open(self._ruta(campo), "ab") as f:
+                f.write(col)
+        self._filas += n
+        self._bufer = {c: array(t) for c, t in CAMPOS.items()}
+        self._desde = None
+
+    # ---------------------------
+    # Lectura
+    # ---------------------------
+    def columnas(self):
+        """Vuelca el búfer y mapea todas las columnas: campo -> numpy.memmap o memoryview."""
+        with self._lock:
+            self._volcar()
+            n = self._filas
+        np = _numpy()
+        if n == 0:
+            return {c: (np.empty(0, DTYPES[t]) if np is not None else array(t)) for c, t in CAMPOS.items()}
+        res = {}
+        for campo, tipo in CAMPOS.items():
+            if np is not None:
+                res[campo] = np.memmap(self._ruta(campo), dtype=DTYPES[tipo], mode="r", shape=(n,))
+                continue
+            with open(self._ruta(campo), "rb") as f:
+                mm = mmap.mmap(f.fileno(), n * ANCHO, access=mmap.ACCESS_READ)
+            col = memoryview(mm).cast(tipo)
+            if sys.byteorder == "big":
+                col = array(tipo, col.tobytes())
+                col.byteswap()
+            res[campo] = col
+        return res
+
+    @staticmethod
+    def _validar(filtros, *campos):
+        for campo, op, _ in filtros:
+            if campo not in CAMPOS or op not in OPERADORES:
+                raise ValueError(f"Filtro no soportado: {campo} {op}")
+        for campo in campos:
+            if campo is not None and campo not in CAMPOS:
+                raise ValueError(f"Campo desconocido: {campo}")
+
+    def contar(self, filtros=()):
+        """Número de viajes que cumplen los filtros."""
+        self._validar(filtros)
+        cols = self.columnas()
+        if _numpy() is not None:
+            return int(sum(len(k) for k, in _bloques(cols, filtros, "viaje_id")))
+        return sum(1 for _ in _filas_filtradas(cols, filtros))
+
+    def agrupar(self, por, valor=None, agregacion="cuenta", filtros=()):
+        """
+        Agregación por grupo: {clave de 'por': resultado}. 'valor' es el campo agregado (no hace
+        falta para "cuenta"); las filas con NaN en 'por' o en 'valor' se ignoran.
+        """
+        if agregacion not in AGREGACIONES:
+            raise ValueError(f"Agregación no soportada: {agregacion}")
+        if valor is None and agregacion != "cuenta":
+            raise ValueError(f"La agregación {agregacion} necesita un campo 'valor'")
+        self._validar(filtros, por, valor)
+        cols = self.columnas()
+        if _numpy() is not None:
+            return _agrupar_np(cols, por, valor or por, agregacion, filtros)
+
+        acumulado = {}  # clave -> [cuenta, acumulador]
+        for clave, v in _filas_filtradas(cols, filtros, por, valor or por):
+            if clave != clave or v != v:  # NaN
+                continue
+            a = acumulado.get(clave)
+            if a is None:
+                acumulado[clave] = [1, v]
+            elif agregacion == "min":
+                a[0] += 1
+                a[1] = min(a[1], v)
+            elif agregacion == "max":
+                a[0] += 1
+                a[1] = max(a[1], v)
+            else:
+                a[0] += 1
+                a[1] += v
+        return {k: _resultado(agregacion, cuenta, acc) for k, (cuenta, acc) in acumulado.items()}
+
+    def histograma(self, campo, limites, filtros=()):
+        """
+        Cuentas por intervalo [limites[i], limites[i+1]); el último incluye su límite superior
+        (misma convención que numpy.histogram). Los valores fuera de rango no cuentan.
+        """
+        self._validar(filtros, campo)
+        limites = list(limites)
+        cols = self.columnas()
+        np = _numpy()
+        if np is not None:
+            total = np.zeros(len(limites) - 1, dtype=np.int64)
+            for v, in _bloques(cols, filtros, campo):
+                total += np.histogram(v, bins=limites)[0]
+            return total.tolist()
+        cuentas = [0] * (len(limites) - 1)
+        for v, in _filas_filtradas(cols, filtros, campo):
+            if v != v or v < limites[0] or v > limites[-1]:
+                continue
+            cuentas[min(bisect_right(limites, v) - 1, len(cuentas) - 1)] += 1
+        return cuentas
+
+
+def _filas_filtradas(cols, filtros, *campos):
+    """Camino sin NumPy: itera las filas que cumplen los filtros devolviendo los 'campos'."""
+    conds = [(cols[c], OPERADORES[op], v) for c, op, v in filtros]
+    seleccion = [cols[c] for c in campos]
+    for i in range(len(cols["viaje_id"])):
+        if all(f(col[i], v) for col, f, v in conds):
+            yield tuple(col[i] for col in seleccion)
+
+
+def _bloques(cols, filtros, *campos):
+    """Camino NumPy: por bloque de filas, los 'campos' ya filtrados (NaN excluidos)."""
+    np = _numpy()
+    n = len(cols["viaje_id"])
+    for ini in range(0, n, BLOQUE):
+        tramo = slice(ini, min(n, ini + BLOQUE))
+        mascara = np.ones(tramo.stop - tramo.start, dtype=bool)
+        for c, op, v in filtros:
+            mascara &= OPERADORES[op](cols[c][tramo], v)
+        valores = [np.asarray(cols[c][tramo]) for c in campos]
+        for v in valores:
+            if v.dtype.kind == "f":
+                mascara &= ~np.isnan(v)
+        yield [v[mascara] for v in valores]
+
+
+def _agrupar_np(cols, por, valor, agregacion, filtros):
+    """
+    Agrupa por bloques y combina los parciales con la misma reducción: por índice directo sobre claves
+    enteras densas (bincount, ufunc.at), ordenación + reduceat en el resto.
+    """
+    np = _numpy()
+    reductor = {"min": np.minimum, "max": np.maximum}.get(agregacion, np.add)
+
+    def reducir(claves, cuentas, acumulados):
+        if claves.dtype.kind == "i":
+            base, tope = int(claves.min()), int(claves.max())
+            if tope - base <= 4 * len(claves) + 65536:  # claves densas (taxis, clientes): sin ordenar
+                k = claves - base
+                cuentas = np.bincount(k, weights=cuentas, minlength=tope - base + 1)
+                presentes = np.flatnonzero(cuentas)
+                if reductor is np.add:
+                    resultado = np.bincount(k, weights=acumulados, minlength=tope - base + 1)
+                else:
+                    resultado = np.full(tope - base + 1, np.inf if reductor is np.minimum else -np.inf)
+                    reductor.at(resultado, k, acumulados)
+                return presentes + base, cuentas[presentes].astype(np.int64), resultado[presentes]
+        orden = np.argsort(claves, kind="stable")
+        claves = claves[orden]
+        inicios = np.flatnonzero(np.concatenate(([True], claves[1:] != claves[:-1])))
+        return (claves[inicios], np.add.reduceat(cuentas[orden], inicios),
+                reductor.reduceat(acumulados[orden], inicios))
+
+    parciales = [reducir(k, np.ones(len(k), dtype=np.int64), v.astype(np.float64))
+                 for k, v in _bloques(cols, filtros, por, valor) if len(k)]
+    if not parciales:
+        return {}
+    claves, cuentas, acumulados = (parciales[0] if len(parciales) == 1 else
+                                   reducir(*(np.concatenate(p) for p in zip(*parciales))))
+    return {k: _resultado(agregacion, c, a)
+            for k, c, a in zip(claves.tolist(), cuentas.tolist(), acumulados.tolist())}
+
+
+def _resultado(agregacion, cuenta, acumulado):
+    if agregacion == "cuenta":
+        return int(cuenta)
+    if agregacion == "media":
+        return acumulado / cuenta
+    return acumulado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Almacén analítico de viajes finalizados")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_imp = sub.add_parser("importar", help="Anexa los viajes finalizados de data/viajes.json o data/viajes.bin")
+    p_imp.add_argument("origen")
+    p_imp.add_argument("--directorio", default=str(DIRECTORIO))
+    args = parser.parse_args(argv)
+
+    if args.origen.endswith(".bin"):
+        import formato_binario
+        almacen = formato_binario.abrir(args.origen)
+    else:
+        from almacen_viajes import leer_json
+        almacen = leer_json(args.origen)
+    n = AlmacenAnalitico(args.directorio).importar(almacen)
+    print(f"{n} viajes finalizados importados en {args.directorio}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
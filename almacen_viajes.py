@@ -0,0 +1,630 @@
+# almacen_viajes.py
+"""
+Almacén columnar de viajes de UNIETAXI:
+- Un array.array tipado por campo (ids enteros, reales, coordenadas, estado y banderas en un
+  byte) y las placas/conductores internados en una tabla de textos: ~140 bytes por viaje frente
+  a ~1 KB de un dict con tuplas y floats sueltos.
+- Se usa como una lista de dicts: len, índice, iteración, append/extend. Cada elemento es una
+  VistaViaje (MutableMapping) que lee y escribe directamente en las columnas, así los
+  llamadores existentes (viaje["progreso"] = ..., v.get("estado"), dict(v)) no cambian.
+- Las claves no reconocidas se guardan aparte por fila (extras) y se conservan.
+- dicts() materializa las filas como dicts (claves en el orden del sistema); escribir_json()
+  exporta a la lista JSON indentada codificando columna a columna, sin construir dicts.
+- ArchivoViajesJSON mantiene ese archivo al día reescribiendo solo desde la primera fila que
+  pudo cambiar (el histórico restaurado y los viajes cerrados no se vuelven a codificar). Tras
+  restaurar un checkpoint retoma el archivo de la ejecución anterior en vez de reescribirlo.
+- Las auditorías de filas ya escritas no reescriben el archivo: leer_json() las aplica desde
+  data/auditorias.jsonl al cargarlo.
+- Es también el formato de los viajes del checkpoint binario (checkpoint.py).
+"""
+
+import json
+import zlib
+from array import array
+from json.encoder import encode_basestring as _codificar_texto
+from collections.abc import MutableMapping
+from pathlib import Path
+
+NAN = float("nan")
+INF = float("inf")
+_NO_FINITOS = frozenset(("nan", "inf", "-inf"))  # repr() de los floats que JSON escribe distinto
+ESTADOS = ("activo", "finalizado", "interrumpido")
+CAMPOS_ENTEROS = ("id", "cliente_id", "taxi_id")
+CAMPOS_REALES = ("inicio_ts", "fin_ts", "costo_estimado", "calificacion_cliente", "eta_pickup", "progreso", "taxi_calificacion",
+                 "duracion_estimada")
+CAMPOS_OPCIONALES = ("fin_ts", "duracion_estimada")  # NaN = la clave no existe
+CAMPOS_TEXTO = ("placa_taxi", "conductor")
+BANDERAS = {"seguimiento_auditoria": "auditado", "compartido": "compartido", "encadenado": "encadenado"}
+COORDENADAS = {"origen": ("origen_x", "origen_y"), "destino": ("destino_x", "destino_y")}
+CAMPOS_CONOCIDOS = set(CAMPOS_ENTEROS + CAMPOS_REALES + CAMPOS_TEXTO) | set(BANDERAS) | set(COORDENADAS) | {"estado"}
+# Orden en que el sistema agrega las claves (alta, modo, fin, auditoría): el de data/viajes.json
+ORDEN_CLAVES = ("id", "cliente_id", "taxi_id", "origen", "destino", "estado", "inicio_ts", "costo_estimado",
+                "duracion_estimada", "calificacion_cliente", "placa_taxi", "conductor", "eta_pickup", "progreso",
+                "taxi_calificacion", "compartido", "encadenado", "fin_ts", "seguimiento_auditoria")
+FILAS_POR_BLOQUE = 4096  # escribir_json codifica por bloques de filas para acotar la memoria
+BYTES_MARCA = 4096       # bytes que identifican un viajes.json al restaurar (ArchivoViajesJSON.marca)
+
+
+class VistaViaje(MutableMapping):
+    """Vista dict de una fila del almacén; no copia datos."""
+    __slots__ = ("_almacen", "_i")
+
+    def __init__(self, almacen, i):
+        self._almacen = almacen
+        self._i = i
+
+    def __getitem__(self, clave):
+        return self._almacen.leer(self._i, clave)
+
+    def __setitem__(self, clave, valor):
+        self._almacen.escribir(self._i, clave, valor)
+
+    def __delitem__(self, clave):
+        self._almacen.borrar(self._i, clave)
+
+    def __iter__(self):
+        return iter(self._almacen.claves(self._i))
+
+    def __len__(self):
+        return len(self._almacen.claves(self._i))
+
+    @property
+    def almacen(self):
+        return self._almacen
+
+    @property
+    def indice(self):
+        return self._i
+
+    def a_dict(self):
+        return self._almacen.viaje(self._i)
+
+    def __repr__(self):
+        return f"VistaViaje({self.a_dict()!r})"
+
+
+class ColumnasViajes:
+    """
+    Viajes codificados por columnas (un array.array por campo, strings internados).
+    Se materializan como dicts solo al pedirlo, así millones de viajes no construyen millones
+    de objetos Python.
+    """
+
+    def __init__(self):
+        self.columnas = {c: array("q") for c in CAMPOS_ENTEROS}
+        self.columnas.update({c: array("d") for c in CAMPOS_REALES})
+        for x, y in COORDENADAS.values():
+            self.columnas[x] = array("d")
+            self.columnas[y] = array("d")
+        self.columnas["estado"] = array("b")
+        for c in BANDERAS.values():
+            self.columnas[c] = array("b")
+        for c in CAMPOS_TEXTO:
+            self.columnas[c] = array("l")
+        self.textos = []
+        self._indice_textos = {}
+        self.extras = {}  # posición -> claves no reconocidas
+
+    def __len__(self):
+        return len(self.columnas["id"])
+
+    def __getstate__(self):
+        return {"columnas": self.columnas, "textos": self.textos, "extras": self.extras}
+
+    def __setstate__(self, estado):
+        self.columnas = estado["columnas"]
+        self.textos = estado["textos"]
+        self.extras = estado["extras"]
+        n = len(self.columnas["id"])
+        for c in CAMPOS_REALES:  # checkpoints anteriores a columnas nuevas
+            if c not in self.columnas:
+                self.columnas[c] = array("d", [NAN]) * n
+        for c in BANDERAS.values():
+            if c not in self.columnas:
+                self.columnas[c] = array("b", bytes(n))
+        self._indice_textos = {s: i for i, s in enumerate(self.textos)}
+
+    def _texto(self, s):
+        k = self._indice_textos.get(s)
+        if k is None:
+            k = self._indice_textos[s] = len(self.textos)
+            self.textos.append(s)
+        return k
+
+    # ---------------------------
+    # Uso como lista de viajes
+    # ---------------------------
+    def __getitem__(self, i):
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("viaje fuera de rango")
+        return VistaViaje(self, i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield VistaViaje(self, i)
+
+    def append(self, v):
+        self.agregar(v)
+
+    def extend(self, viajes):
+        if isinstance(viajes, ColumnasViajes):
+            self.extender(viajes)
+            return
+        for v in viajes:
+            self.agregar(v)
+
+    def agregar(self, v):
+        """Codifica y agrega un viaje (dict); devuelve su vista."""
+        cols = self.columnas
+        pos = len(self)
+        for c in CAMPOS_ENTEROS:
+            val = v.get(c)
+            cols[c].append(-1 if val is None else int(val))
+        for c in CAMPOS_REALES:
+            val = v.get(c)
+            cols[c].append(NAN if val is None else float(val))
+        for clave, (x, y) in COORDENADAS.items():
+            px, py = v[clave]
+            cols[x].append(px)
+            cols[y].append(py)
+        estado = v.get("estado", "activo")
+        cols["estado"].append(ESTADOS.index(estado) if estado in ESTADOS else 0)
+        for clave, c in BANDERAS.items():
+            cols[c].append(1 if v.get(clave) else 0)
+        for c in CAMPOS_TEXTO:
+            cols[c].append(self._texto(v.get(c) or ""))
+        otros = {k: val for k, val in v.items() if k not in CAMPOS_CONOCIDOS}
+        if otros:
+            self.extras[pos] = otros
+        return VistaViaje(self, pos)
+
+    def extender(self, otro):
+        """Agrega al final todas las filas de otro ColumnasViajes (copia de arrays, sin dicts)."""
+        base = len(self)
+        remapeo = [self._texto(s) for s in otro.textos]
+        identidad = remapeo == list(range(len(remapeo)))
+        for c, col in otro.columnas.items():
+            if c in CAMPOS_TEXTO and not identidad:
+                self.columnas[c].extend(remapeo[k] for k in col)
+            elif isinstance(col, memoryview) and col.itemsize == self.columnas[c].itemsize:
+                self.columnas[c].frombytes(col.cast("B"))  # columna mapeada de un archivo (formato_binario)
+            else:
+                self.columnas[c].extend(col)
+        for pos, otros in otro.extras.items():
+            self.extras[base + pos] = dict(otros)
+
+    def copiar(self):
+        nuevo = ColumnasViajes()
+        nuevo.extender(self)
+        return nuevo
+
+    def tramo(self, desde, hasta=None):
+        """
+        Copia de las filas [desde, hasta) para leerla sin lock (p. ej. al persistir). Comparte la
+        tabla de textos con este almacén, que solo crece: no se le pueden agregar viajes.
+        """
+        hasta = len(self) if hasta is None else hasta
+        nuevo = ColumnasViajes.__new__(ColumnasViajes)
+        nuevo.columnas = {c: col[desde:hasta] for c, col in self.columnas.items()}
+        nuevo.textos = self.textos
+        nuevo._indice_textos = self._indice_textos
+        nuevo.extras = {i - desde: dict(otros) for i, otros in self.extras.items() if desde <= i < hasta}
+        return nuevo
+
+    # ---------------------------
+    # Acceso por campo (VistaViaje)
+    # ---------------------------
+    def leer(self, i, clave):
+        c = self.columnas
+        if clave in COORDENADAS:
+            x, y = COORDENADAS[clave]
+            return (c[x][i], c[y][i])
+        if clave == "estado":
+            return ESTADOS[c["estado"][i]]
+        if clave in BANDERAS:
+            if c[BANDERAS[clave]][i]:
+                return True
+            raise KeyError(clave)
+        if clave in CAMPOS_TEXTO:
+            return self.textos[c[clave][i]]
+        if clave in CAMPOS_ENTEROS:
+            return c[clave][i]
+        if clave in CAMPOS_REALES:
+            val = c[clave][i]
+            if val != val:  # NaN
+                if clave in CAMPOS_OPCIONALES:
+                    raise KeyError(clave)
+                return None
+            return val
+        return self.extras.get(i, {})[clave]
+
+    def escribir(self, i, clave, valor):
+        c = self.columnas
+        if clave in CAMPOS_ENTEROS:
+            c[clave][i] = -1 if valor is None else int(valor)
+        elif clave in CAMPOS_REALES:
+            c[clave][i] = NAN if valor is None else float(valor)
+        elif clave in COORDENADAS:
+            x, y = COORDENADAS[clave]
+            c[x][i], c[y][i] = valor
+        elif clave == "estado":
+            c["estado"][i] = ESTADOS.index(valor) if valor in ESTADOS else 0
+        elif clave in BANDERAS:
+            c[BANDERAS[clave]][i] = 1 if valor else 0
+        elif clave in CAMPOS_TEXTO:
+            c[clave][i] = self._texto(valor or "")
+        else:
+            self.extras.setdefault(i, {})[clave] = valor
+
+    def borrar(self, i, clave):
+        if clave in CAMPOS_OPCIONALES:
+            self.leer(i, clave)  # KeyError si no existe
+            self.columnas[clave][i] = NAN
+        elif clave in BANDERAS:
+            self.leer(i, clave)
+            self.columnas[BANDERAS[clave]][i] = 0
+        elif clave in CAMPOS_CONOCIDOS:
+            raise KeyError(f"{clave} es obligatorio en un viaje")
+        else:
+            otros = self.extras.get(i, {})
+            del otros[clave]
+            if not otros:
+                self.extras.pop(i, None)
+
+    def claves(self, i):
+        c = self.columnas
+        claves = [k for k in ORDEN_CLAVES
+                  if not ((k in CAMPOS_OPCIONALES and c[k][i] != c[k][i]) or (k in BANDERAS and not c[BANDERAS[k]][i]))]
+        if i in self.extras:
+            claves.extend(self.extras[i])
+        return claves
+
+    def viaje(self, i):
+        """Materializa el viaje i como dict, con las claves en ORDEN_CLAVES (extras al final)."""
+        c = self.columnas
+        v = {}
+        for k in ORDEN_CLAVES:
+            if k in BANDERAS:
+                if c[BANDERAS[k]][i]:
+                    v[k] = True
+            elif k in CAMPOS_OPCIONALES:
+                val = c[k][i]
+                if val == val:
+                    v[k] = val
+            else:
+                v[k] = self.leer(i, k)
+        if i in self.extras:
+            v.update(self.extras[i])
+        return v
+
+    def dicts(self):
+        """Genera cada viaje como dict (exportación JSON)."""
+        for i in range(len(self)):
+            yield self.viaje(i)
+
+    # ---------------------------
+    # Consultas por columnas
+    # ---------------------------
+    def marcar_auditado(self, i):
+        self.columnas["auditado"][i] = 1
+
+    def marcar_auditados(self, ids):
+        """Marca auditados los viajes cuyo id está en 'ids' (un set)."""
+        auditado = self.columnas["auditado"]
+        for i, vid in enumerate(self.columnas["id"]):
+            if vid in ids:
+                auditado[i] = 1
+
+    def marcar_interrumpidos(self):
+        """Los viajes aún activos pasan a "interrumpido" (p. ej. al restaurar un checkpoint)."""
+        estados = self.columnas["estado"]
+        activo, interrumpido = bytes([ESTADOS.index("activo")]), ESTADOS.index("interrumpido")
+        crudo = estados.tobytes()  # búsqueda en C: los activos son pocos frente al total
+        i = crudo.find(activo)
+        while i != -1:
+            estados[i] = interrumpido
+            i = crudo.find(activo, i + 1)
+
+    def indices_estado(self, estado):
+        codigo = ESTADOS.index(estado)
+        return [i for i, e in enumerate(self.columnas["estado"]) if e == codigo]
+
+    def indices_finalizados(self):
+        return self.indices_estado("finalizado")
+
+    def sumas_calificaciones(self, campo):
+        """campo (taxi_id/cliente_id) -> (suma, cantidad) de las calificaciones de viajes finalizados."""
+        res = {}
+        fin = ESTADOS.index("finalizado")
+        claves = self.columnas[campo]
+        estados = self.columnas["estado"]
+        for k, e, cal in zip(claves, estados, self.columnas["calificacion_cliente"]):
+            if e == fin and cal == cal:
+                suma, n = res.get(k, (0.0, 0))
+                res[k] = (suma + cal, n + 1)
+        return res
+
+    def agregacion_calificaciones(self, campo):
+        """campo (taxi_id/cliente_id) -> (promedio, cantidad) de viajes finalizados calificados."""
+        return promedios_calificaciones(self.sumas_calificaciones(campo))
+
+    def bytes_por_viaje(self):
+        """Memoria de las columnas (sin tabla de textos ni extras) dividida por el número de viajes."""
+        total = sum(col.itemsize * len(col) for col in self.columnas.values())
+        return total / max(1, len(self))
+
+
+def sumar_calificaciones(sumas, otras):
+    """Acumula en 'sumas' las (suma, cantidad) de 'otras'."""
+    for k, (suma, n) in otras.items():
+        s0, n0 = sumas.get(k, (0.0, 0))
+        sumas[k] = (s0 + suma, n0 + n)
+    return sumas
+
+
+def promedios_calificaciones(sumas):
+    """clave -> (suma, cantidad) a clave -> (promedio, cantidad)."""
+    return {k: (suma / n, n) for k, (suma, n) in sumas.items()}
+
+
+def _json_real(x):
+    """Un float como lo escribe json.dumps (NaN e infinitos incluidos)."""
+    if x != x:
+        return "NaN"
+    if x in (INF, -INF):
+        return "Infinity" if x > 0 else "-Infinity"
+    return repr(x)
+
+
+def _reales(col):
+    textos = list(map(float.__repr__, col))
+    if not _NO_FINITOS.isdisjoint(textos):
+        return [_json_real(x) for x in col]
+    return textos
+
+
+def _filas_json(almacen, desde, hasta):
+    """
+    Filas [desde, hasta) ya codificadas como los dicts que escribiría json.dumps(indent=2) dentro
+    de la lista (sangría de 2): cada columna se codifica de una vez, sin materializar dicts.
+    """
+    c = almacen.columnas
+    rango = slice(desde, hasta)
+    enteros = {k: list(map(int.__repr__, c[k][rango])) for k in CAMPOS_ENTEROS}
+    reales = {k: _reales(c[k][rango]) for k in CAMPOS_REALES}
+    reales["calificacion_cliente"] = ["null" if r == "NaN" else r for r in reales["calificacion_cliente"]]
+    coords = {k: [f"[\n      {x},\n      {y}\n    ]" for x, y in zip(_reales(c[cx][rango]), _reales(c[cy][rango]))]
+              for k, (cx, cy) in COORDENADAS.items()}
+    textos = {k: _codificar_texto(almacen.textos[k])
+              for k in set(c["placa_taxi"][rango]).union(c["conductor"][rango])}  # solo los usados
+    estados = [_codificar_texto(e) for e in ESTADOS]
+    filas = []
+    for k, fila in enumerate(zip(
+            enteros["id"], enteros["cliente_id"], enteros["taxi_id"], coords["origen"], coords["destino"],
+            c["estado"][rango], reales["inicio_ts"], reales["costo_estimado"], reales["duracion_estimada"],
+            reales["calificacion_cliente"], c["placa_taxi"][rango], c["conductor"][rango], reales["eta_pickup"],
+            reales["progreso"], reales["taxi_calificacion"], c["compartido"][rango], c["encadenado"][rango],
+            reales["fin_ts"], c["auditado"][rango])):
+        i = desde + k
+        if i in almacen.extras:  # claves desconocidas: como dict completo
+            filas.append(json.dumps(almacen.viaje(i), ensure_ascii=False, indent=2).replace("\n", "\n  "))
+            continue
+        (vid, cid, tid, origen, destino, estado, inicio, costo, duracion, calif, placa, conductor, eta,
+         progreso, taxi_calif, compartido, encadenado, fin, auditado) = fila
+        partes = [f'{{\n    "id": {vid},\n    "cliente_id": {cid},\n    "taxi_id": {tid},\n    "origen": {origen},'
+                  f'\n    "destino": {destino},\n    "estado": {estados[estado]},\n    "inicio_ts": {inicio},'
+                  f'\n    "costo_estimado": {costo}']
+        if duracion != "NaN":
+            partes.append(f',\n    "duracion_estimada": {duracion}')
+        partes.append(f',\n    "calificacion_cliente": {calif},\n    "placa_taxi": {textos[placa]},'
+                      f'\n    "conductor": {textos[conductor]},\n    "eta_pickup": {eta},\n    "progreso": {progreso},'
+                      f'\n    "taxi_calificacion": {taxi_calif}')
+        if compartido:
+            partes.append(',\n    "compartido": true')
+        if encadenado:
+            partes.append(',\n    "encadenado": true')
+        if fin != "NaN":
+            partes.append(f',\n    "fin_ts": {fin}')
+        if auditado:
+            partes.append(',\n    "seguimiento_auditoria": true')
+        partes.append("\n  }")
+        filas.append("".join(partes))
+    return filas
+
+
+def escribir_json(f, *almacenes):
+    """
+    Escribe los almacenes en 'f' como la lista JSON indentada de siempre (idéntica byte a byte a
+    json.dump(viajes, indent=2, ensure_ascii=False) de los dicts), por bloques de filas.
+    """
+    f.write("[")
+    escritos = 0
+    for almacen in almacenes:
+        for desde in range(0, len(almacen), FILAS_POR_BLOQUE):
+            filas = _filas_json(almacen, desde, min(len(almacen), desde + FILAS_POR_BLOQUE))
+            f.write((",\n  " if escritos else "\n  ") + ",\n  ".join(filas))
+            escritos += len(filas)
+    f.write("\n]" if escritos else "]")
+    return escritos
+
+
+class ArchivoViajesJSON:
+    """
+    Un viajes.json que se actualiza en su sitio. Su contenido es siempre el de
+    escribir_json(historico, viajes), pero cada guardado trunca el archivo en la primera fila que
+    pudo cambiar y reescribe solo desde ahí. El histórico restaurado y los viajes ya cerrados se
+    escriben una vez. Si el archivo cambió por fuera, o cambian los almacenes, se reescribe
+    entero.
+    Cada guardado va en dos pasos para no escribir con lock_viajes: pendiente() dice desde qué
+    fila de 'viajes' hay que enviar, el llamador copia esas filas con el lock (tramo()) y
+    guardar() escribe la copia sin él. El histórico no cambia y se lee sin copiar.
+    marca() y adoptar() permiten continuar tras un reinicio: el checkpoint guarda qué prefijo del
+    archivo ya contiene y el primer guardado solo escribe lo que viene después.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self._base = None          # (historico, viajes, len(historico)) de la última escritura
+        self._filas_historico = 0  # filas del histórico en el archivo y byte tras la última
+        self._fin_historico = 1
+        self._inicios = array("q")  # byte donde empieza cada fila de 'viajes' (con su separador)
+        self._fin = 0              # byte tras la última fila escrita
+        self._estables = 0         # filas de 'viajes' escritas que no cambiaron desde entonces
+        self._firma = None         # (tamaño, mtime) del archivo tras la última escritura
+
+    def invalidar(self, desde=None):
+        """
+        La fila 'desde' de los viajes (o, sin argumento, cualquier fila, histórico incluido)
+        cambió fuera de guardar(): el próximo guardado la reescribe.
+        """
+        if desde is None:
+            self._base = None
+        else:
+            self._estables = min(self._estables, desde)
+
+    def _firma_actual(self):
+        try:
+            st = self.ruta.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def pendiente(self, historico, viajes):
+        """
+        Primera fila de 'viajes' que necesita el próximo guardar(): las anteriores ya están en el
+        archivo y no cambiaron. 0 si el archivo se reescribirá entero.
+        """
+        base = self._base
+        if (base is None or base[0] is not historico or base[1] is not viajes or base[2] != len(historico)
+                or self._firma_actual() != self._firma or len(viajes) < len(self._inicios)):
+            self._base = None
+            return 0
+        if self._filas_historico < len(historico):
+            return 0
+        return min(self._estables, len(self._inicios))
+
+    def guardar(self, historico, viajes, desde, cola, estables):
+        """
+        Lleva el archivo al contenido de escribir_json(historico, viajes). 'cola' son las filas
+        de 'viajes' desde 'desde' (el valor de pendiente()), copiadas con lock_viajes; 'estables'
+        es cuántas filas iniciales de 'viajes' ya no cambiarán (hasta el primer viaje activo).
+        Devuelve cuántas filas se codificaron.
+        """
+        completo = self._base is None
+        if completo:
+            if desde:
+                raise ValueError("el archivo se reescribe entero: guardar() necesita las filas desde 0")
+            self._filas_historico, self._fin_historico = 0, 1
+            self._inicios = array("q")
+            self._fin = 1
+        faltan = len(historico) - self._filas_historico  # filas del histórico aún sin escribir
+        with open(self.ruta, "wb" if completo else "r+b") as f:
+            if completo:
+                f.write(b"[")
+            if faltan:
+                pos = self._fin_historico
+                del self._inicios[:]
+            else:
+                pos = self._inicios[desde] if desde < len(self._inicios) else self._fin
+                del self._inicios[desde:]
+            f.seek(pos)
+            f.truncate()
+            if faltan:
+                _, pos = _escribir_filas(f, historico, self._filas_historico, self._filas_historico, pos)
+                self._filas_historico, self._fin_historico = len(historico), pos
+            escritos, pos = _escribir_filas(f, cola, 0, len(historico) + desde, pos, self._inicios)
+            f.write(b"\n]" if escritos else b"]")
+        self._fin = pos
+        self._firma = self._firma_actual()
+        self._base = (historico, viajes, len(historico))
+        self._estables = min(estables, desde + len(cola))
+        return faltan + len(cola)
+
+    def marca(self):
+        """
+        Prefijo del archivo que un checkpoint tomado ahora contiene tal cual: {"filas", "pos",
+        "crc"}, las primeras 'filas' filas acaban en el byte 'pos' y 'crc' es el de los
+        BYTES_MARCA anteriores. None si el archivo no es el que escribió este objeto.
+        """
+        base = self._base
+        if base is None or self._firma_actual() != self._firma:
+            return None
+        if self._filas_historico < len(base[0]):
+            filas, pos = self._filas_historico, self._fin_historico
+        else:
+            d = min(self._estables, len(self._inicios))
+            filas, pos = len(base[0]) + d, (self._inicios[d] if d < len(self._inicios) else self._fin)
+        return {"filas": filas, "pos": pos, "crc": self._crc(pos)}
+
+    def adoptar(self, historico, viajes, marca):
+        """
+        Tras restaurar un checkpoint: si el archivo aún empieza por el prefijo de su marca, lo
+        retoma como las primeras filas de 'historico' y el próximo guardado escribe solo el
+        resto. Si no (o sin marca) se reescribirá entero. Devuelve True si lo retomó.
+        """
+        self._base = None
+        if not marca or marca["filas"] > len(historico):
+            return False
+        try:
+            if self._crc(marca["pos"]) != marca["crc"]:
+                return False
+        except OSError:
+            return False
+        self._base = (historico, viajes, len(historico))
+        self._filas_historico, self._fin_historico = marca["filas"], marca["pos"]
+        self._inicios = array("q")
+        self._fin = marca["pos"]
+        self._estables = 0
+        self._firma = self._firma_actual()
+        return True
+
+    def _crc(self, pos):
+        with open(self.ruta, "rb") as f:
+            desde = max(0, pos - BYTES_MARCA)
+            f.seek(desde)
+            datos = f.read(pos - desde)
+        return zlib.crc32(datos) if len(datos) == pos - desde else None
+
+
+def _escribir_filas(f, almacen, desde, escritos, pos, inicios=None):
+    """
+    Escribe en 'f' (binario, en la posición 'pos') las filas de 'almacen' desde 'desde', con los
+    separadores de escribir_json; anota en 'inicios' dónde empieza cada una. Devuelve
+    (escritos, pos) actualizados.
+    """
+    for bloque in range(desde, len(almacen), FILAS_POR_BLOQUE):
+        filas = _filas_json(almacen, bloque, min(len(almacen), bloque + FILAS_POR_BLOQUE))
+        partes = [((",\n  " if escritos + k else "\n  ") + fila).encode("utf-8") for k, fila in enumerate(filas)]
+        if inicios is None:
+            pos += sum(map(len, partes))
+        else:
+            for parte in partes:
+                inicios.append(pos)
+                pos += len(parte)
+        f.write(b"".join(partes))
+        escritos += len(filas)
+    return escritos, pos
+
+
+def leer_json(ruta, auditados=()):
+    """
+    Lee un viajes.json como ColumnasViajes y marca auditados los viajes de 'auditados'
+    (auditoria.viajes_auditados()): de las filas ya escritas al auditarlas, solo consta allí.
+    """
+    with open(ruta, "r", encoding="utf-8") as f:
+        contenido = f.read().strip()
+    almacen = codificar_viajes(json.loads(contenido) if contenido else [])
+    if auditados:
+        almacen.marcar_auditados(set(auditados))
+    return almacen
+
+
+def codificar_viajes(viajes):
+    """Convierte una lista de dicts de viaje en un ColumnasViajes."""
+    cols = ColumnasViajes()
+    for v in viajes:
+        cols.agregar(v)
+    return cols
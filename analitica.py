@@ -0,0 +1,118 @@
+# analitica.py
+"""
+Analítica en vivo de oferta y demanda por zona (misma rejilla que demanda.py):
+- Por zona y por ventana (1, 5 y 60 minutos) se guardan anillos de buckets con solicitudes,
+  asignaciones, finalizaciones y espera acumulada; cada evento es una actualización O(1).
+- Cada ventana tiene un número fijo de buckets (la ventana efectiva oscila entre la nominal
+  menos un bucket y la nominal), así la memoria está acotada por zonas x ventanas x buckets
+  sin importar cuánto tiempo lleve corriendo el sistema.
+- consultar(ventana) devuelve solicitudes por minuto, ratio de atención y espera media por zona.
+"""
+
+import threading
+import time
+from array import array
+from collections import namedtuple
+from demanda import CELDAS, celda_de
+
+VENTANAS = {60: 12, 300: 20, 3600: 60}  # segundos de ventana -> buckets del anillo
+CAMPOS = ("solicitudes", "asignados", "finalizados", "espera")
+SOLICITUDES, ASIGNADOS, FINALIZADOS, ESPERA = range(len(CAMPOS))
+
+EstadisticaZona = namedtuple(
+    "EstadisticaZona",
+    "solicitudes asignados finalizados solicitudes_por_minuto ratio_atencion espera_media",
+)
+
+
+class _Anillo:
+    """Buckets de ancho fijo reutilizados circularmente; un bucket caducado se limpia al reusarse."""
+    __slots__ = ("ancho", "epocas", "valores")
+
+    def __init__(self, ventana, buckets):
+        self.ancho = ventana / buckets
+        self.epocas = array("q", [-1]) * buckets
+        self.valores = [array("d", [0.0]) * buckets for _ in CAMPOS]
+
+    def sumar(self, t, campo, valor):
+        epoca = int(t // self.ancho)
+        pos = epoca % len(self.epocas)
+        if self.epocas[pos] != epoca:
+            self.epocas[pos] = epoca
+            for col in self.valores:
+                col[pos] = 0.0
+        self.valores[campo][pos] += valor
+
+    def totales(self, t):
+        epoca = int(t // self.ancho)
+        minima = epoca - len(self.epocas)
+        res = [0.0] * len(CAMPOS)
+        for pos, e in enumerate(self.epocas):
+            if minima < e <= epoca:
+                for k, col in enumerate(self.valores):
+                    res[k] += col[pos]
+        return res
+
+
+def _estadistica(ventana, totales):
+    solicitudes, asignados, finalizados, espera = totales
+    return EstadisticaZona(
+        solicitudes=int(solicitudes),
+        asignados=int(asignados),
+        finalizados=int(finalizados),
+        solicitudes_por_minuto=solicitudes * 60.0 / ventana,
+        ratio_atencion=min(1.0, asignados / solicitudes) if solicitudes else None,
+        espera_media=espera / asignados if asignados else None,
+    )
+
+
+class AnaliticaZonas:
+    def __init__(self, celdas=CELDAS, ventanas=VENTANAS, reloj=time.monotonic):
+        self.celdas = celdas
+        self.ventanas = dict(ventanas)
+        self.reloj = reloj
+        self._zonas = {}  # celda -> {ventana: _Anillo}
+        self._lock = threading.Lock()
+
+    def _sumar(self, punto, *incrementos):
+        """Aplica pares (campo, valor) en todos los anillos de la zona del punto."""
+        zona = celda_de(punto, self.celdas)
+        t = self.reloj()
+        with self._lock:
+            anillos = self._zonas.get(zona)
+            if anillos is None:
+                anillos = self._zonas[zona] = {v: _Anillo(v, b) for v, b in self.ventanas.items()}
+            for anillo in anillos.values():
+                for campo, valor in incrementos:
+                    anillo.sumar(t, campo, valor)
+
+    def registrar_solicitud(self, origen):
+        self._sumar(origen, (SOLICITUDES, 1.0))
+
+    def registrar_asignacion(self, origen, espera):
+        """Asignación en la zona de origen con la espera (s) desde la solicitud."""
+        self._sumar(origen, (ASIGNADOS, 1.0), (ESPERA, espera))
+
+    def registrar_finalizacion(self, origen):
+        self._sumar(origen, (FINALIZADOS, 1.0))
+
+    def consultar(self, ventana=60):
+        """zona (i, j) -> EstadisticaZona en la ventana dada (solo zonas con actividad)."""
+        t = self.reloj()
+        with self._lock:
+            res = {}
+            for zona, anillos in self._zonas.items():
+                totales = anillos[ventana].totales(t)
+                if any(totales):
+                    res[zona] = _estadistica(ventana, totales)
+        return res
+
+    def total(self, ventana=60):
+        """EstadisticaZona agregada de todas las zonas en la ventana dada."""
+        t = self.reloj()
+        suma = [0.0] * len(CAMPOS)
+        with self._lock:
+            for anillos in self._zonas.values():
+                for k, v in enumerate(anillos[ventana].totales(t)):
+                    suma[k] += v
+        return _estadistica(ventana, suma)
@@ -0,0 +1,104 @@
+# auditoria.py
+"""
+Muestreo de viajes finalizados para el seguimiento de calidad:
+- Cuota diaria de auditorías que se respeta entre reinicios: cada auditoría se anexa a
+  data/auditorias.jsonl y al arrancar se cuentan las registradas hoy.
+- Reservorio del día (algoritmo R): finalizar un viaje lo ofrece en O(1) y el reservorio guarda
+  una muestra uniforme, del tamaño de la cuota, de los finalizados aún no considerados.
+- tomar() entrega de la muestra lo que quede de cuota, la registra y vacía el reservorio; al
+  cambiar de día se reinician reservorio y cuota. Con la cuota agotada ofrecer() no hace nada.
+- El registro es la fuente de las banderas de auditoría: data/viajes.json no reescribe filas ya
+  escritas para marcarlas, y quien lo carga aplica viajes_auditados() (almacen_viajes.leer_json).
+"""
+
+import json
+import random
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+RUTA_AUDITORIAS = Path("data") / "auditorias.jsonl"
+
+
+def viajes_auditados(ruta=RUTA_AUDITORIAS):
+    """Ids de todos los viajes auditados según el registro."""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return set()
+    with open(ruta, "r", encoding="utf-8") as f:
+        return {json.loads(linea)["viaje_id"] for linea in f if linea.strip()}
+
+
+class MuestreoAuditoria:
+    def __init__(self, cuota=5, ruta=RUTA_AUDITORIAS, hoy=date.today, rng=random):
+        self.cuota = cuota
+        self.ruta = Path(ruta)
+        self.hoy = hoy
+        self.rng = rng
+        self._lock = threading.Lock()
+        self._fecha = hoy()
+        self._usadas = self._registradas(self._fecha)
+        self._reservorio = []  # (almacén, índice) de viajes finalizados
+        self._vistos = 0
+
+    def _registradas(self, fecha):
+        """Auditorías de 'fecha' en el registro (pocas por día: se lee entero)."""
+        if not self.ruta.exists():
+            return 0
+        clave = fecha.isoformat()
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            return sum(1 for linea in f if linea.strip() and json.loads(linea).get("fecha") == clave)
+
+    def _rotar(self):
+        fecha = self.hoy()
+        if fecha != self._fecha:
+            self._fecha = fecha
+            self._usadas = 0
+            self._reservorio = []
+            self._vistos = 0
+
+    @property
+    def restantes(self):
+        with self._lock:
+            self._rotar()
+            return max(0, self.cuota - self._usadas)
+
+    def ofrecer(self, almacen, indice):
+        """Ofrece un viaje finalizado (fila 'indice' de 'almacen') a la muestra del día."""
+        with self._lock:
+            self._rotar()
+            if self._usadas >= self.cuota:
+                return
+            self._vistos += 1
+            if len(self._reservorio) < self.cuota:
+                self._reservorio.append((almacen, indice))
+                return
+            j = self.rng.randrange(self._vistos)
+            if j < self.cuota:
+                self._reservorio[j] = (almacen, indice)
+
+    def reiniciar(self, filas=()):
+        """Descarta la muestra (p. ej. al restaurar otro almacén) y ofrece 'filas' (almacén, índice)."""
+        with self._lock:
+            self._reservorio = []
+            self._vistos = 0
+        for almacen, indice in filas:
+            self.ofrecer(almacen, indice)
+
+    def tomar(self):
+        """Muestra a auditar ahora (hasta la cuota restante del día), ya registrada en el archivo."""
+        with self._lock:
+            self._rotar()
+            k = min(max(0, self.cuota - self._usadas), len(self._reservorio))
+            muestra = self.rng.sample(self._reservorio, k)
+            self._reservorio = []
+            self._vistos = 0
+            if muestra:
+                self._usadas += k
+                self.ruta.parent.mkdir(parents=True, exist_ok=True)
+                fecha, ts = self._fecha.isoformat(), time.time()
+                with open(self.ruta, "a", encoding="utf-8") as f:
+                    for almacen, indice in muestra:
+                        f.write(json.dumps({"fecha": fecha, "viaje_id": almacen.leer(indice, "id"), "ts": ts}) + "\n")
+        return muestra
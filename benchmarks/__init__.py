@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+"""Microbenchmarks de UNIETAXI (ver benchmarks/bench_core.py)."""
@@ -0,0 +1,348 @@
+# benchmarks/bench_core.py
+"""
+Microbenchmarks de los caminos calientes de UNIETAXI con baselines JSON.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_core run [--rapido] [--solo PATRON] [--rondas N] [--salida benchmarks/baselines/actual.json]
+    python -m benchmarks.bench_core compare BASE.json NUEVO.json [--umbral 0.2]
+
+- run: ejecuta los casos y guarda segundos por operación (mediana de varias repeticiones).
+  Corre dentro de un directorio temporal para no tocar data/ ni docs/. Con --rondas N repite la
+  ejecución completa y guarda la mediana por caso (baselines menos sensibles a un mal momento).
+- compare: marca como regresión todo caso cuyo tiempo supere al de la baseline en más de
+  'umbral' (0.2 = 20%); termina con código 1 si hay regresiones. Los casos sin baseline se
+  listan aparte: la baseline está desactualizada.
+- benchmarks/baselines/base_rapido.json se regenera (run --rapido --rondas 3) en el mismo commit que cambia
+  un camino medido o agrega un caso; meta.casos registra qué casos cubre.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path:
+    sys.path.insert(0, str(RAIZ))
+
+CASOS = []  # (nombre_base, funcion, en_modo_rapido)
+
+
+def caso(nombre, rapido=True):
+    """Registra una función de benchmark; debe producir pares (nombre, segundos_por_op)."""
+    def decorador(fn):
+        CASOS.append((nombre, fn, rapido))
+        return fn
+    return decorador
+
+
+def medir(fn, ops=1, repeticiones=5, preparar=None):
+    """Mediana de segundos por operación de fn() (que ejecuta 'ops' operaciones)."""
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar is not None:
+            preparar()
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append((time.perf_counter() - t0) / ops)
+    return statistics.median(tiempos)
+
+
+# ---------------------------
+# Datos sintéticos
+# ---------------------------
+def nuevo_sistema():
+    from sistema_atencion import SistemaAtencion
+    return SistemaAtencion()
+
+
+def flota(sistema, n):
+    from utils import generar_taxis_iniciales
+    return generar_taxis_iniciales(n, sistema, registros=[])
+
+
+def viajes_sinteticos(n, semilla=7):
+    """Lista de n viajes finalizados con el mismo esquema que asignar_viaje/finalizar_viaje."""
+    rnd = random.Random(semilla)
+    viajes = []
+    for i in range(n):
+        o = (round(rnd.random(), 3), round(rnd.random(), 3))
+        d = (round(rnd.random(), 3), round(rnd.random(), 3))
+        tid = rnd.randrange(500)
+        viajes.append({
+            "id": i + 1, "cliente_id": rnd.randrange(5000), "taxi_id": tid,
+            "origen": o, "destino": d, "estado": "finalizado",
+            "inicio_ts": 1.7e9 + i, "costo_estimado": 5.0, "calificacion_cliente": round(rnd.uniform(3.5, 5.0), 1),
+            "placa_taxi": f"UNI-{tid:03d}", "conductor": f"Conductor-{tid}", "eta_pickup": 1.0,
+            "progreso": 1.0, "taxi_calificacion": 4.5, "duracion_estimada": 2.0, "fin_ts": 1.7e9 + i + 30,
+        })
+    return viajes
+
+
+# ---------------------------
+# Casos
+# ---------------------------
+@caso("distancia_euclidiana")
+def bench_distancia():
+    from utils import distancia_euclidiana
+    pts = [((random.random(), random.random()), (random.random(), random.random())) for _ in range(10000)]
+    yield "distancia_euclidiana", medir(lambda: [distancia_euclidiana(a, b) for a, b in pts], ops=len(pts))
+
+
+@caso("mover_hacia")
+def bench_mover():
+    from utils import mover_hacia
+    pts = [((random.random(), random.random()), (random.random(), random.random())) for _ in range(10000)]
+    yield "mover_hacia", medir(lambda: [mover_hacia(a, b, 0.01) for a, b in pts], ops=len(pts))
+
+
+@caso("cotizar")
+def bench_cotizar():
+    from tarifas import MotorTarifas
+    n = 10000
+    origenes = [(random.random(), random.random()) for _ in range(n)]
+    destinos = [(random.random(), random.random()) for _ in range(n)]
+    for zonas in (0, 16):
+        motor = MotorTarifas(zonas)
+        yield f"cotizar_viaje[zonas={zonas}]", medir(
+            lambda: [motor.cotizar_viaje(o, d) for o, d in zip(origenes, destinos)], ops=n)
+        yield f"cotizar_lote[zonas={zonas}]", medir(lambda: motor.cotizar(origenes, destinos), ops=n)
+
+
+@caso("seleccionar_taxi_cliente")
+def bench_seleccionar():
+    from cliente import Cliente
+    for n in (10, 1000, 10000):
+        sistema = nuevo_sistema()
+        flota(sistema, n)
+        clientes = [Cliente(i, sistema, origen=(random.random(), random.random()), destino=(0.5, 0.5)) for i in range(50)]
+        yield f"seleccionar_taxi_cliente[{n}]", medir(
+            lambda: [sistema.seleccionar_taxi_cliente(c) for c in clientes], ops=len(clientes))
+
+
+@caso("rebalanceo_planificar")
+def bench_rebalanceo():
+    from demanda import EstimadorDemanda, Rebalanceador
+    for n in (100, 1000):
+        sistema = nuevo_sistema()
+        flota(sistema, n)
+        est = EstimadorDemanda(reloj=lambda: 0.0)
+        for _ in range(500):
+            est.registrar((random.gauss(0.2, 0.05) % 1.0, random.gauss(0.8, 0.05) % 1.0))
+        rebal = Rebalanceador(sistema, est)
+        yield f"rebalanceo_planificar[taxis={n}]", medir(rebal.planificar)
+
+
+@caso("procesar_solicitudes")
+def bench_procesar():
+    from cliente import Cliente
+    estado = {}
+
+    def preparar():
+        sistema = nuevo_sistema()
+        flota(sistema, 1000)
+        for i in range(300):
+            sistema.recibir_solicitud(Cliente(i, sistema, origen=(random.random(), random.random()), destino=(0.5, 0.5)))
+        estado["sistema"] = sistema
+
+    yield "procesar_solicitudes[backlog=300,taxis=1000]", medir(
+        lambda: estado["sistema"].procesar_solicitudes(), ops=300, repeticiones=3, preparar=preparar)
+
+
+@caso("asignacion_individual_vs_lote")
+def bench_lote():
+    from cliente import Cliente
+    estado = {}
+
+    def preparar():
+        sistema = nuevo_sistema()
+        flota(sistema, 1000)
+        estado["sistema"] = sistema
+        estado["clientes"] = [Cliente(i, sistema, origen=(random.random(), random.random()), destino=(0.5, 0.5))
+                              for i in range(300)]
+
+    def individual():
+        sistema = estado["sistema"]
+        for c in estado["clientes"]:
+            sistema.recibir_solicitud(c)
+        for c in estado["clientes"]:
+            sistema.solicitudes.get()
+            taxi = sistema.seleccionar_taxi_cliente(c)
+            if taxi:
+                sistema.asignar_viaje(c, taxi)
+
+    def lote():
+        sistema = estado["sistema"]
+        sistema.recibir_solicitudes_lote(estado["clientes"])
+        sistema.procesar_solicitudes()
+
+    yield "asignacion_individual[300,taxis=1000]", medir(individual, ops=300, repeticiones=3, preparar=preparar)
+    yield "asignacion_lote[300,taxis=1000]", medir(lote, ops=300, repeticiones=3, preparar=preparar)
+
+
+@caso("persistir_viajes")
+def bench_persistir(rapido=False):
+    from almacen_viajes import ColumnasViajes, codificar_viajes
+    tamanos = (1000, 10000) if rapido else (1000, 100000, 1000000)
+    for n in tamanos:
+        sistema = nuevo_sistema()
+        sistema.viajes = codificar_viajes(viajes_sinteticos(n))
+        # Escritura completa (como la primera tras arrancar sin checkpoint)
+        yield f"persistir_viajes[{n}]", medir(sistema.persistir_viajes, repeticiones=3 if n < 1000000 else 1,
+                                              preparar=sistema._archivo_json.invalidar)
+        # Guardado de un despacho con el histórico ya escrito: solo se codifica el viaje nuevo
+        sistema.historico, sistema.viajes = sistema.viajes, ColumnasViajes()
+        sistema.persistir_viajes()
+        nuevo = viajes_sinteticos(1)[0]
+        yield f"persistir_tras_restaurar[historico={n}]", medir(
+            sistema.persistir_viajes, repeticiones=25, preparar=lambda: sistema.viajes.agregar(nuevo))
+
+
+@caso("agregacion_calidad")
+def bench_agregacion(rapido=False):
+    from almacen_viajes import codificar_viajes
+    n = 10000 if rapido else 100000
+    sistema = nuevo_sistema()
+    sistema.historico = codificar_viajes(viajes_sinteticos(n))
+
+    def pendiente():  # como tras restaurar_viajes: el histórico se suma al primer uso
+        sistema._calidad_por_taxi, sistema._calidad_por_cliente = {}, {}
+        sistema._calidad_pendiente = sistema.historico
+
+    yield f"sembrar_calidad[{n}]", medir(sistema._sembrar_calidad, repeticiones=3, preparar=pendiente)
+    # Después cada lectura copia las sumas acumuladas al finalizar, sin recorrer viajes
+    yield f"agregacion_calidad_por_taxi[{n}]", medir(sistema.agregacion_calidad_por_taxi, repeticiones=3)
+    yield f"agregacion_calidad_por_cliente[{n}]", medir(sistema.agregacion_calidad_por_cliente, repeticiones=3)
+
+
+@caso("almacen_analitico")
+def bench_analitico(rapido=False):
+    from almacen_analitico import AlmacenAnalitico
+    from almacen_viajes import codificar_viajes
+    n = 10000 if rapido else 1000000
+    almacen = AlmacenAnalitico()
+    almacen.importar(codificar_viajes(viajes_sinteticos(n)))
+    yield f"analitico_ingresos_por_taxi[{n}]", medir(lambda: almacen.agrupar("taxi_id", "costo", "suma"), repeticiones=3)
+    yield f"analitico_calificacion_por_cliente[{n}]", medir(
+        lambda: almacen.agrupar("cliente_id", "calificacion", "media"), repeticiones=3)
+
+
+@caso("generar_reporte_mensual")
+def bench_reporte(rapido=False):
+    from almacen_viajes import codificar_viajes
+    from reportes import Reportes
+    n = 10000 if rapido else 100000
+    sistema = nuevo_sistema()
+    sistema.viajes = codificar_viajes(viajes_sinteticos(n))
+    sistema.persistir_viajes()
+    rep = Reportes(sistema)
+    yield f"generar_reporte_mensual[{n}]", medir(rep.generar_reporte_mensual, repeticiones=3)
+
+
+# ---------------------------
+# Ejecución y comparación
+# ---------------------------
+def ejecutar(rapido=False, solo=None):
+    """Ejecuta los casos (en un directorio temporal) y devuelve el documento de resultados."""
+    random.seed(1234)
+    resultados = {}
+    casos = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            for nombre, fn, en_rapido in CASOS:
+                if solo and solo not in nombre:
+                    continue
+                if rapido and not en_rapido:
+                    continue
+                casos.append(nombre)
+                gen = fn(rapido=rapido) if "rapido" in fn.__code__.co_varnames else fn()
+                for clave, segundos in gen:
+                    resultados[clave] = {"segundos_por_op": segundos}
+                    print(f"{clave:<55} {segundos * 1e6:14.3f} us/op", flush=True)
+        finally:
+            os.chdir(cwd)
+    return {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "rapido": rapido,
+            "casos": casos,
+        },
+        "resultados": resultados,
+    }
+
+
+def comparar(base, nuevo, umbral=0.2):
+    """
+    Compara dos documentos de resultados. Devuelve lista de (caso, t_base, t_nuevo, ratio, regresion)
+    para los casos presentes en ambos.
+    """
+    filas = []
+    for clave, r in sorted(nuevo["resultados"].items()):
+        b = base["resultados"].get(clave)
+        if b is None:
+            continue
+        t_base, t_nuevo = b["segundos_por_op"], r["segundos_por_op"]
+        ratio = t_nuevo / t_base if t_base > 0 else float("inf")
+        filas.append((clave, t_base, t_nuevo, ratio, ratio > 1.0 + umbral))
+    return filas
+
+
+def sin_baseline(base, nuevo):
+    """Casos medidos en 'nuevo' que la baseline no tiene (baseline desactualizada)."""
+    return sorted(set(nuevo["resultados"]) - set(base["resultados"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks UNIETAXI")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_run = sub.add_parser("run", help="Ejecuta los benchmarks y guarda resultados JSON")
+    p_run.add_argument("--rapido", action="store_true", help="Tamaños reducidos (omite 1M viajes)")
+    p_run.add_argument("--solo", default=None, help="Solo casos cuyo nombre contenga este texto")
+    p_run.add_argument("--rondas", type=int, default=1, help="Ejecuciones completas; se guarda la mediana por caso")
+    p_run.add_argument("--salida", default=str(RAIZ / "benchmarks" / "baselines" / "actual.json"))
+    p_cmp = sub.add_parser("compare", help="Compara resultados contra una baseline")
+    p_cmp.add_argument("base")
+    p_cmp.add_argument("nuevo")
+    p_cmp.add_argument("--umbral", type=float, default=0.2, help="Regresión tolerada (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    if args.comando == "run":
+        docs = [ejecutar(rapido=args.rapido, solo=args.solo) for _ in range(max(1, args.rondas))]
+        doc = docs[-1]
+        for clave, r in doc["resultados"].items():
+            r["segundos_por_op"] = statistics.median(d["resultados"][clave]["segundos_por_op"] for d in docs)
+        salida = Path(args.salida)
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        salida.write_text(json.dumps(doc, indent=2), encoding="utf-8")
+        print(f"Resultados guardados en {salida}")
+        return 0
+
+    base = json.loads(Path(args.base).read_text(encoding="utf-8"))
+    nuevo = json.loads(Path(args.nuevo).read_text(encoding="utf-8"))
+    regresiones = 0
+    for clave, t_base, t_nuevo, ratio, regresion in comparar(base, nuevo, args.umbral):
+        marca = "REGRESION" if regresion else "ok"
+        regresiones += regresion
+        print(f"{clave:<55} {t_base * 1e6:12.3f} -> {t_nuevo * 1e6:12.3f} us/op  x{ratio:5.2f}  {marca}")
+    faltantes = sin_baseline(base, nuevo)
+    for clave in faltantes:
+        print(f"{clave:<55} {'':>12}    {nuevo['resultados'][clave]['segundos_por_op'] * 1e6:12.3f} us/op         SIN BASELINE")
+    print(f"{regresiones} regresión(es) por encima de {args.umbral:.0%}")
+    if faltantes:
+        print(f"{len(faltantes)} caso(s) sin baseline: regenérala con 'run --rapido --salida {args.base}'")
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
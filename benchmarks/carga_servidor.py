@@ -0,0 +1,122 @@
+# benchmarks/carga_servidor.py
+"""
+Cliente de carga para servidor.py: abre muchas conexiones concurrentes, envía una solicitud
+por conexión y mide la latencia de extremo a extremo hasta el evento "asignado".
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.carga_servidor --local [--conexiones 1000] [--taxis 2000]
+    python -m benchmarks.carga_servidor --host 127.0.0.1 --puerto 7070 [--conexiones 1000]
+
+- --local levanta en el mismo proceso un SistemaAtencion con una flota estática y el servidor
+  en un puerto libre (dentro de un directorio temporal para no tocar data/).
+- Reporta aceptación (respuesta a "solicitar") y asignación: p50/p95/p99/máx y rendimiento.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path:
+    sys.path.insert(0, str(RAIZ))
+
+
+def percentil(valores, q):
+    if not valores:
+        return float("nan")
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(q * len(ordenados)))]
+
+
+async def una_conexion(host, puerto, rnd, timeout):
+    """Devuelve (latencia_aceptacion, latencia_asignacion o None)."""
+    reader, writer = await asyncio.open_connection(host, puerto)
+    try:
+        origen = [rnd.random(), rnd.random()]
+        t0 = time.perf_counter()
+        writer.write(json.dumps({"op": "solicitar", "origen": origen, "destino": [rnd.random(), rnd.random()]}).encode() + b"\n")
+        await writer.drain()
+        aceptada = None
+        while True:
+            linea = await asyncio.wait_for(reader.readline(), timeout)
+            if not linea:
+                return aceptada, None
+            msg = json.loads(linea)
+            if msg.get("op") == "solicitar":
+                aceptada = time.perf_counter() - t0
+                if not msg.get("ok"):
+                    return aceptada, None
+            elif msg.get("evento") == "asignado":
+                return aceptada, time.perf_counter() - t0
+    except asyncio.TimeoutError:
+        return None, None
+    finally:
+        writer.close()
+
+
+async def carga(host, puerto, conexiones, semilla=7, timeout=60.0):
+    rnd = random.Random(semilla)
+    t0 = time.perf_counter()
+    resultados = await asyncio.gather(*(una_conexion(host, puerto, rnd, timeout) for _ in range(conexiones)))
+    total = time.perf_counter() - t0
+    aceptacion = [a for a, _ in resultados if a is not None]
+    asignacion = [b for _, b in resultados if b is not None]
+    return {"total_s": total, "aceptacion": aceptacion, "asignacion": asignacion, "conexiones": conexiones}
+
+
+async def carga_local(conexiones, taxis, semilla=7):
+    from sistema_atencion import SistemaAtencion
+    from utils import generar_taxis_iniciales
+    from servidor import ServidorSolicitudes
+    random.seed(semilla)
+    sistema = SistemaAtencion()
+    generar_taxis_iniciales(taxis, sistema, registros=[])
+    servidor = await ServidorSolicitudes(sistema, puerto=0).iniciar()
+    try:
+        return await carga("127.0.0.1", servidor.puerto, conexiones, semilla)
+    finally:
+        await servidor.detener()
+
+
+def resumir(r):
+    lineas = [f"conexiones={r['conexiones']} total={r['total_s']:.3f}s "
+              f"asignadas={len(r['asignacion'])} ({len(r['asignacion']) / max(1e-9, r['total_s']):.1f}/s)"]
+    for nombre in ("aceptacion", "asignacion"):
+        v = r[nombre]
+        if v:
+            lineas.append(f"{nombre:<11} p50={percentil(v, 0.5) * 1e3:8.2f}ms p95={percentil(v, 0.95) * 1e3:8.2f}ms "
+                          f"p99={percentil(v, 0.99) * 1e3:8.2f}ms max={max(v) * 1e3:8.2f}ms media={statistics.mean(v) * 1e3:8.2f}ms")
+    return "\n".join(lineas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del servidor de solicitudes UNIETAXI")
+    parser.add_argument("--local", action="store_true", help="Levanta sistema y servidor en este proceso")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=7070)
+    parser.add_argument("--conexiones", type=int, default=1000)
+    parser.add_argument("--taxis", type=int, default=2000, help="Flota estática del modo --local")
+    args = parser.parse_args(argv)
+    if args.local:
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                r = asyncio.run(carga_local(args.conexiones, args.taxis))
+            finally:
+                os.chdir(cwd)
+    else:
+        r = asyncio.run(carga(args.host, args.puerto, args.conexiones))
+    print(resumir(r))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+# benchmarks/simulacion.py
+"""
+Simulación determinista (sin hilos ni sleeps) del despacho de UNIETAXI para comparar políticas
+con la misma flota y la misma secuencia de solicitudes.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.simulacion rebalanceo [--taxis 40] [--ticks 400] [--semilla 7]
+    python -m benchmarks.simulacion pooling [--taxis 15] [--ticks 600] [--demanda 1.5]
+    python -m benchmarks.simulacion encadenado [--taxis 25] [--ticks 600] [--demanda 1.0]
+
+- Cada tick equivale a un ciclo de patrulla (0.2 s): se generan solicitudes concentradas en
+  unos pocos focos con destinos por todo el mapa, se procesa la cola en lote y cada taxi
+  avanza 4 pasos de servicio (Taxi.avanzar, uno cada 0.05 s) o patrulla una vez.
+- Reporta ETA de recogida media (estimada al asignar), espera media real del cliente desde la
+  solicitud hasta que sube al taxi (cola incluida), reencolados, viajes asignados/finalizados, viajes por
+  taxi-hora y recorrido en vacío (sin pasajeros a bordo, patrulla incluida) para cada política.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+if str(RAIZ) not in sys.path:
+    sys.path.insert(0, str(RAIZ))
+
+SEGUNDOS_POR_TICK = 0.2
+PASOS_POR_TICK = 4
+FOCOS = ((0.15, 0.2), (0.8, 0.75), (0.7, 0.15))
+
+
+def simular(rebalanceo=True, pooling=False, encadenar=True, taxis=40, ticks=400, semilla=7, solicitudes_por_tick=0.6):
+    """Devuelve las métricas de la simulación para la combinación de políticas indicada."""
+    from sistema_atencion import SistemaAtencion
+    from demanda import EstimadorDemanda, Rebalanceador
+    from cliente import Cliente
+    from utils import generar_taxis_iniciales, distancia_euclidiana
+    from pooling import RECOGER
+
+    rnd = random.Random(semilla)
+    reloj = [0.0]
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            random.seed(semilla)
+            sistema = SistemaAtencion()
+            sistema.pooling = pooling
+            sistema.encadenar = encadenar
+            sistema.demanda = EstimadorDemanda(reloj=lambda: reloj[0])
+            sistema.rebalanceador = Rebalanceador(sistema, sistema.demanda, activo=rebalanceo)
+            flota = generar_taxis_iniciales(taxis, sistema, registros=[])
+            sig_cliente = 0
+            vacio = 0.0
+            solicitado_en = {}
+            esperas = []
+            for tick in range(ticks):
+                reloj[0] = tick * SEGUNDOS_POR_TICK
+                nuevos = []
+                while rnd.random() < solicitudes_por_tick / (1 + solicitudes_por_tick):
+                    fx, fy = rnd.choice(FOCOS)
+                    origen = (min(1.0, max(0.0, rnd.gauss(fx, 0.05))), min(1.0, max(0.0, rnd.gauss(fy, 0.05))))
+                    destino = (rnd.random(), rnd.random())
+                    sig_cliente += 1
+                    nuevos.append(Cliente(sig_cliente, sistema, origen, destino))
+                    solicitado_en[sig_cliente] = reloj[0]
+                sistema.recibir_solicitudes_lote(nuevos)
+                sistema.procesar_solicitudes()
+                for taxi in flota:
+                    if taxi.paradas:
+                        for paso in range(PASOS_POR_TICK):
+                            previa, sin_pasajeros = taxi.ubicacion, not taxi.a_bordo
+                            parada = taxi.paradas[0] if taxi.paradas else None
+                            taxi.avanzar()
+                            if sin_pasajeros:
+                                vacio += distancia_euclidiana(previa, taxi.ubicacion)
+                            if parada is not None and parada[0] == RECOGER and parada[1] in taxi.a_bordo:
+                                esperas.append(reloj[0] + (paso + 1) * SEGUNDOS_POR_TICK / PASOS_POR_TICK
+                                               - solicitado_en.pop(parada[1].id_cliente))
+                    else:
+                        previa = taxi.ubicacion
+                        taxi.patrullar()
+                        vacio += distancia_euclidiana(previa, taxi.ubicacion)
+        finally:
+            os.chdir(cwd)
+    eta = sistema._m_eta_pickup
+    horas = ticks * SEGUNDOS_POR_TICK / 3600
+    finalizados = sistema._m_finalizados.valor
+    return {
+        "eta_media": eta.suma / eta.total if eta.total else 0.0,
+        "espera_media": sum(esperas) / len(esperas) if esperas else 0.0,
+        "reencoladas": sistema._m_reencoladas.valor,
+        "asignados": sistema._m_asignados.valor,
+        "finalizados": finalizados,
+        "viajes_taxi_hora": finalizados / (taxis * horas),
+        "vacio_por_viaje": vacio / finalizados if finalizados else 0.0,
+    }
+
+
+COMPARACIONES = {
+    "rebalanceo": (("patrulla", {"rebalanceo": False}), ("rebalanceo", {"rebalanceo": True})),
+    "pooling": (("individual", {"pooling": False}), ("compartido", {"pooling": True})),
+    "encadenado": (("solo_libres", {"encadenar": False}), ("encadenado", {"encadenar": True})),
+}
+DEFECTOS = {
+    "rebalanceo": {"taxis": 40, "ticks": 400, "demanda": 0.6},
+    "pooling": {"taxis": 15, "ticks": 600, "demanda": 1.5},
+    "encadenado": {"taxis": 25, "ticks": 600, "demanda": 1.0},
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comparación de políticas de despacho UNIETAXI")
+    parser.add_argument("comparacion", choices=sorted(COMPARACIONES))
+    parser.add_argument("--taxis", type=int, default=None)
+    parser.add_argument("--ticks", type=int, default=None)
+    parser.add_argument("--demanda", type=float, default=None, help="Solicitudes medias por tick")
+    parser.add_argument("--semilla", type=int, default=7)
+    args = parser.parse_args(argv)
+    defectos = DEFECTOS[args.comparacion]
+    taxis = args.taxis or defectos["taxis"]
+    ticks = args.ticks or defectos["ticks"]
+    demanda = args.demanda or defectos["demanda"]
+    for nombre, opciones in COMPARACIONES[args.comparacion]:
+        r = simular(taxis=taxis, ticks=ticks, semilla=args.semilla, solicitudes_por_tick=demanda, **opciones)
+        print(f"{nombre:<12} eta_media={r['eta_media']:6.3f}s espera_media={r['espera_media']:7.3f}s reencoladas={r['reencoladas']:6d} "
+              f"asignados={r['asignados']:5d} finalizados={r['finalizados']:5d} viajes/taxi-hora={r['viajes_taxi_hora']:7.1f} "
+              f"vacio/viaje={r['vacio_por_viaje']:.3f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
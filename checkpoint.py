@@ -0,0 +1,46 @@
+# checkpoint.py
+"""
+Checkpoint binario del estado del sistema para reinicios rápidos:
+- Viajes en el almacén columnar (almacen_viajes.ColumnasViajes: array.array por campo,
+  strings internados), contabilidad, ratings y secuencia de ids, serializados con pickle
+  protocolo 5. Restaurar no construye un dict por viaje.
+- Escritura atómica (archivo temporal + reemplazo); la periódica la programa planificador.py.
+- Restauración leyendo el archivo vía mmap (sin re-parsear JSON indentado).
+- Los viajes que estaban activos al guardar se ven como "interrumpido" (sus taxis
+  y clientes no sobreviven al reinicio).
+"""
+
+import mmap
+import os
+import pickle
+import time
+from pathlib import Path
+# Reexportados: los checkpoints ya escritos referencian checkpoint.ColumnasViajes al deserializar
+from almacen_viajes import ColumnasViajes, codificar_viajes
+
+DATA_DIR = Path("data")
+RUTA_CHECKPOINT = DATA_DIR / "estado.ckpt"
+VERSION_FORMATO = 1
+
+
+def guardar(estado, ruta=RUTA_CHECKPOINT):
+    """Escribe el estado (dict) de forma atómica con pickle protocolo 5."""
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump({"version": VERSION_FORMATO, "ts": time.time(), **estado}, f, protocol=5)
+    os.replace(tmp, ruta)
+    return ruta
+
+
+def cargar(ruta=RUTA_CHECKPOINT):
+    """Lee el checkpoint mapeándolo en memoria; None si no existe o es de otra versión."""
+    ruta = Path(ruta)
+    if not ruta.exists() or ruta.stat().st_size == 0:
+        return None
+    with open(ruta, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        estado = pickle.loads(mm)
+    if estado.get("version") != VERSION_FORMATO:
+        return None
+    return estado
@@ -10,6 +10,10 @@ import time
 import random
 
 class Cliente:
+    # Sin __dict__ por instancia: muchos clientes ocupan menos memoria
+    __slots__ = ("id_cliente", "sistema", "origen", "destino", "nombre", "tarjeta", "calificacion_media",
+                 "solicitud_enviada", "en_viaje", "admitido")
+
     def __init__(self, id_cliente, sistema, origen, destino, nombre=None, tarjeta="4111-xxxx-0000", calificacion_media=5.0, admitido=True):
         self.id_cliente = id_cliente
         self.sistema = sistema
@@ -0,0 +1,122 @@
+# contabilidad.py
+"""
+Libro contable de UNIETAXI:
+- Importes en céntimos enteros (sin deriva de floats): comisión de la empresa del 20%
+  redondeada al céntimo, el resto para el taxista.
+- Acumuladores por hilo (shards): finalizar un viaje no toma ningún lock global; los totales
+  se consolidan solo cuando se piden (cierre contable, reportes, GUI).
+- Lista de asientos pendientes para auditoría, volcable de forma incremental a JSON Lines; los
+  ya volcados se descartan de memoria (el archivo es el registro completo).
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+COMISION_EMPRESA_PCT = 20
+
+
+def a_centimos(euros):
+    """Convierte euros (float) a céntimos enteros redondeando al céntimo más cercano."""
+    return int(round(euros * 100))
+
+
+def a_euros(centimos):
+    return centimos / 100
+
+
+class _Shard:
+    """Acumulador de un solo hilo escritor."""
+    __slots__ = ("empresa", "por_taxi", "asientos")
+
+    def __init__(self):
+        self.empresa = 0
+        self.por_taxi = {}
+        self.asientos = []   # pendientes de volcar: (ts, viaje_id, taxi_id, costo, comision, pago) en céntimos
+
+
+class LibroContable:
+    def __init__(self, comision_pct=COMISION_EMPRESA_PCT):
+        self.comision_pct = comision_pct
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()  # solo alta de shards, consolidación y volcado
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def registrar_viaje(self, taxi_id, costo, viaje_id=None, ts=None):
+        """
+        Registra el cobro de un viaje (costo en euros) en el shard del hilo actual.
+        Devuelve el asiento (ts, viaje_id, taxi_id, costo, comision, pago) en céntimos.
+        """
+        costo_c = a_centimos(costo)
+        comision = (costo_c * self.comision_pct + 50) // 100
+        pago = costo_c - comision
+        asiento = (ts if ts is not None else time.time(), viaje_id, taxi_id, costo_c, comision, pago)
+        shard = self._shard()
+        shard.empresa += comision
+        shard.por_taxi[taxi_id] = shard.por_taxi.get(taxi_id, 0) + pago
+        shard.asientos.append(asiento)
+        return asiento
+
+    def cargar_saldos(self, empresa_centimos, por_taxi_centimos):
+        """Saldo de apertura (p. ej. restaurado de un checkpoint), sin asientos asociados."""
+        shard = _Shard()
+        shard.empresa = empresa_centimos
+        shard.por_taxi = dict(por_taxi_centimos)
+        with self._lock:
+            self._shards.append(shard)
+
+    def totales(self):
+        """Consolida los shards: (ganancia_empresa, {taxi_id: pago_acumulado}) en céntimos."""
+        with self._lock:
+            shards = list(self._shards)
+        empresa = 0
+        por_taxi = {}
+        for shard in shards:
+            empresa += shard.empresa
+            for tid, monto in dict(shard.por_taxi).items():
+                por_taxi[tid] = por_taxi.get(tid, 0) + monto
+        return empresa, por_taxi
+
+    def ganancia_empresa(self):
+        return a_euros(self.totales()[0])
+
+    def ganancias_por_taxi(self):
+        return {tid: a_euros(monto) for tid, monto in self.totales()[1].items()}
+
+    def asientos(self):
+        """Asientos aún no volcados, ordenados por instante."""
+        with self._lock:
+            shards = list(self._shards)
+        todos = []
+        for shard in shards:
+            todos.extend(shard.asientos[:])
+        todos.sort(key=lambda a: a[0])
+        return todos
+
+    def volcar_asientos(self, ruta):
+        """
+        Anexa a 'ruta' (JSON Lines) los asientos aún no volcados y los descarta del shard;
+        devuelve cuántos escribió.
+        """
+        ruta = Path(ruta)
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        escritos = 0
+        with self._lock, open(ruta, "a", encoding="utf-8") as f:
+            for shard in self._shards:
+                hasta = len(shard.asientos)
+                for ts, viaje_id, taxi_id, costo, comision, pago in shard.asientos[:hasta]:
+                    f.write(json.dumps({"ts": ts, "viaje_id": viaje_id, "taxi_id": taxi_id, "costo_cent": costo,
+                                        "comision_cent": comision, "pago_cent": pago}, separators=(",", ":")) + "\n")
+                    escritos += 1
+                # Borrar el prefijo es atómico frente al append del hilo dueño: lo anexado después queda
+                del shard.asientos[:hasta]
+        return escritos
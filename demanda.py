@@ -0,0 +1,124 @@
+# demanda.py
+"""
+Estimación de demanda y reposicionamiento de taxis libres:
+- EstimadorDemanda: conteo de solicitudes por celda de una rejilla celdas x celdas con
+  decaimiento exponencial (vida media configurable); se alimenta desde recibir_solicitud.
+  El decaimiento es perezoso: cada celda guarda (valor, instante) y se actualiza al tocarla.
+- Rebalanceador: reparte los taxis libres en proporción a la demanda esperada. Los taxis de
+  celdas con exceso de oferta se envían (el más cercano primero) a las celdas con déficit.
+  El plan se recalcula como mucho cada 'intervalo' segundos; sin demanda no hay plan y los
+  taxis siguen patrullando al azar.
+"""
+
+import heapq
+import math
+import threading
+import time
+
+CELDAS = 10
+VIDA_MEDIA = 120.0        # segundos para que una solicitud pese la mitad
+INTERVALO_PLAN = 1.0      # segundos entre recálculos del plan
+DEMANDA_MINIMA = 0.5      # por debajo de esta demanda total no se reposiciona
+
+
+def celda_de(punto, celdas=CELDAS):
+    """Celda (i, j) de la rejilla celdas x celdas que contiene el punto (coordenadas en [0,1])."""
+    x, y = punto
+    return min(celdas - 1, max(0, int(x * celdas))), min(celdas - 1, max(0, int(y * celdas)))
+
+
+class EstimadorDemanda:
+    def __init__(self, celdas=CELDAS, vida_media=VIDA_MEDIA, reloj=time.monotonic):
+        self.celdas = celdas
+        self.reloj = reloj
+        self._tasa = math.log(2) / vida_media
+        self._valores = {}  # celda -> (valor, instante)
+        self._lock = threading.Lock()
+
+    def celda(self, punto):
+        return celda_de(punto, self.celdas)
+
+    def centro(self, celda):
+        i, j = celda
+        return (i + 0.5) / self.celdas, (j + 0.5) / self.celdas
+
+    def registrar(self, punto, peso=1.0):
+        """Suma una solicitud (con el peso dado) en la celda del punto."""
+        c = self.celda(punto)
+        t = self.reloj()
+        with self._lock:
+            valor, t0 = self._valores.get(c, (0.0, t))
+            self._valores[c] = (valor * math.exp(-self._tasa * (t - t0)) + peso, t)
+
+    def demanda(self):
+        """celda -> demanda decaída al instante actual."""
+        t = self.reloj()
+        with self._lock:
+            items = list(self._valores.items())
+        return {c: valor * math.exp(-self._tasa * (t - t0)) for c, (valor, t0) in items}
+
+
+class Rebalanceador:
+    def __init__(self, sistema, estimador, intervalo=INTERVALO_PLAN, activo=True):
+        self.sistema = sistema
+        self.estimador = estimador
+        self.intervalo = intervalo
+        self.activo = activo  # False: patrulla aleatoria (comportamiento anterior)
+        self.plan = {}  # id_taxi -> punto objetivo
+        self._t_plan = None
+        self._lock = threading.Lock()
+
+    def destino(self, taxi):
+        """Punto hacia el que debe moverse el taxi libre, o None para patrullar en su zona."""
+        if not self.activo:
+            return None
+        t = self.estimador.reloj()
+        if self._t_plan is None or t - self._t_plan >= self.intervalo:
+            # Un solo hilo recalcula; el resto usa el plan vigente
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._t_plan = t
+                    self.plan = self.planificar()
+                finally:
+                    self._lock.release()
+        return self.plan.get(taxi.id_taxi)
+
+    def planificar(self):
+        """Calcula id_taxi -> centro de celda destino para los taxis sobrantes."""
+        demanda = self.estimador.demanda()
+        total = sum(demanda.values())
+        if total < DEMANDA_MINIMA:
+            return {}
+        with self.sistema.lock_taxis:
+            libres = [t for t in self.sistema.taxis_disponibles if not t.ocupado]
+        if not libres:
+            return {}
+
+        celda = self.estimador.celda
+        por_celda = {}
+        for taxi in libres:
+            por_celda.setdefault(celda(taxi.ubicacion), []).append(taxi)
+        objetivo = {c: d * len(libres) / total for c, d in demanda.items()}
+
+        # Sobrantes: taxis por encima del objetivo (redondeado hacia arriba) de su celda
+        sobrantes = []
+        for c, taxis in por_celda.items():
+            exceso = len(taxis) - math.ceil(objetivo.get(c, 0.0))
+            if exceso > 0:
+                sobrantes.extend(taxis[:exceso])
+        if not sobrantes:
+            return {}
+
+        plan = {}
+        deficits = sorted(((objetivo[c] - len(por_celda.get(c, ())), c) for c in objetivo), reverse=True)
+        for deficit, c in deficits:
+            faltan = int(deficit + 0.5)
+            if faltan <= 0 or not sobrantes:
+                break
+            cx, cy = self.estimador.centro(c)
+            elegidos = heapq.nsmallest(faltan, sobrantes,
+                                       key=lambda tx: (tx.ubicacion[0] - cx) ** 2 + (tx.ubicacion[1] - cy) ** 2)
+            for taxi in elegidos:
+                plan[taxi.id_taxi] = (cx, cy)
+            sobrantes = [tx for tx in sobrantes if tx.id_taxi not in plan]
+        return plan
@@ -0,0 +1,387 @@
+# formato_binario.py
+"""
+Formato binario compacto y versionado de los viajes (data/viajes.bin):
+- Cabecera fija: MAGIA, versión del formato, orden de bytes, número de viajes y longitud del
+  directorio; el directorio (JSON compacto) da tipo, desplazamiento y tamaño de cada bloque.
+- Un bloque de ancho fijo por columna del almacén (almacen_viajes.ColumnasViajes), alineado a
+  8 bytes; la tabla de textos como registros con prefijo de longitud; las claves extra en JSON.
+  Desde la versión 2 los bloques pueden reservar capacidad libre tras los datos.
+- ArchivoViajesBinario mantiene data/viajes.bin al día en su sitio: reserva capacidad al
+  reescribirlo y cada guardado solo escribe las filas nuevas o que cambiaron (el histórico no
+  se vuelve a escribir); al agotarse la capacidad se reescribe con más.
+- Lectura vía mmap: abrir() devuelve un ColumnasViajes cuyas columnas son memoryview sobre el
+  archivo, así solo se leen las páginas de las columnas que se tocan (contar finalizados lee
+  1 byte por viaje). El mapeo es copia-en-escritura: escribir en el almacén no toca el archivo;
+  marcar_bandera() parchea banderas (auditado) en su sitio sin reescribirlo.
+- Escritura atómica (temporal + reemplazo) desde uno o varios almacenes sin combinarlos.
+- Conversores en ambos sentidos con data/viajes.json (a-binario aplica las banderas de
+  data/auditorias.jsonl, que el JSON no reescribe en filas ya escritas):
+    python -m formato_binario a-binario data/viajes.json data/viajes.bin
+    python -m formato_binario a-json data/viajes.bin data/viajes.json
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from almacen_viajes import ColumnasViajes, CAMPOS_TEXTO, ESTADOS, escribir_json, leer_json
+from auditoria import viajes_auditados
+
+MAGIA = b"UTXV"
+VERSION_FORMATO = 2
+VERSIONES_LEGIBLES = (1, 2)           # la 1 no reserva capacidad: se lee igual
+CABECERA = struct.Struct("<4sHBxQI")  # magia, versión, big-endian, nº de viajes, long. directorio
+TIPOS = {"q": 8, "d": 8, "b": 1}      # tipos del archivo (independientes de la plataforma)
+ALINEACION = 8
+RUTA_VIAJES = Path("data") / "viajes.bin"
+FILAS_RESERVA = 4096                  # filas libres mínimas al reescribir con holgura
+BYTES_RESERVA = 64 * 1024             # ídem para la tabla de textos y las claves extra
+
+
+class FormatoInvalido(ValueError):
+    pass
+
+
+def _tipos_columnas():
+    """nombre de columna -> tipo en el archivo ('l' pasa a 'q': mide 4 bytes en algunas plataformas)."""
+    return {nombre: "q" if col.typecode == "l" else col.typecode for nombre, col in ColumnasViajes().columnas.items()}
+
+
+def _bloque(col, tipo):
+    """La columna tal cual si ya tiene el ancho del tipo del archivo; convertida si no."""
+    return col if col.itemsize == TIPOS[tipo] else array(tipo, col)
+
+
+def _relleno(pos):
+    return (-pos) % ALINEACION
+
+
+def _reserva(usado, minimo):
+    """Capacidad con margen para crecer: un 25% más y al menos 'minimo'."""
+    return usado + max(minimo, usado // 4)
+
+
+def _registros(textos):
+    """Tabla de textos: cada uno con su longitud en 4 bytes delante."""
+    return b"".join(struct.pack("<I", len(b)) + b for b in (s.encode("utf-8") for s in textos))
+
+
+def _json_extras(extras):
+    return json.dumps(extras, ensure_ascii=False, separators=(",", ":")).encode("utf-8") if extras else b""
+
+
+def _directorio(bloques, largo=None):
+    """Directorio en JSON compacto, con espacios hasta 'largo' (o hasta alinear). None si no cabe."""
+    directorio = json.dumps(bloques, separators=(",", ":")).encode("ascii")
+    if largo is None:
+        largo = len(directorio) + _relleno(CABECERA.size + len(directorio))
+    return directorio + b" " * (largo - len(directorio)) if len(directorio) <= largo else None
+
+
+def escribir(ruta, *almacenes):
+    """
+    Escribe los almacenes (uno tras otro, p. ej. histórico + viajes de la ejecución) en 'ruta'
+    con escritura atómica. Las columnas se vuelcan tal cual; solo se remapean las referencias
+    a textos de los almacenes que comparten tabla con otros. Devuelve el número de viajes.
+    """
+    return _escribir(ruta, almacenes)["n"]
+
+
+def _escribir(ruta, almacenes, holgura=False):
+    """
+    escribir() con, si 'holgura', capacidad de sobra en columnas, textos, claves extra y
+    directorio (ArchivoViajesBinario los completa en su sitio). Devuelve la disposición escrita.
+    """
+    ruta = Path(ruta)
+    ruta.parent.mkdir(parents=True, exist_ok=True)
+    textos, indice = [], {}
+    remapeos = {}  # id(tabla de textos) -> remapeo (los tramos de un almacén comparten la suya)
+    for alm in almacenes:
+        if id(alm.textos) in remapeos:
+            continue
+        remapeo = []
+        for s in alm.textos:
+            k = indice.get(s)
+            if k is None:
+                k = indice[s] = len(textos)
+                textos.append(s)
+            remapeo.append(k)
+        remapeos[id(alm.textos)] = remapeo
+    n = sum(len(alm) for alm in almacenes)
+    capacidad = _reserva(n, FILAS_RESERVA) if holgura else n
+    tipos = _tipos_columnas()
+    tabla = _registros(textos)
+    extras, base = {}, 0
+    for alm in almacenes:
+        for i, otros in alm.extras.items():
+            extras[str(base + i)] = otros
+        base += len(alm)
+    extras_b = _json_extras(extras)
+
+    # Directorio: desplazamientos relativos al inicio de los datos (tras cabecera + directorio)
+    bloques, pos = {}, 0
+    for nombre, tipo in tipos.items():
+        tam = capacidad * TIPOS[tipo]
+        bloques[nombre] = [tipo, pos, tam]
+        pos += tam + _relleno(tam)
+    cap_textos = _reserva(len(tabla), BYTES_RESERVA) if holgura else len(tabla)
+    bloques["_textos"] = ["", pos, len(tabla), len(textos), cap_textos]
+    pos += cap_textos + _relleno(cap_textos)
+    cap_extras = _reserva(len(extras_b), BYTES_RESERVA) if holgura else len(extras_b)
+    bloques["_extras"] = ["", pos, len(extras_b), cap_extras]
+    fin = pos + cap_extras
+    directorio = _directorio(bloques)
+    if holgura:  # que el directorio quepa al crecer los números
+        directorio = _directorio(bloques, len(directorio) + 64)
+    datos = CABECERA.size + len(directorio)
+    identidad = {t for t, remapeo in remapeos.items() if remapeo == list(range(len(remapeo)))}
+
+    tmp = ruta.with_name(ruta.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(CABECERA.pack(MAGIA, VERSION_FORMATO, sys.byteorder == "big", n, len(directorio)))
+        f.write(directorio)
+        for nombre, tipo in tipos.items():
+            for alm in almacenes:
+                col = alm.columnas[nombre]
+                if nombre in CAMPOS_TEXTO and id(alm.textos) not in identidad:
+                    col = array("q", (remapeos[id(alm.textos)][k] for k in col))
+                f.write(_bloque(col, tipo))
+            f.seek(datos + bloques[nombre][1] + bloques[nombre][2] + _relleno(bloques[nombre][2]))  # hueco sin escribir
+        f.write(tabla)
+        f.seek(datos + bloques["_extras"][1])
+        f.write(extras_b)
+        f.truncate(datos + fin)
+    os.replace(tmp, ruta)
+    return {"n": n, "capacidad": capacidad, "bloques": bloques, "largo_directorio": len(directorio),
+            "datos": datos, "textos": indice, "remapeos": remapeos, "extras": extras}
+
+
+def abrir(ruta):
+    """
+    Mapea 'ruta' y devuelve un ColumnasViajes perezoso (columnas memoryview sobre el archivo).
+    No se le pueden agregar viajes; para eso, copiar() o extender() otro almacén con él.
+    """
+    with open(ruta, "rb") as f:
+        if os.fstat(f.fileno()).st_size < CABECERA.size:
+            raise FormatoInvalido(f"{ruta}: archivo truncado")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    magia, version, big, n, long_dir = CABECERA.unpack_from(mm, 0)
+    if magia != MAGIA:
+        raise FormatoInvalido(f"{ruta}: no es un archivo de viajes UNIETAXI")
+    if version not in VERSIONES_LEGIBLES:
+        raise FormatoInvalido(f"{ruta}: versión {version} no soportada")
+    bloques = json.loads(bytes(mm[CABECERA.size:CABECERA.size + long_dir]))
+    datos = CABECERA.size + long_dir
+    vista = memoryview(mm)
+    otro_orden = big != (sys.byteorder == "big")
+
+    columnas = {}
+    for nombre, (tipo, desde, *_) in bloques.items():
+        if nombre.startswith("_"):
+            continue
+        col = vista[datos + desde:datos + desde + n * TIPOS[tipo]].cast(tipo)  # sin la capacidad libre
+        if otro_orden and TIPOS[tipo] > 1:  # archivo de otra arquitectura: se decodifica completo
+            col = array(tipo, col.tobytes())
+            col.byteswap()
+        columnas[nombre] = col
+
+    _, desde, tam, cuantos, *_ = bloques["_textos"]
+    textos, pos = [], datos + desde
+    for _ in range(cuantos):
+        (largo,) = struct.unpack_from("<I", mm, pos)
+        textos.append(bytes(mm[pos + 4:pos + 4 + largo]).decode("utf-8"))
+        pos += 4 + largo
+    _, desde, tam, *_ = bloques["_extras"]
+    extras = {int(i): v for i, v in json.loads(bytes(mm[datos + desde:datos + desde + tam])).items()} if tam else {}
+
+    almacen = ColumnasViajes.__new__(ColumnasViajes)
+    almacen.__setstate__({"columnas": columnas, "textos": textos, "extras": extras})
+    if len(almacen) != n:
+        raise FormatoInvalido(f"{ruta}: {len(almacen)} viajes en columnas, {n} en la cabecera")
+    return almacen
+
+
+def marcar_bandera(ruta, columna, posiciones):
+    """
+    Pone a 1 la bandera 'columna' (p. ej. "auditado") de los viajes en 'posiciones' directamente
+    en el archivo, sin reescribirlo. Ignora posiciones fuera del archivo; devuelve cuántas marcó.
+    """
+    with open(ruta, "r+b") as f:
+        cabecera = f.read(CABECERA.size)
+        if len(cabecera) < CABECERA.size:
+            raise FormatoInvalido(f"{ruta}: archivo truncado")
+        magia, version, _, n, long_dir = CABECERA.unpack(cabecera)
+        if magia != MAGIA or version not in VERSIONES_LEGIBLES:
+            raise FormatoInvalido(f"{ruta}: no es un archivo de viajes UNIETAXI v{VERSION_FORMATO}")
+        tipo, desde, *_ = json.loads(f.read(long_dir))[columna]
+        if tipo != "b":
+            raise FormatoInvalido(f"{ruta}: {columna} no es una columna de banderas")
+        marcadas = 0
+        for i in sorted(set(posiciones)):
+            if 0 <= i < n:
+                f.seek(CABECERA.size + long_dir + desde + i)
+                f.write(b"\x01")
+                marcadas += 1
+    return marcadas
+
+
+class ArchivoViajesBinario:
+    """
+    Un viajes.bin que se actualiza en su sitio, con el protocolo de
+    almacen_viajes.ArchivoViajesJSON: pendiente() con lock_persistencia, las filas desde ahí
+    copiadas con lock_viajes (tramo()) y guardar() sin él. Se reescribe entero, con capacidad de
+    sobra, la primera vez, si el archivo cambió por fuera o al agotarse la capacidad; los demás
+    guardados escriben en su sitio solo las filas nuevas o que cambiaron, los textos nuevos, las
+    claves extra si cambiaron, el directorio y el número de viajes de la cabecera.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = Path(ruta)
+        self._base = None         # (historico, viajes, len(historico)) de la última escritura
+        self._firma = None        # (tamaño, mtime) del archivo tras la última escritura
+        self._filas = 0           # filas de 'viajes' en el archivo
+        self._estables = 0        # de ellas, las que no cambiaron desde entonces
+        self._disposicion = None  # la de _escribir(), al día con los parches
+
+    def _firma_actual(self):
+        try:
+            st = self.ruta.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_size, st.st_mtime_ns)
+
+    def pendiente(self, historico, viajes):
+        """Primera fila de 'viajes' que necesita el próximo guardar() (0 si se reescribirá entero)."""
+        base = self._base
+        if (base is None or base[0] is not historico or base[1] is not viajes or base[2] != len(historico)
+                or self._firma_actual() != self._firma or len(viajes) < self._filas):
+            self._base = None
+            return 0
+        return min(self._estables, self._filas)
+
+    def guardar(self, historico, viajes, desde, cola, estables):
+        """
+        Lleva el archivo al contenido de escribir(ruta, historico, viajes). 'cola' son las filas
+        de 'viajes' desde 'desde' (el valor de pendiente()), copiadas con lock_viajes; 'estables'
+        es cuántas filas iniciales de 'viajes' ya no cambiarán. Devuelve True si lo reescribió.
+        """
+        completo = self._base is None or not self._parchear(len(historico) + desde, cola)
+        if completo:
+            # Las filas de 'viajes' antes de 'desde' ya no cambian: se leen sin lock
+            partes = (historico, viajes.tramo(0, desde), cola) if desde else (historico, cola)
+            self._disposicion = _escribir(self.ruta, partes, holgura=True)
+        self._filas = desde + len(cola)
+        self._firma = self._firma_actual()
+        self._base = (historico, viajes, len(historico))
+        self._estables = min(estables, self._filas)
+        return completo
+
+    def _parchear(self, base, cola):
+        """Escribe 'cola' desde la fila 'base' del archivo; False (sin tocarlo) si no cabe."""
+        d = self._disposicion
+        n = base + len(cola)
+        bloques = d["bloques"]
+        if n > d["capacidad"]:
+            return False
+        remapeo = d["remapeos"].setdefault(id(cola.textos), [])  # tabla de textos de 'viajes'
+        nuevos = []
+        for s in cola.textos[len(remapeo):]:
+            k = d["textos"].get(s)
+            if k is None:
+                k = d["textos"][s] = len(d["textos"])
+                nuevos.append(s)
+            remapeo.append(k)
+        tabla = _registros(nuevos)
+        _, pos_textos, usados, cuantos, cap_textos = bloques["_textos"]
+        extras = d["extras"]
+        cambiadas = [k for k in extras if int(k) >= base]
+        for k in cambiadas:
+            del extras[k]
+        for i, otros in cola.extras.items():
+            extras[str(base + i)] = otros
+        extras_b = _json_extras(extras) if cambiadas or cola.extras else None
+        if usados + len(tabla) > cap_textos or (extras_b is not None and len(extras_b) > bloques["_extras"][3]):
+            return False
+        bloques["_textos"][2:4] = [usados + len(tabla), cuantos + len(nuevos)]
+        if extras_b is not None:
+            bloques["_extras"][2] = len(extras_b)
+        directorio = _directorio(bloques, d["largo_directorio"])
+        if directorio is None:
+            return False
+
+        datos = d["datos"]
+        with open(self.ruta, "r+b") as f:
+            for nombre, (tipo, desde, *_) in bloques.items():
+                if nombre.startswith("_"):
+                    continue
+                col = cola.columnas[nombre]
+                if nombre in CAMPOS_TEXTO:
+                    col = array("q", (remapeo[k] for k in col))
+                f.seek(datos + desde + base * TIPOS[tipo])
+                f.write(_bloque(col, tipo))
+            if tabla:
+                f.seek(datos + pos_textos + usados)
+                f.write(tabla)
+            if extras_b is not None:
+                f.seek(datos + bloques["_extras"][1])
+                f.write(extras_b)
+            f.seek(0)  # cabecera y directorio al final: un lector no ve filas aún sin escribir
+            f.write(CABECERA.pack(MAGIA, VERSION_FORMATO, sys.byteorder == "big", n, len(directorio)))
+            f.write(directorio)
+        d["n"] = n
+        return True
+
+    def marcar_bandera(self, columna, posiciones):
+        """marcar_bandera() en este archivo sin que el próximo guardado lo tome por cambiado por fuera."""
+        vigente = self._base is not None and self._firma_actual() == self._firma
+        marcadas = marcar_bandera(self.ruta, columna, posiciones)
+        if vigente:
+            self._firma = self._firma_actual()
+        return marcadas
+
+
+def contar_estado(ruta, estado="finalizado"):
+    """Cuenta los viajes en 'estado' leyendo solo la columna de estados."""
+    ruta = Path(ruta)
+    if not ruta.exists():
+        return 0
+    return abrir(ruta).columnas["estado"].tobytes().count(bytes([ESTADOS.index(estado)]))
+
+
+def json_a_binario(ruta_json, ruta_bin, ruta_auditorias=None):
+    """
+    Convierte un viajes.json (lista de dicts) al formato binario, con las banderas de
+    auditoría del registro (por defecto el auditorias.jsonl junto al JSON); devuelve el número
+    de viajes.
+    """
+    ruta_json = Path(ruta_json)
+    auditados = viajes_auditados(ruta_auditorias or ruta_json.with_name("auditorias.jsonl"))
+    return escribir(ruta_bin, leer_json(ruta_json, auditados))
+
+
+def binario_a_json(ruta_bin, ruta_json):
+    """Convierte un viajes.bin al JSON indentado de siempre; devuelve el número de viajes."""
+    almacen = abrir(ruta_bin)
+    with open(ruta_json, "w", encoding="utf-8") as f:
+        escribir_json(f, almacen)
+    return len(almacen)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Conversión de viajes entre JSON y el formato binario")
+    parser.add_argument("sentido", choices=("a-binario", "a-json"))
+    parser.add_argument("origen")
+    parser.add_argument("destino")
+    args = parser.parse_args(argv)
+    convertir = json_a_binario if args.sentido == "a-binario" else binario_a_json
+    n = convertir(args.origen, args.destino)
+    print(f"{n} viajes: {args.origen} -> {args.destino}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,29 +1,34 @@
 # gui.py
 """
 Interfaz gráfica de UNIETAXI (Tkinter).
-- Mapa con clientes (origen/destino) y taxis (libres/ocupados).
+- Mapa con clientes (origen/destino) y taxis (libres/ocupados), con pan/zoom y nivel de detalle (mapa.py).
 - Panel de estado y acciones (solicitar taxi, seguimiento, cierre, reporte).
 - Pestaña de viajes activos (lista con ETA, progreso, costo, placa, conductor).
 - Botón de detalle de viaje seleccionado (popup con información completa).
 - Indicadores contables y pagos acumulados por taxi (incluye rating).
 - Pestañas de afiliaciones (con filtros) y reportes de calidad.
+- Historial de solicitudes acotado en pantalla y paginado desde el log (historial.py).
+- Pestaña de zonas: solicitudes por minuto, atención y espera media (analitica.py).
 """
 
-import json
-from pathlib import Path
+import itertools
 import tkinter as tk
 from tkinter import ttk, messagebox
 import random
-from utils import to_canvas_coords, distancia_euclidiana
+from mapa import RenderizadorMapa
+from historial import HistorialSolicitudes
 
 MAP_WIDTH = 900
 MAP_HEIGHT = 560
 PADDING = 20
 
-historial_solicitudes = []
-HISTORIAL_FILE = Path("data/historial.json")
+VENTANA_HISTORIAL = 20      # eventos visibles en el panel de historial
+LINEAS_POR_EVENTO = 8
+TAM_PAGINA_HISTORIAL = 50   # eventos por página en "Ver historial"
+
+def iniciar_gui(sistema, clientes, taxis, afiliador, reportes, historial=None):
+    historial = historial or HistorialSolicitudes()
 
-def iniciar_gui(sistema, clientes, taxis, afiliador, reportes):
     # Ventana base
     root = tk.Tk()
     root.title("UNIETAXI - Simulación completa")
@@ -56,7 +61,7 @@ def iniciar_gui(sistema, clientes, taxis, afiliador, reportes):
 
     # Botones principales
     btn_solicitar = ttk.Button(tab_estado, text="Generar solicitud de taxi (cliente aleatorio)")
-    btn_seguimiento = ttk.Button(tab_estado, text="Ejecutar seguimiento calidad (5 servicios)")
+    btn_seguimiento = ttk.Button(tab_estado, text="Ejecutar seguimiento calidad (cuota diaria)")
     btn_cerrar = ttk.Button(tab_estado, text="Cerrar contabilidad ahora")
     btn_reporte_mensual = ttk.Button(tab_estado, text="Generar reporte mensual")
     btn_solicitar.pack(fill="x", pady=4)
@@ -125,87 +130,49 @@ def iniciar_gui(sistema, clientes, taxis, afiliador, reportes):
         tree_calidad.column(c, width=160, anchor="center")
     tree_calidad.pack(fill="both", expand=True, pady=5)
 
-    # Dibujo del mapa
-    def draw_grid():
-        """Dibuja una cuadrícula ligera en el canvas para referencia visual."""
-        for i in range(10):
-            canvas.create_line(PADDING, PADDING + i * (MAP_HEIGHT - 2 * PADDING) / 9,
-                               MAP_WIDTH - PADDING, PADDING + i * (MAP_HEIGHT - 2 * PADDING) / 9,
-                               fill="#f0f0f0")
-            canvas.create_line(PADDING + i * (MAP_WIDTH - 2 * PADDING) / 9, PADDING,
-                               PADDING + i * (MAP_WIDTH - 2 * PADDING) / 9, MAP_HEIGHT - PADDING,
-                               fill="#f0f0f0")
-
-    def draw_entities():
-        """Dibuja clientes y taxis; muestra coordenadas origen→destino por cliente."""
-        canvas.delete("all")
-        draw_grid()
-
-        # Clientes: origen (color por estado) y destino azul
-        for cliente in clientes:
-            ox, oy = to_canvas_coords(*cliente.origen, MAP_WIDTH, MAP_HEIGHT, PADDING)
-            dx, dy = to_canvas_coords(*cliente.destino, MAP_WIDTH, MAP_HEIGHT, PADDING)
-            color = "purple" if cliente.en_viaje else ("green" if cliente.solicitud_enviada else "gray")
-            canvas.create_oval(ox - 6, oy - 6, ox + 6, oy + 6, fill=color, outline="")
-            canvas.create_oval(dx - 5, dy - 5, dx + 5, dy + 5, fill="blue", outline="")
-            canvas.create_text(ox + 10, oy - 12, text=f"C{cliente.id_cliente} ({cliente.origen}→{cliente.destino})", fill="#333", anchor="w")
-
-            # Mostrar texto explicativo si el cliente tiene viaje activo
-            for viaje in sistema.listar_viajes_activos():
-                if viaje["cliente_id"] == cliente.id_cliente:
-                    taxi_id = viaje["taxi_id"]
-                    taxi = next((t for t in taxis if t.id_taxi == taxi_id), None)
-                    if taxi:
-                        distancia = distancia_euclidiana(cliente.origen, taxi.ubicacion)
-                        texto = (
-                            f"C{cliente.id_cliente} pidió taxi\n"
-                            f"Origen: {cliente.origen}\n"
-                            f"Destino: {cliente.destino}\n"
-                            f"Taxi asignado: T{taxi_id} ({taxi.placa})\n"
-                            f"Distancia al taxi: {distancia:.3f}"
-                        )
-                        canvas.create_text(ox + 10, oy + 12, text=texto, fill="black", anchor="nw", font=("Arial", 8))
-
-        # Taxis: triángulos; naranja si ocupados, amarillo si libres
-        for taxi in taxis:
-            tx, ty = to_canvas_coords(*taxi.ubicacion, MAP_WIDTH, MAP_HEIGHT, PADDING)
-            points = [tx, ty - 9, tx - 9, ty + 9, tx + 9, ty + 9]
-            color = "orange" if taxi.ocupado else "yellow"
-            canvas.create_polygon(points, fill=color, outline="#444")
-            canvas.create_text(tx + 12, ty - 12, text=f"T{taxi.id_taxi} ({taxi.calificacion:.1f})", fill="#333", anchor="w")
+    # Tab: Zonas (analítica en ventanas deslizantes)
+    tab_zonas = ttk.Frame(notebook)
+    notebook.add(tab_zonas, text="Zonas")
+    lbl_zonas = ttk.Label(tab_zonas, text="", anchor="w")
+    lbl_zonas.pack(fill="x", pady=4)
+    cols_z = ("zona", "sol_min_1m", "sol_min_5m", "sol_min_60m", "atencion_5m", "espera_5m")
+    tree_zonas = ttk.Treeview(tab_zonas, columns=cols_z, show="headings", height=15)
+    for c in cols_z:
+        tree_zonas.heading(c, text=c.capitalize())
+        tree_zonas.column(c, width=110, anchor="center")
+    tree_zonas.pack(fill="both", expand=True, pady=5)
+
+    # Dibujo del mapa (pan/zoom, culling y nivel de detalle)
+    mapa = RenderizadorMapa(canvas, sistema, MAP_WIDTH, MAP_HEIGHT, PADDING)
+
+    def draw_entities(snap=None):
+        """Actualiza el mapa (solo entidades visibles que cambiaron) y el resumen de estado."""
+        snap = snap or sistema.obtener_snapshot()
+        mapa.dibujar(snap)
 
         # Info de estado global
-        info_var.set(f"Solicitudes en cola: {sistema.num_solicitudes()} | Viajes activos: {sistema.viajes_activos()} | Ganancia empresa: €{sistema.ganancia_empresa:.2f}")
-
-    def guardar_historial():
-        HISTORIAL_FILE.parent.mkdir(exist_ok=True)  # crea carpeta data si no existe
-        with open(HISTORIAL_FILE, "w", encoding="utf-8") as f:
-            json.dump(historial_solicitudes, f, ensure_ascii=False, indent=2)
+        info_var.set(f"Solicitudes en cola: {snap.num_solicitudes} | Viajes activos: {len(snap.viajes_activos)} | Ganancia empresa: €{snap.ganancia_empresa:.2f}")
 
-    # Función para registrar en historial
     def registrar_en_historial(viaje_info, cliente, taxi):
-        global historial_solicitudes
-        distancia = distancia_euclidiana(cliente.origen, taxi.ubicacion)
-        texto = (
-            f"🟢 Cliente C{cliente.id_cliente} pidió taxi\n"
-            f"Origen: {cliente.origen}\n"
-            f"Destino: {cliente.destino}\n"
-            f"Taxi asignado: T{taxi.id_taxi} ({taxi.placa})\n"
-            f"Conductor: {taxi.nombre_conductor}\n"
-            f"ETA recogida: {viaje_info['eta_pickup']:.1f}s\n"
-            f"Distancia al taxi: {distancia:.3f}\n"
-            f"-----------------------------\n"
-        )
+        """Registra la asignación como evento estructurado y muestra solo la ventana reciente."""
+        evento = historial.registrar_asignacion(viaje_info, cliente, taxi)
+        texto = HistorialSolicitudes.formatear(evento)
         solicitud_info_var.set(texto)
         historial_text.config(state="normal")
         historial_text.insert("end", texto)
+        # Ventana acotada: descarta las entradas más antiguas del widget
+        lineas = int(historial_text.index("end-1c").split(".")[0])
+        sobrantes = lineas - VENTANA_HISTORIAL * LINEAS_POR_EVENTO
+        if sobrantes > 0:
+            historial_text.delete("1.0", f"{sobrantes + 1}.0")
+        historial_text.see("end")
         historial_text.config(state="disabled")
-        historial_solicitudes.append(texto)
-
-        guardar_historial()
 
     def mostrar_historial():
-        if not historial_solicitudes:
+        """Ventana con el log completo, paginado y leído de forma perezosa."""
+        eventos = historial.iterar_log()
+        primera = list(itertools.islice(eventos, TAM_PAGINA_HISTORIAL))
+        if not primera:
             messagebox.showinfo("UNIETAXI", "No hay solicitudes registradas todavía.")
             return
         ventana = tk.Toplevel(root)
@@ -213,63 +180,118 @@ def iniciar_gui(sistema, clientes, taxis, afiliador, reportes):
         ventana.geometry("500x400")
         text_box = tk.Text(ventana, wrap="word")
         text_box.pack(fill="both", expand=True)
-        for entrada in historial_solicitudes:
-            text_box.insert("end", entrada + "\n")
-        text_box.config(state="disabled")
-
-    def refrescar_viajes():
-        """Rellena tabla de viajes activos y actualiza indicadores contables/pagos."""
-        tree_viajes.delete(*tree_viajes.get_children())
-        activos = sistema.listar_viajes_activos()
-        for v in activos:
-            viaje_id = f"{v['cliente_id']}-{v['taxi_id']}"
-            eta = sistema.calcular_eta(v)
-            progreso = f"{int(v.get('progreso', 0) * 100)}%"
-            costo = f"€{v['costo_estimado']:.2f}"
-            tree_viajes.insert("", "end", values=(
-                viaje_id, v['cliente_id'], v['taxi_id'], f"{eta:.1f}s", progreso, costo, v['placa_taxi'], v['conductor']
-            ))
-
-        tree_pagos.delete(*tree_pagos.get_children())
-        lbl_ganancia.config(text=f"Ganancia empresa: €{sistema.ganancia_empresa:.2f}")
-        for tid, monto in sistema.ganancias_por_taxi.items():
-            prom, n = sistema.rating_taxi.get(int(tid), (0.0, 0))
-            tree_pagos.insert("", "end", values=(tid, f"€{monto:.2f}", f"{prom:.2f} ({n})"))
+        btn_mas = ttk.Button(ventana, text="Cargar más")
+        btn_mas.pack(fill="x")
+
+        def agregar(pagina):
+            text_box.config(state="normal")
+            for evento in pagina:
+                text_box.insert("end", HistorialSolicitudes.formatear(evento) + "\n")
+            text_box.config(state="disabled")
+            if len(pagina) < TAM_PAGINA_HISTORIAL:
+                btn_mas.config(state="disabled")
+
+        btn_mas.configure(command=lambda: agregar(list(itertools.islice(eventos, TAM_PAGINA_HISTORIAL))))
+        agregar(primera)
+
+    # Filas mostradas por tabla (iid -> valores) y versiones ya reflejadas por pestaña
+    filas_mostradas = {}
+    versiones_vistas = {}
+
+    def sincronizar_tree(tree, filas):
+        """
+        Aplica a la tabla solo las diferencias con 'filas' (iid -> valores):
+        inserta nuevas, borra ausentes y actualiza las que cambiaron.
+        Conserva selección y scroll de las filas que siguen presentes.
+        """
+        previas = filas_mostradas.setdefault(str(tree), {})
+        sobrantes = [iid for iid in previas if iid not in filas]
+        if sobrantes:
+            tree.delete(*sobrantes)
+        for iid, valores in filas.items():
+            anterior = previas.get(iid)
+            if anterior is None:
+                tree.insert("", "end", iid=iid, values=valores)
+            elif anterior != valores:
+                tree.item(iid, values=valores)
+        filas_mostradas[str(tree)] = filas
+
+    def sin_cambios(clave, version):
+        """True si la pestaña 'clave' ya refleja 'version'; si no, la registra como vista."""
+        if versiones_vistas.get(clave) == version:
+            return True
+        versiones_vistas[clave] = version
+        return False
+
+    def refrescar_viajes(snap=None):
+        """Sincroniza tabla de viajes activos e indicadores contables/pagos si hubo cambios."""
+        snap = snap or sistema.obtener_snapshot()
+        if not sin_cambios("viajes", snap.version_viajes):
+            filas = {}
+            for v in snap.viajes_activos:
+                viaje_id = f"{v['cliente_id']}-{v['taxi_id']}"
+                eta = sistema.calcular_eta(v)
+                progreso = f"{int(v.get('progreso', 0) * 100)}%"
+                costo = f"€{v['costo_estimado']:.2f}"
+                filas[f"viaje-{v['id']}"] = (
+                    viaje_id, v['cliente_id'], v['taxi_id'], f"{eta:.1f}s", progreso, costo, v['placa_taxi'], v['conductor']
+                )
+            sincronizar_tree(tree_viajes, filas)
+
+        if not sin_cambios("pagos", snap.version_contabilidad):
+            lbl_ganancia.config(text=f"Ganancia empresa: €{snap.ganancia_empresa:.2f}")
+            filas = {}
+            for tid, monto in snap.ganancias_por_taxi.items():
+                prom, n = snap.rating_taxi.get(int(tid), (0.0, 0))
+                filas[f"taxi-{tid}"] = (tid, f"€{monto:.2f}", f"{prom:.2f} ({n})")
+            sincronizar_tree(tree_pagos, filas)
 
     def refrescar_afiliaciones():
-        """Actualiza tabla de afiliaciones con filtro de estado."""
-        tree_afiliaciones.delete(*tree_afiliaciones.get_children())
+        """Sincroniza tabla de afiliaciones con filtro de estado (solo si cambió el registro o el filtro)."""
         filtro = estado_var.get()
-        for c in afiliador.registro_clientes:
+        if sin_cambios("afiliaciones", (afiliador.version, filtro)):
+            return
+        filas = {}
+        for idx, c in enumerate(afiliador.registro_clientes):
             if filtro != "todos" and c["estado"] != filtro:
                 continue
-            tree_afiliaciones.insert("", "end", values=("cliente", c["id"], c["estado"], c["motivo"]))
-        for t in afiliador.registro_taxis:
+            filas[f"cliente-{idx}"] = ("cliente", c["id"], c["estado"], c["motivo"])
+        for idx, t in enumerate(afiliador.registro_taxis):
             if filtro != "todos" and t["estado"] != filtro:
                 continue
-            tree_afiliaciones.insert("", "end", values=("taxi", t["id"], t["estado"], t["motivo"]))
-
-    def refrescar_calidad():
-        """Actualiza tabla de reportes de calidad (promedios y cantidad)."""
-        tree_calidad.delete(*tree_calidad.get_children())
-        por_taxi = sistema.agregacion_calidad_por_taxi()
-        for taxi_id, (prom, cant) in por_taxi.items():
-            tree_calidad.insert("", "end", values=("taxi", taxi_id, f"{prom:.2f}", cant))
-        por_cliente = sistema.agregacion_calidad_por_cliente()
-        for cliente_id, (prom, cant) in por_cliente.items():
-            tree_calidad.insert("", "end", values=("cliente", cliente_id, f"{prom:.2f}", cant))
+            filas[f"taxi-{idx}"] = ("taxi", t["id"], t["estado"], t["motivo"])
+        sincronizar_tree(tree_afiliaciones, filas)
 
-    def tick():
-        # Procesar cola de solicitudes desde el hilo principal
-        sistema.procesar_solicitudes(callback_historial=registrar_en_historial)
-
-        # Refrescar UI
-        draw_entities()
-        refrescar_viajes()
-        refrescar_afiliaciones()
-        refrescar_calidad()
-
-        root.after(1000, tick)
+    def refrescar_calidad(snap=None):
+        """Sincroniza tabla de reportes de calidad (promedios y cantidad) si hubo viajes finalizados."""
+        snap = snap or sistema.obtener_snapshot()
+        if sin_cambios("calidad", snap.version_contabilidad):
+            return
+        filas = {}
+        for taxi_id, (prom, cant) in snap.calidad_por_taxi.items():
+            filas[f"taxi-{taxi_id}"] = ("taxi", taxi_id, f"{prom:.2f}", cant)
+        for cliente_id, (prom, cant) in snap.calidad_por_cliente.items():
+            filas[f"cliente-{cliente_id}"] = ("cliente", cliente_id, f"{prom:.2f}", cant)
+        sincronizar_tree(tree_calidad, filas)
+
+    def refrescar_zonas():
+        """Sincroniza la tabla de zonas con la analítica de 1, 5 y 60 minutos."""
+        analitica = sistema.analitica
+        por_ventana = {v: analitica.consultar(v) for v in (60, 300, 3600)}
+        t = analitica.total(300)
+        atencion = "-" if t.ratio_atencion is None else f"{t.ratio_atencion:.0%}"
+        espera = "-" if t.espera_media is None else f"{t.espera_media:.1f}s"
+        lbl_zonas.config(text=f"Últimos 5 min: {t.solicitudes_por_minuto:.1f} sol/min | Atención: {atencion} | Espera media: {espera}")
+        filas = {}
+        for zona in sorted(por_ventana[3600]):
+            z5 = por_ventana[300].get(zona)
+            filas[f"zona-{zona[0]}-{zona[1]}"] = (
+                f"({zona[0]}, {zona[1]})",
+                *(f"{por_ventana[v][zona].solicitudes_por_minuto:.2f}" if zona in por_ventana[v] else "0.00" for v in (60, 300, 3600)),
+                "-" if z5 is None or z5.ratio_atencion is None else f"{z5.ratio_atencion:.0%}",
+                "-" if z5 is None or z5.espera_media is None else f"{z5.espera_media:.1f}s",
+            )
+        sincronizar_tree(tree_zonas, filas)
 
     def solicitar_cliente_aleatorio():
         candidatos = [c for c in clientes if c.admitido and not c.solicitud_enviada]
@@ -289,9 +311,10 @@ def iniciar_gui(sistema, clientes, taxis, afiliador, reportes):
         refrescar_viajes()
 
     def seguimiento_aleatorio():
-        """Marca hasta 5 viajes finalizados como auditados."""
-        sistema.seguimiento_calidad()
-        messagebox.showinfo("UNIETAXI", "Seguimiento de 5 servicios finalizados ejecutado.")
+        """Audita la muestra de viajes finalizados hasta la cuota del día."""
+        auditados = sistema.seguimiento_calidad()
+        messagebox.showinfo("UNIETAXI", f"Seguimiento de {auditados} servicios finalizados ejecutado "
+                                        f"({sistema.auditoria.restantes} restantes hoy).")
         refrescar_calidad()
 
     def generar_reporte_mensual():
@@ -328,12 +351,16 @@ def iniciar_gui(sistema, clientes, taxis, afiliador, reportes):
     btn_detalle.configure(command=ver_detalle_viaje)
     btn_ver_historial.configure(command=mostrar_historial)
 
-    # Refresco periódico
+    # Despacho y refresco periódico: la cola se procesa desde el hilo principal y la vista se
+    # pinta con un único snapshot inmutable por tick, sin tocar los locks del sistema
     def tick():
-        draw_entities()
-        refrescar_viajes()
+        sistema.procesar_solicitudes(callback_historial=registrar_en_historial)
+        snap = sistema.obtener_snapshot()
+        draw_entities(snap)
+        refrescar_viajes(snap)
         refrescar_afiliaciones()
-        refrescar_calidad()
+        refrescar_calidad(snap)
+        refrescar_zonas()
         root.after(1000, tick)
 
     # Primer refresco antes de entrar al bucle
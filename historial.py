@@ -0,0 +1,129 @@
+# historial.py
+"""
+Historial de solicitudes atendidas:
+- Eventos estructurados (ids, coordenadas, ETA, distancia) en lugar de texto formateado.
+- Buffer circular acotado en memoria con los eventos más recientes (para la GUI).
+- Log append-only en JSON Lines (data/historial.jsonl) con rotación por tamaño.
+- Lectura paginada y perezosa del log completo (del más antiguo al más reciente).
+"""
+
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from utils import distancia_euclidiana
+
+DATA_DIR = Path("data")
+
+
+class HistorialSolicitudes:
+    def __init__(self, ruta=None, capacidad=200, max_bytes=2_000_000, max_archivos=5):
+        self.ruta = Path(ruta) if ruta else DATA_DIR / "historial.jsonl"
+        self.capacidad = capacidad
+        self.max_bytes = max_bytes
+        self.max_archivos = max_archivos
+        self.eventos = deque(maxlen=capacidad)
+        self.lock = threading.Lock()
+        self._archivo = None
+
+    # ---------------------------
+    # Escritura
+    # ---------------------------
+    def registrar(self, evento):
+        """Agrega un evento al buffer circular y lo anexa al log (rotando si supera max_bytes)."""
+        evento.setdefault("ts", time.time())
+        linea = json.dumps(evento, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self.lock:
+            self.eventos.append(evento)
+            f = self._abrir()
+            f.write(linea)
+            f.flush()
+            if f.tell() >= self.max_bytes:
+                self._rotar()
+        return evento
+
+    def registrar_asignacion(self, viaje_info, cliente, taxi):
+        """Callback de procesar_solicitudes: registra la asignación como evento estructurado."""
+        return self.registrar({
+            "viaje_id": viaje_info.get("viaje_id"),
+            "cliente_id": cliente.id_cliente,
+            "taxi_id": taxi.id_taxi,
+            "placa": taxi.placa,
+            "conductor": taxi.nombre_conductor,
+            "origen": list(cliente.origen),
+            "destino": list(cliente.destino),
+            "eta_pickup": viaje_info["eta_pickup"],
+            "distancia": distancia_euclidiana(cliente.origen, taxi.ubicacion),
+        })
+
+    def _abrir(self):
+        if self._archivo is None:
+            self.ruta.parent.mkdir(exist_ok=True)
+            self._archivo = open(self.ruta, "a", encoding="utf-8")
+        return self._archivo
+
+    def _rotar(self):
+        """historial.jsonl -> .1 -> .2 ...; descarta el más antiguo por encima de max_archivos."""
+        self._archivo.close()
+        self._archivo = None
+        for i in range(self.max_archivos - 1, 0, -1):
+            src = self._ruta_rotada(i)
+            if src.exists():
+                src.replace(self._ruta_rotada(i + 1))
+        self.ruta.replace(self._ruta_rotada(1))
+        sobrante = self._ruta_rotada(self.max_archivos)
+        if sobrante.exists():
+            sobrante.unlink()
+
+    def _ruta_rotada(self, i):
+        return self.ruta.with_name(f"{self.ruta.name}.{i}")
+
+    def cerrar(self):
+        with self.lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
+
+    # ---------------------------
+    # Lectura
+    # ---------------------------
+    def recientes(self, n=None):
+        """Últimos n eventos del buffer en memoria (más antiguos primero)."""
+        with self.lock:
+            eventos = list(self.eventos)
+        return eventos if n is None else eventos[-n:]
+
+    def iterar_log(self):
+        """Generador perezoso sobre todos los eventos persistidos, del más antiguo al más reciente."""
+        with self.lock:
+            if self._archivo is not None:
+                self._archivo.flush()
+        rutas = [self._ruta_rotada(i) for i in range(self.max_archivos - 1, 0, -1)] + [self.ruta]
+        for ruta in rutas:
+            if not ruta.exists():
+                continue
+            with open(ruta, "r", encoding="utf-8") as f:
+                for linea in f:
+                    linea = linea.strip()
+                    if linea:
+                        yield json.loads(linea)
+
+    def leer_pagina(self, pagina, tam=50):
+        """Devuelve la página 'pagina' (0-based) de eventos del log sin cargarlo completo."""
+        return list(itertools.islice(self.iterar_log(), pagina * tam, (pagina + 1) * tam))
+
+    @staticmethod
+    def formatear(evento):
+        """Texto legible de un evento (formato del panel de historial)."""
+        return (
+            f"🟢 Cliente C{evento['cliente_id']} pidió taxi\n"
+            f"Origen: {tuple(evento['origen'])}\n"
+            f"Destino: {tuple(evento['destino'])}\n"
+            f"Taxi asignado: T{evento['taxi_id']} ({evento['placa']})\n"
+            f"Conductor: {evento['conductor']}\n"
+            f"ETA recogida: {evento['eta_pickup']:.1f}s\n"
+            f"Distancia al taxi: {evento['distancia']:.3f}\n"
+            f"-----------------------------\n"
+        )
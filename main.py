@@ -4,51 +4,149 @@ Punto de entrada del sistema UNIETAXI.
 - Inicializa el sistema de atención, afiliaciones y reportes.
 - Genera clientes y taxis admitidos.
 - Lanza hilos concurrentes para simular actividad.
-- Programa cierre contable diario a las 12:00 pm.
-- Programa reporte mensual automático.
-- Inicia la interfaz gráfica (GUI).
+- Programa en un único planificador (planificador.py) el cierre contable diario a las 12:00 pm,
+  el reporte mensual, el seguimiento de calidad diario, los checkpoints y el volcado analítico;
+  cierre y reporte perdidos con el proceso caído se recuperan al arrancar.
+- Inicia la interfaz gráfica (GUI) o, con --headless, un bucle de servicio sin GUI que nunca
+  importa tkinter (apto para servidores sin pantalla; --duracion limita los segundos).
+- Arranque ligero: GUI, perfilador, servidor y exportador HTTP se importan solo si se usan, y cada
+  archivo de data/ se lee una sola vez. Informa el arranque en frío hasta el primer despacho
+  (también como métrica arranque_primer_despacho_segundos).
+- Opcionalmente exporta métricas Prometheus (HTTP local o archivo).
+- Con --perfilar-locks (o UNIETAXI_PERFIL_LOCKS=1) imprime al salir el reporte de contención de locks.
+- Con --profile perfila todos los hilos y escribe pstats/pilas colapsadas al salir (perfilado.py).
+- Restaura el último checkpoint binario al arrancar (checkpoint.py).
+- Con --servidor-puerto acepta solicitudes por red y empuja eventos de asignación (servidor.py).
+- Con --pooling activa los viajes compartidos (pooling.py).
+- Con --formato-datos binario persiste los viajes en data/viajes.bin (formato_binario.py).
 """
 
-import threading
 import time
-from datetime import datetime, timedelta
+
+T_INICIO = time.perf_counter()  # referencia del arranque en frío (antes de importar el sistema)
+
+import argparse
+import atexit
+import threading
 from sistema_atencion import SistemaAtencion
-from cliente import Cliente
-from taxi import Taxi
-from gui import iniciar_gui
 from utils import generar_clientes_iniciales, generar_taxis_iniciales
 from afiliacion import Afiliador
 from reportes import Reportes
+from historial import HistorialSolicitudes
+from metricas import ExportadorArchivo
+from checkpoint import RUTA_CHECKPOINT
+from planificador import Planificador
 
-def programar_cierre_diario(sistema):
+def programar_tareas(sistema, reportes, args):
     """
-    Programa un hilo que ejecuta el cierre contable automáticamente cada día a las 12:00 pm.
+    Programa las tareas periódicas en un único planificador (un hilo + pool de trabajadores).
+    Su estado (próxima ejecución, duración) queda en planificador.estado() y en las métricas.
     """
-    def tiempo_hasta_mediodia():
-        ahora = datetime.now()
-        objetivo = ahora.replace(hour=12, minute=0, second=0, microsecond=0)
-        if ahora >= objetivo:
-            objetivo += timedelta(days=1)
-        return (objetivo - ahora).total_seconds()
-
-    def planificar():
-        while True:
-            time.sleep(tiempo_hasta_mediodia())
-            sistema.cierre_contable_programado()
-    threading.Thread(target=planificar, name="Scheduler-Cierre-12pm", daemon=True).start()
-
-def main():
+    planificador = Planificador(metricas=sistema.metricas)
+    planificador.agregar("cierre_contable", sistema.cierre_contable_programado, "0 12 * * *", recuperar=True)
+    planificador.agregar("reporte_mensual", reportes.generar_reporte_mensual, "1 0 1 * *", recuperar=True)
+    planificador.agregar("seguimiento_calidad", sistema.seguimiento_calidad, "55 23 * * *")
+    planificador.agregar("volcado_analitico", sistema.almacen_analitico.volcar, 5.0)
+    if args.checkpoint_intervalo > 0:
+        planificador.agregar("checkpoint", lambda: sistema.guardar_checkpoint(args.checkpoint), args.checkpoint_intervalo)
+    return planificador.iniciar()
+
+def parsear_argumentos(argv=None):
+    parser = argparse.ArgumentParser(description="Simulación UNIETAXI")
+    parser.add_argument("--metricas-puerto", type=int, default=None,
+                        help="Expone métricas Prometheus en http://127.0.0.1:<puerto>/metrics")
+    parser.add_argument("--metricas-archivo", default=None,
+                        help="Escribe métricas Prometheus en este archivo periódicamente")
+    parser.add_argument("--metricas-intervalo", type=float, default=10.0,
+                        help="Intervalo (s) de escritura del archivo de métricas")
+    parser.add_argument("--perfilar-locks", action="store_true", default=None,
+                        help="Instrumenta lock_taxis/lock_viajes/lock_contabilidad y reporta contención al salir")
+    parser.add_argument("--profile", action="store_true",
+                        help="Perfila todos los hilos (cProfile + muestreo por subsistema) hasta la salida")
+    parser.add_argument("--profile-dir", default="perfiles",
+                        help="Directorio de salida de --profile (pstats, stacks.collapsed, subsistemas.txt)")
+    parser.add_argument("--checkpoint", default=str(RUTA_CHECKPOINT),
+                        help="Archivo de checkpoint binario a restaurar/guardar")
+    parser.add_argument("--checkpoint-intervalo", type=float, default=30.0,
+                        help="Segundos entre checkpoints (0 desactiva checkpoints y restauración)")
+    parser.add_argument("--servidor-puerto", type=int, default=None,
+                        help="Acepta solicitudes JSON por líneas en 127.0.0.1:<puerto> (servidor.py)")
+    parser.add_argument("--servidor-host", default="127.0.0.1",
+                        help="Interfaz del servidor de solicitudes")
+    parser.add_argument("--formato-datos", choices=("json", "binario"), default="json",
+                        help="Formato de data/viajes: JSON indentado o binario columnar mapeable")
+    parser.add_argument("--pooling", action="store_true",
+                        help="Viajes compartidos: inserta clientes en rutas de taxis ocupados")
+    parser.add_argument("--headless", action="store_true",
+                        help="Servicio sin interfaz gráfica (no importa tkinter)")
+    parser.add_argument("--duracion", type=float, default=0.0,
+                        help="Con --headless, segundos de servicio antes de salir (0 = hasta Ctrl+C)")
+    return parser.parse_args(argv)
+
+def iniciar_exportadores_metricas(sistema, args):
+    """Arranca los exportadores de métricas pedidos por línea de comandos."""
+    exportadores = []
+    if args.metricas_puerto is not None:
+        from metricas import ExportadorHTTP
+        exportadores.append(ExportadorHTTP(sistema.metricas, puerto=args.metricas_puerto).iniciar())
+    if args.metricas_archivo:
+        exportadores.append(ExportadorArchivo(sistema.metricas, args.metricas_archivo, args.metricas_intervalo).iniciar())
+    return exportadores
+
+def reportar_arranque(sistema, inicio=T_INICIO):
+    """Publica e imprime los segundos desde el inicio del proceso hasta el primer despacho."""
+    segundos = time.perf_counter() - inicio
+    sistema.metricas.medidor("arranque_primer_despacho_segundos",
+                             "Arranque en frío hasta el primer despacho de solicitudes").set(segundos)
+    print(f"Arranque en frío hasta el primer despacho: {segundos:.3f}s")
+    return segundos
+
+def ejecutar_sin_interfaz(sistema, historial, duracion=0.0, intervalo=1.0):
+    """Bucle de servicio sin GUI: despacha la cola cada 'intervalo' s hasta Ctrl+C o 'duracion' s."""
+    fin = time.monotonic() + duracion if duracion > 0 else None
+    try:
+        while fin is None or time.monotonic() < fin:
+            sistema.procesar_solicitudes(callback_historial=historial.registrar_asignacion)
+            time.sleep(intervalo if fin is None else max(0.0, min(intervalo, fin - time.monotonic())))
+    except KeyboardInterrupt:
+        pass
+
+def main(argv=None):
+    args = parsear_argumentos(argv)
+    if args.profile:
+        from perfilado import Perfilador
+        # Antes de crear cualquier hilo, para que todos queden perfilados
+        atexit.register(Perfilador(args.profile_dir).iniciar().detener)
+
     # Inicialización de módulos principales
-    sistema = SistemaAtencion()
+    sistema = SistemaAtencion(perfilar_locks=args.perfilar_locks)
+    sistema.pooling = args.pooling
+    sistema.formato_datos = args.formato_datos
+    iniciar_exportadores_metricas(sistema, args)
+    if sistema.perfilar_locks:
+        atexit.register(lambda: print(sistema.reporte_locks()))
+
+    # Reinicio en caliente: restaurar antes de que cualquier persistencia pise el estado previo
+    t0 = time.perf_counter()
+    if args.checkpoint_intervalo > 0 and sistema.restaurar_checkpoint(args.checkpoint):
+        print(f"Checkpoint restaurado en {time.perf_counter() - t0:.3f}s ({len(sistema.historico)} viajes)")
+    elif sistema.formato_datos == "binario" and sistema.restaurar_viajes():
+        print(f"Viajes mapeados de data/viajes.bin en {time.perf_counter() - t0:.3f}s ({len(sistema.historico)} viajes)")
+    if args.checkpoint_intervalo > 0:
+        atexit.register(sistema.guardar_checkpoint, args.checkpoint)  # último checkpoint al salir
     afiliador = Afiliador()
     reportes = Reportes(sistema)
 
-    # Cargar base de datos de afiliaciones
+    # Cargar base de datos de afiliaciones (única lectura de data/clientes.json y data/taxis.json)
     afiliador.cargar_base_datos()
 
     # Generar entidades admitidas
-    taxis = generar_taxis_iniciales(num_taxis=12, sistema=sistema, solo_admitidos=True)
-    clientes = generar_clientes_iniciales(num_clientes=18, sistema=sistema, solo_admitidos=True)
+    taxis = generar_taxis_iniciales(num_taxis=12, sistema=sistema, solo_admitidos=True, registros=afiliador.registro_taxis)
+    clientes = generar_clientes_iniciales(num_clientes=18, sistema=sistema, solo_admitidos=True, registros=afiliador.registro_clientes)
+
+    # Publicación de snapshots inmutables para GUI y reportes
+    sistema.registrar_entidades(taxis, clientes)
+    sistema.iniciar_publicacion_snapshots(intervalo=0.25)
 
     # Lanzar hilos concurrentes
     for t in taxis:
@@ -56,23 +154,31 @@ def main():
     for c in clientes:
         threading.Thread(target=c.run, name=f"Cliente-{c.id_cliente}", daemon=True).start()
 
-    # Programar cierre contable diario
-    programar_cierre_diario(sistema)
-
-    def programar_reporte_mensual():
-        """
-        Genera reporte mensual automáticamente el primer minuto de cada mes.
-        """
-        while True:
-            ahora = datetime.now()
-            if ahora.day == 1 and ahora.hour == 0 and ahora.minute == 1:
-                reportes.generar_reporte_mensual()
-                time.sleep(60)
-            time.sleep(5)
-    threading.Thread(target=programar_reporte_mensual, name="Scheduler-Reporte-Mensual", daemon=True).start()
-
-    # Iniciar GUI
-    iniciar_gui(sistema, clientes, taxis, afiliador, reportes)
+    # Ingreso de solicitudes por red
+    if args.servidor_puerto is not None:
+        from servidor import iniciar_en_hilo
+        servidor = iniciar_en_hilo(sistema, args.servidor_host, args.servidor_puerto)
+        print(f"Servidor de solicitudes en {args.servidor_host}:{servidor.puerto}")
+
+    # La contabilidad ya no se persiste por viaje: al salir se escriben totales y asientos pendientes
+    atexit.register(sistema.cierre_contable)
+    atexit.register(sistema.almacen_analitico.volcar)  # viajes finalizados aún en el búfer analítico
+    # Cierre diario, reporte mensual, seguimiento, checkpoints y volcados en un único planificador
+    atexit.register(programar_tareas(sistema, reportes, args).detener)
+
+    # Primer despacho: cierra la medición del arranque en frío
+    historial = HistorialSolicitudes()
+    sistema.procesar_solicitudes(callback_historial=historial.registrar_asignacion)
+    reportar_arranque(sistema)
+
+    try:
+        if args.headless:
+            ejecutar_sin_interfaz(sistema, historial, args.duracion)
+        else:
+            from gui import iniciar_gui  # tkinter solo con interfaz
+            iniciar_gui(sistema, clientes, taxis, afiliador, reportes, historial)
+    finally:
+        historial.cerrar()
 
 if __name__ == "__main__":
     main()
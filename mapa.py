@@ -0,0 +1,325 @@
+# mapa.py
+"""
+Renderizado del mapa de UNIETAXI sobre un tk.Canvas:
+- Viewport con desplazamiento (arrastrar con el ratón) y zoom (rueda).
+- Culling: solo se dibujan entidades dentro del área visible.
+- Nivel de detalle: con muchas entidades visibles se dibuja un mapa de calor de densidad;
+  las etiquetas de texto solo aparecen cuando hay pocas entidades en pantalla.
+- Ítems persistentes por entidad, movidos/re-estilados solo cuando cambia su estado.
+- Lee exclusivamente el snapshot inmutable publicado por el sistema (snapshot.py), que trae
+  precalculado el índice cliente -> viaje activo (sin búsquedas lineales ni locks por frame).
+"""
+
+from utils import distancia_euclidiana
+
+MAX_MARCADORES = 1500      # por encima de este número de entidades visibles se usa mapa de calor
+MAX_ETIQUETAS = 80         # por debajo de este número se muestran etiquetas de texto
+CELDAS_CALOR = (36, 22)    # celdas (columnas, filas) del mapa de calor en pantalla
+ZOOM_MIN = 1.0
+ZOOM_MAX = 32.0
+PALETA_CALOR = ["#fff5eb", "#fee6ce", "#fdd0a2", "#fdae6b", "#fd8d3c", "#f16913", "#d94801", "#8c2d04"]
+
+
+class Viewport:
+    """Ventana visible del mapa normalizado (0..1) y su transformación a píxeles del canvas."""
+
+    def __init__(self, ancho, alto, pad):
+        self.ancho = ancho
+        self.alto = alto
+        self.pad = pad
+        self.zoom = 1.0
+        self.x0 = 0.0
+        self.y0 = 0.0
+        self.version = 0  # cambia con cada desplazamiento/zoom
+
+    @property
+    def lado(self):
+        """Tamaño (en unidades de mapa) del área visible."""
+        return 1.0 / self.zoom
+
+    def a_canvas(self, x, y):
+        """Convierte coordenadas de mapa a píxeles del canvas según el viewport actual."""
+        return (self.pad + (x - self.x0) * self.zoom * (self.ancho - 2 * self.pad),
+                self.pad + (y - self.y0) * self.zoom * (self.alto - 2 * self.pad))
+
+    def a_mapa(self, cx, cy):
+        """Convierte píxeles del canvas a coordenadas de mapa."""
+        return (self.x0 + (cx - self.pad) / (self.zoom * (self.ancho - 2 * self.pad)),
+                self.y0 + (cy - self.pad) / (self.zoom * (self.alto - 2 * self.pad)))
+
+    def visible(self, x, y, margen=0.02):
+        """True si el punto cae dentro del área visible (con un pequeño margen relativo)."""
+        m = margen * self.lado
+        return (self.x0 - m <= x <= self.x0 + self.lado + m) and (self.y0 - m <= y <= self.y0 + self.lado + m)
+
+    def _acotar(self):
+        """Mantiene el área visible dentro del mapa."""
+        limite = 1.0 - self.lado
+        self.x0 = min(max(0.0, self.x0), limite)
+        self.y0 = min(max(0.0, self.y0), limite)
+
+    def desplazar(self, dx_px, dy_px):
+        """Desplaza el área visible según un arrastre en píxeles."""
+        self.x0 -= dx_px / (self.zoom * (self.ancho - 2 * self.pad))
+        self.y0 -= dy_px / (self.zoom * (self.alto - 2 * self.pad))
+        self._acotar()
+        self.version += 1
+
+    def hacer_zoom(self, factor, cx, cy):
+        """Aplica zoom manteniendo fijo el punto del mapa bajo el cursor (cx, cy)."""
+        mx, my = self.a_mapa(cx, cy)
+        self.zoom = min(ZOOM_MAX, max(ZOOM_MIN, self.zoom * factor))
+        self.x0 = mx - (cx - self.pad) / (self.zoom * (self.ancho - 2 * self.pad))
+        self.y0 = my - (cy - self.pad) / (self.zoom * (self.alto - 2 * self.pad))
+        self._acotar()
+        self.version += 1
+
+    def celda(self, x, y, columnas, filas):
+        """Índice (col, fila) de la celda de pantalla que contiene el punto, o None si queda fuera."""
+        cx, cy = self.a_canvas(x, y)
+        col = int((cx - self.pad) * columnas / (self.ancho - 2 * self.pad))
+        fila = int((cy - self.pad) * filas / (self.alto - 2 * self.pad))
+        if 0 <= col < columnas and 0 <= fila < filas:
+            return col, fila
+        return None
+
+
+class RenderizadorMapa:
+    """Dibuja clientes y taxis con culling y nivel de detalle sobre ítems persistentes del canvas."""
+
+    def __init__(self, canvas, sistema, ancho, alto, pad):
+        self.canvas = canvas
+        self.sistema = sistema
+        self.snapshot = None
+        self.viewport = Viewport(ancho, alto, pad)
+
+        self.items_clientes = {}   # id_cliente -> {"origen", "destino", "etiqueta", "detalle", "estado"}
+        self.items_taxis = {}      # id_taxi -> {"forma", "etiqueta", "estado"}
+        self.visibles_clientes = set()
+        self.visibles_taxis = set()
+        self.lineas_grid = []
+        self.celdas_calor = {}     # (col, fila) -> [id_rect, color]
+        self.modo = None           # "marcadores" | "calor"
+        self._grid_version = None
+        self._arrastre = None
+        self._enlazar_eventos()
+
+    # ---------------------------
+    # Interacción (pan/zoom)
+    # ---------------------------
+    def _enlazar_eventos(self):
+        c = self.canvas
+        c.bind("<ButtonPress-1>", self._inicio_arrastre)
+        c.bind("<B1-Motion>", self._mover_arrastre)
+        c.bind("<MouseWheel>", lambda e: self._zoom_evento(e, 1.25 if e.delta > 0 else 0.8))  # Windows/macOS
+        c.bind("<Button-4>", lambda e: self._zoom_evento(e, 1.25))  # Linux
+        c.bind("<Button-5>", lambda e: self._zoom_evento(e, 0.8))
+
+    def _inicio_arrastre(self, evento):
+        self._arrastre = (evento.x, evento.y)
+
+    def _mover_arrastre(self, evento):
+        if self._arrastre is None:
+            return
+        px, py = self._arrastre
+        self._arrastre = (evento.x, evento.y)
+        self.viewport.desplazar(evento.x - px, evento.y - py)
+        self.dibujar(self.snapshot)
+
+    def _zoom_evento(self, evento, factor):
+        self.viewport.hacer_zoom(factor, evento.x, evento.y)
+        self.dibujar(self.snapshot)
+
+    # ---------------------------
+    # Dibujo
+    # ---------------------------
+    def dibujar(self, snap=None):
+        """
+        Actualiza el mapa a partir de un snapshot (por defecto, el último publicado):
+        grid (solo si cambió el viewport), culling y nivel de detalle.
+        """
+        if snap is None:
+            snap = self.sistema.obtener_snapshot()
+        self.snapshot = snap
+        vp = self.viewport
+        if self._grid_version != vp.version:
+            self._dibujar_grid()
+
+        visibles_t = [t for t in snap.taxis if vp.visible(*t.ubicacion)]
+        visibles_c = [c for c in snap.clientes if vp.visible(*c.origen) or vp.visible(*c.destino)]
+        if len(visibles_t) + len(visibles_c) > MAX_MARCADORES:
+            self._cambiar_modo("calor")
+            self._dibujar_calor(visibles_t, visibles_c)
+            return
+
+        self._cambiar_modo("marcadores")
+        etiquetas = len(visibles_t) + len(visibles_c) <= MAX_ETIQUETAS
+        taxis_por_id = {t.id_taxi: t for t in snap.taxis} if etiquetas and snap.viaje_por_cliente else {}
+
+        nuevos = False
+        ids_c = set()
+        for cliente in visibles_c:
+            ids_c.add(cliente.id_cliente)
+            viaje = snap.viaje_por_cliente.get(cliente.id_cliente) if etiquetas else None
+            taxi = taxis_por_id.get(viaje["taxi_id"]) if viaje is not None else None
+            nuevos = self._dibujar_cliente(cliente, etiquetas, taxi) or nuevos
+        ids_t = set()
+        for taxi in visibles_t:
+            ids_t.add(taxi.id_taxi)
+            nuevos = self._dibujar_taxi(taxi, etiquetas) or nuevos
+
+        for cid in self.visibles_clientes - ids_c:
+            self.canvas.itemconfig(f"c{cid}", state="hidden")
+        for tid in self.visibles_taxis - ids_t:
+            self.canvas.itemconfig(f"t{tid}", state="hidden")
+        self.visibles_clientes = ids_c
+        self.visibles_taxis = ids_t
+        if nuevos:
+            # Los taxis siempre quedan por encima de los clientes
+            self.canvas.tag_raise("taxi")
+
+    def _dibujar_grid(self):
+        """Dibuja (o reubica) la cuadrícula de referencia según el viewport."""
+        vp = self.viewport
+        if not self.lineas_grid:
+            for _ in range(20):
+                self.lineas_grid.append(self.canvas.create_line(0, 0, 0, 0, fill="#f0f0f0", tags=("grid",)))
+        for i in range(10):
+            x0, y0 = vp.a_canvas(0.0, i / 9)
+            x1, y1 = vp.a_canvas(1.0, i / 9)
+            self.canvas.coords(self.lineas_grid[i], x0, y0, x1, y1)
+            x0, y0 = vp.a_canvas(i / 9, 0.0)
+            x1, y1 = vp.a_canvas(i / 9, 1.0)
+            self.canvas.coords(self.lineas_grid[10 + i], x0, y0, x1, y1)
+        self.canvas.tag_lower("grid")
+        self._grid_version = vp.version
+
+    def _cambiar_modo(self, modo):
+        """Alterna entre marcadores individuales y mapa de calor ocultando el otro conjunto de ítems."""
+        if self.modo == modo:
+            return
+        if modo == "calor":
+            self.canvas.itemconfig("entidad", state="hidden")
+            self.visibles_clientes = set()
+            self.visibles_taxis = set()
+            self.canvas.itemconfig("calor", state="normal")
+        else:
+            self.canvas.itemconfig("calor", state="hidden")
+        self.modo = modo
+
+    def _dibujar_calor(self, visibles_t, visibles_c):
+        """Mapa de calor de densidad (taxis + clientes) por celdas de pantalla."""
+        vp = self.viewport
+        columnas, filas = CELDAS_CALOR
+        conteo = {}
+        for t in visibles_t:
+            k = vp.celda(*t.ubicacion, columnas, filas)
+            if k is not None:
+                conteo[k] = conteo.get(k, 0) + 1
+        for c in visibles_c:
+            k = vp.celda(*c.origen, columnas, filas)
+            if k is not None:
+                conteo[k] = conteo.get(k, 0) + 1
+        maximo = max(conteo.values(), default=1)
+        ancho_celda = (vp.ancho - 2 * vp.pad) / columnas
+        alto_celda = (vp.alto - 2 * vp.pad) / filas
+        niveles = len(PALETA_CALOR)
+        for k in set(self.celdas_calor) | set(conteo):
+            n = conteo.get(k, 0)
+            color = PALETA_CALOR[min(niveles - 1, n * niveles // (maximo + 1))] if n else ""
+            celda = self.celdas_calor.get(k)
+            if celda is None:
+                col, fila = k
+                x0 = vp.pad + col * ancho_celda
+                y0 = vp.pad + fila * alto_celda
+                rect = self.canvas.create_rectangle(x0, y0, x0 + ancho_celda, y0 + alto_celda,
+                                                    fill=color, outline="", tags=("calor",))
+                self.celdas_calor[k] = [rect, color]
+            elif celda[1] != color:
+                self.canvas.itemconfig(celda[0], fill=color)
+                celda[1] = color
+
+    def _detalle_cliente(self, cliente, taxi):
+        """Texto explicativo del viaje activo del cliente ("" si no tiene taxi asignado)."""
+        if taxi is None:
+            return ""
+        distancia = distancia_euclidiana(cliente.origen, taxi.ubicacion)
+        return (
+            f"C{cliente.id_cliente} pidió taxi\n"
+            f"Origen: {cliente.origen}\n"
+            f"Destino: {cliente.destino}\n"
+            f"Taxi asignado: T{taxi.id_taxi} ({taxi.placa})\n"
+            f"Distancia al taxi: {distancia:.3f}"
+        )
+
+    def _dibujar_cliente(self, cliente, etiquetas, taxi):
+        """Crea o actualiza los ítems del cliente; devuelve True si se crearon ítems nuevos."""
+        vp = self.viewport
+        color = "purple" if cliente.en_viaje else ("green" if cliente.solicitud_enviada else "gray")
+        etiqueta = f"C{cliente.id_cliente} ({cliente.origen}→{cliente.destino})" if etiquetas else ""
+        detalle = self._detalle_cliente(cliente, taxi) if etiquetas else ""
+        pos = (cliente.origen, cliente.destino, vp.version)
+        items = self.items_clientes.get(cliente.id_cliente)
+        tags = ("cliente", "entidad", f"c{cliente.id_cliente}")
+        ox, oy = vp.a_canvas(*cliente.origen)
+        if items is None:
+            dx, dy = vp.a_canvas(*cliente.destino)
+            self.items_clientes[cliente.id_cliente] = {
+                "origen": self.canvas.create_oval(ox - 6, oy - 6, ox + 6, oy + 6, fill=color, outline="", tags=tags),
+                "destino": self.canvas.create_oval(dx - 5, dy - 5, dx + 5, dy + 5, fill="blue", outline="", tags=tags),
+                "etiqueta": self.canvas.create_text(ox + 10, oy - 12, text=etiqueta, fill="#333", anchor="w", tags=tags),
+                "detalle": self.canvas.create_text(ox + 10, oy + 12, text=detalle, fill="black", anchor="nw",
+                                                   font=("Arial", 8), tags=tags),
+                "estado": (pos, color, etiqueta, detalle),
+            }
+            return True
+        if cliente.id_cliente not in self.visibles_clientes:
+            self.canvas.itemconfig(f"c{cliente.id_cliente}", state="normal")
+        prev_pos, prev_color, prev_etiqueta, prev_detalle = items["estado"]
+        if prev_pos != pos:
+            dx, dy = vp.a_canvas(*cliente.destino)
+            self.canvas.coords(items["origen"], ox - 6, oy - 6, ox + 6, oy + 6)
+            self.canvas.coords(items["destino"], dx - 5, dy - 5, dx + 5, dy + 5)
+            self.canvas.coords(items["etiqueta"], ox + 10, oy - 12)
+            self.canvas.coords(items["detalle"], ox + 10, oy + 12)
+        if prev_color != color:
+            self.canvas.itemconfig(items["origen"], fill=color)
+        if prev_etiqueta != etiqueta:
+            self.canvas.itemconfig(items["etiqueta"], text=etiqueta)
+        if prev_detalle != detalle:
+            self.canvas.itemconfig(items["detalle"], text=detalle)
+        items["estado"] = (pos, color, etiqueta, detalle)
+        return False
+
+    def _dibujar_taxi(self, taxi, etiquetas):
+        """Crea o actualiza el triángulo del taxi (naranja ocupado, amarillo libre); True si es nuevo."""
+        vp = self.viewport
+        color = "orange" if taxi.ocupado else "yellow"
+        etiqueta = f"T{taxi.id_taxi} ({taxi.calificacion:.1f})" if etiquetas else ""
+        estado = ((taxi.ubicacion, vp.version), color, etiqueta)
+        items = self.items_taxis.get(taxi.id_taxi)
+        visible = taxi.id_taxi in self.visibles_taxis
+        if items is not None and visible and items["estado"] == estado:
+            return False
+        tx, ty = vp.a_canvas(*taxi.ubicacion)
+        points = [tx, ty - 9, tx - 9, ty + 9, tx + 9, ty + 9]
+        if items is None:
+            tags = ("taxi", "entidad", f"t{taxi.id_taxi}")
+            self.items_taxis[taxi.id_taxi] = {
+                "forma": self.canvas.create_polygon(points, fill=color, outline="#444", tags=tags),
+                "etiqueta": self.canvas.create_text(tx + 12, ty - 12, text=etiqueta, fill="#333", anchor="w", tags=tags),
+                "estado": estado,
+            }
+            return True
+        if not visible:
+            self.canvas.itemconfig(f"t{taxi.id_taxi}", state="normal")
+        prev_pos, prev_color, prev_etiqueta = items["estado"]
+        if prev_pos != estado[0]:
+            self.canvas.coords(items["forma"], *points)
+            self.canvas.coords(items["etiqueta"], tx + 12, ty - 12)
+        if prev_color != color:
+            self.canvas.itemconfig(items["forma"], fill=color)
+        if prev_etiqueta != etiqueta:
+            self.canvas.itemconfig(items["etiqueta"], text=etiqueta)
+        items["estado"] = estado
+        return False
@@ -0,0 +1,249 @@
+# metricas.py
+"""
+Subsistema de métricas de UNIETAXI (bajo costo, sin dependencias externas):
+- Contador, Medidor (gauge, opcionalmente calculado al exportar) e Histograma de buckets fijos.
+- Registro por sistema con soporte de etiquetas (labels) simples.
+- Exposición en formato de texto de Prometheus:
+  - ExportadorHTTP: servidor local (GET /metrics) en un hilo daemon.
+  - ExportadorArchivo: escribe el texto en un archivo a intervalo fijo (reemplazo atómico).
+"""
+
+import bisect
+import os
+import threading
+import time
+from pathlib import Path
+
+# Buckets (segundos) de uso común
+BUCKETS_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_ETA = (0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0, 20.0, 30.0)
+BUCKETS_DURACION_VIAJE = (1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _formatear_etiquetas(etiquetas, extra=None):
+    pares = list(etiquetas) + (list(extra) if extra else [])
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pares) + "}"
+
+
+def _num(valor):
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador monótono."""
+    tipo = "counter"
+
+    def __init__(self):
+        self.valor = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self._lock:
+            self.valor += n
+
+    def muestras(self, nombre, etiquetas):
+        return [f"{nombre}{_formatear_etiquetas(etiquetas)} {_num(self.valor)}"]
+
+
+class Medidor:
+    """Valor instantáneo; si se da 'funcion', se evalúa al exportar (p. ej. profundidad de cola)."""
+    tipo = "gauge"
+
+    def __init__(self, funcion=None):
+        self.valor = 0
+        self.funcion = funcion
+        self._lock = threading.Lock()
+
+    def set(self, valor):
+        self.valor = valor
+
+    def inc(self, n=1):
+        with self._lock:
+            self.valor += n
+
+    def dec(self, n=1):
+        self.inc(-n)
+
+    def leer(self):
+        return self.funcion() if self.funcion is not None else self.valor
+
+    def muestras(self, nombre, etiquetas):
+        return [f"{nombre}{_formatear_etiquetas(etiquetas)} {_num(self.leer())}"]
+
+
+class Histograma:
+    """Histograma de buckets fijos (límites superiores inclusivos, como Prometheus)."""
+    tipo = "histogram"
+
+    def __init__(self, buckets=BUCKETS_LATENCIA):
+        self.buckets = tuple(sorted(buckets))
+        self.conteos = [0] * (len(self.buckets) + 1)  # último = +Inf
+        self.suma = 0.0
+        self.total = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor):
+        i = bisect.bisect_left(self.buckets, valor)
+        with self._lock:
+            self.conteos[i] += 1
+            self.suma += valor
+            self.total += 1
+
+    def medir(self):
+        """Context manager que observa la duración (segundos) del bloque."""
+        return _Cronometro(self)
+
+    def percentil(self, q):
+        """Aproximación del percentil q (0..1) usando el límite superior del bucket."""
+        if self.total == 0:
+            return 0.0
+        objetivo = q * self.total
+        acumulado = 0
+        for limite, n in zip(self.buckets + (float("inf"),), self.conteos):
+            acumulado += n
+            if acumulado >= objetivo:
+                return limite
+        return float("inf")
+
+    def muestras(self, nombre, etiquetas):
+        lineas = []
+        acumulado = 0
+        for limite, n in zip(self.buckets + (float("inf"),), self.conteos):
+            acumulado += n
+            lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, [('le', _num(limite))])} {acumulado}")
+        lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas)} {_num(self.suma)}")
+        lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas)} {self.total}")
+        return lineas
+
+
+class _Cronometro:
+    __slots__ = ("histograma", "inicio")
+
+    def __init__(self, histograma):
+        self.histograma = histograma
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.observar(time.perf_counter() - self.inicio)
+        return False
+
+
+class RegistroMetricas:
+    """Registro de métricas por nombre y etiquetas; get-or-create para instrumentar sin ceremonia."""
+
+    def __init__(self, prefijo="unietaxi_"):
+        self.prefijo = prefijo
+        self._metricas = {}   # nombre -> {"ayuda", "tipo", "series": {etiquetas: metrica}}
+        self._lock = threading.Lock()
+
+    def _obtener(self, clase, nombre, ayuda, etiquetas, **kwargs):
+        nombre = self.prefijo + nombre
+        clave = tuple(sorted((etiquetas or {}).items()))
+        familia = self._metricas.get(nombre)
+        if familia is not None:
+            serie = familia["series"].get(clave)
+            if serie is not None:
+                return serie
+        with self._lock:
+            familia = self._metricas.setdefault(nombre, {"ayuda": ayuda, "tipo": clase.tipo, "series": {}})
+            serie = familia["series"].get(clave)
+            if serie is None:
+                serie = familia["series"][clave] = clase(**kwargs)
+            return serie
+
+    def contador(self, nombre, ayuda="", etiquetas=None):
+        return self._obtener(Contador, nombre, ayuda, etiquetas)
+
+    def medidor(self, nombre, ayuda="", etiquetas=None, funcion=None):
+        return self._obtener(Medidor, nombre, ayuda, etiquetas, funcion=funcion)
+
+    def histograma(self, nombre, ayuda="", etiquetas=None, buckets=BUCKETS_LATENCIA):
+        return self._obtener(Histograma, nombre, ayuda, etiquetas, buckets=buckets)
+
+    def exportar_prometheus(self):
+        """Texto en formato de exposición de Prometheus (versión 0.0.4)."""
+        with self._lock:
+            familias = [(n, dict(f, series=dict(f["series"]))) for n, f in sorted(self._metricas.items())]
+        lineas = []
+        for nombre, familia in familias:
+            if familia["ayuda"]:
+                lineas.append(f"# HELP {nombre} {familia['ayuda']}")
+            lineas.append(f"# TYPE {nombre} {familia['tipo']}")
+            for etiquetas, metrica in familia["series"].items():
+                lineas.extend(metrica.muestras(nombre, etiquetas))
+        return "\n".join(lineas) + "\n"
+
+
+class ExportadorHTTP:
+    """Servidor HTTP local que expone GET /metrics en formato Prometheus."""
+
+    def __init__(self, registro, puerto=9108, host="127.0.0.1"):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # solo si se exporta por HTTP
+        registro_local = registro
+
+        class _Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                cuerpo = registro_local.exportar_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):  # sin ruido en consola
+                pass
+
+        self.servidor = ThreadingHTTPServer((host, puerto), _Handler)
+        self.servidor.daemon_threads = True
+        self._hilo = None
+
+    @property
+    def puerto(self):
+        return self.servidor.server_address[1]
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.servidor.serve_forever, name="Metricas-HTTP", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+
+class ExportadorArchivo:
+    """Escribe periódicamente la exposición Prometheus en un archivo (reemplazo atómico)."""
+
+    def __init__(self, registro, ruta, intervalo=10.0):
+        self.registro = registro
+        self.ruta = Path(ruta)
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+
+    def escribir(self):
+        self.ruta.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.ruta.with_name(self.ruta.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.registro.exportar_prometheus())
+        os.replace(tmp, self.ruta)
+
+    def iniciar(self):
+        def bucle():
+            while not self._detener.wait(self.intervalo):
+                self.escribir()
+        threading.Thread(target=bucle, name="Metricas-Archivo", daemon=True).start()
+        return self
+
+    def detener(self):
+        self._detener.set()
+        self.escribir()
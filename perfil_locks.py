@@ -0,0 +1,112 @@
+# perfil_locks.py
+"""
+Perfilado de contención de locks (lock_taxis, lock_viajes, lock_contabilidad):
+- LockInstrumentado: reemplazo de threading.Lock que mide espera de adquisición y tiempo de
+  retención (histogramas de metricas.py) y acumula los sitios de llamada con más espera.
+- Se habilita con la variable de entorno UNIETAXI_PERFIL_LOCKS=1 o con el flag del constructor;
+  deshabilitado, crear_lock() devuelve un threading.Lock normal (costo nulo).
+- reporte_locks() produce un resumen de texto bajo demanda o al cerrar el proceso.
+"""
+
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from metricas import Histograma
+
+ENV_PERFIL_LOCKS = "UNIETAXI_PERFIL_LOCKS"
+BUCKETS_LOCK = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 0.01, 0.05, 0.1, 0.5, 1.0)
+TOP_SITIOS = 5
+
+
+def perfilado_habilitado(flag=None):
+    """El flag explícito manda; si es None se consulta UNIETAXI_PERFIL_LOCKS."""
+    if flag is not None:
+        return bool(flag)
+    return os.environ.get(ENV_PERFIL_LOCKS, "").strip().lower() in ("1", "true", "si", "sí", "yes", "on")
+
+
+class LockInstrumentado:
+    """Lock con histogramas de espera/retención y contabilidad por sitio de llamada."""
+
+    def __init__(self, nombre, registro=None):
+        self.nombre = nombre
+        self._lock = threading.Lock()
+        self._t_adquirido = 0.0
+        self._sitio_actual = None
+        self.sitios = {}  # (archivo, línea, función) -> [adquisiciones, espera_total, retencion_total]
+        if registro is not None:
+            etiquetas = {"lock": nombre}
+            self.espera = registro.histograma("lock_espera_segundos", "Espera para adquirir el lock", etiquetas, BUCKETS_LOCK)
+            self.retencion = registro.histograma("lock_retencion_segundos", "Tiempo con el lock tomado", etiquetas, BUCKETS_LOCK)
+        else:
+            self.espera = Histograma(BUCKETS_LOCK)
+            self.retencion = Histograma(BUCKETS_LOCK)
+
+    def _adquirir(self, frame, blocking=True, timeout=-1):
+        t0 = time.perf_counter()
+        ok = self._lock.acquire(blocking, timeout)
+        if ok:
+            # Con el lock tomado, las estructuras propias no necesitan otra sincronización
+            t1 = time.perf_counter()
+            self._t_adquirido = t1
+            espera = t1 - t0
+            self.espera.observar(espera)
+            sitio = (Path(frame.f_code.co_filename).name, frame.f_lineno, frame.f_code.co_name)
+            datos = self.sitios.get(sitio)
+            if datos is None:
+                datos = self.sitios[sitio] = [0, 0.0, 0.0]
+            datos[0] += 1
+            datos[1] += espera
+            self._sitio_actual = datos
+        return ok
+
+    def acquire(self, blocking=True, timeout=-1):
+        return self._adquirir(sys._getframe(1), blocking, timeout)
+
+    def release(self):
+        retenido = time.perf_counter() - self._t_adquirido
+        self.retencion.observar(retenido)
+        if self._sitio_actual is not None:
+            self._sitio_actual[2] += retenido
+        self._lock.release()
+
+    def locked(self):
+        return self._lock.locked()
+
+    def __enter__(self):
+        self._adquirir(sys._getframe(1))
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+    def resumen(self):
+        """Texto con totales, percentiles aproximados y los sitios con más espera acumulada."""
+        e, r = self.espera, self.retencion
+        lineas = [
+            f"[{self.nombre}] adquisiciones={e.total} "
+            f"espera_total={e.suma:.6f}s espera_p50<={e.percentil(0.5):g}s espera_p99<={e.percentil(0.99):g}s "
+            f"retencion_total={r.suma:.6f}s retencion_p99<={r.percentil(0.99):g}s"
+        ]
+        top = sorted(self.sitios.items(), key=lambda kv: kv[1][1], reverse=True)[:TOP_SITIOS]
+        for (archivo, linea, funcion), (n, espera, retencion) in top:
+            lineas.append(f"    {archivo}:{linea} {funcion}: n={n} espera={espera:.6f}s retencion={retencion:.6f}s")
+        return "\n".join(lineas)
+
+
+def crear_lock(nombre, habilitado=False, registro=None):
+    """threading.Lock normal si el perfilado está deshabilitado; LockInstrumentado si no."""
+    if not habilitado:
+        return threading.Lock()
+    return LockInstrumentado(nombre, registro)
+
+
+def reporte_locks(locks):
+    """Reporte de contención para los locks instrumentados dados ("" si ninguno lo está)."""
+    partes = [lk.resumen() for lk in locks if isinstance(lk, LockInstrumentado)]
+    if not partes:
+        return ""
+    return "Reporte de contención de locks UNIETAXI\n" + "\n".join(partes)
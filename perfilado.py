@@ -0,0 +1,198 @@
+# perfilado.py
+"""
+Modo de perfilado de UNIETAXI (main.py --profile):
+- cProfile por hilo: todo hilo lanzado tras iniciar() se perfila con su propio Profile
+  (los hilos de taxis y clientes incluidos), además del hilo principal (GUI). Desde Python 3.12
+  cProfile usa sys.monitoring y solo admite un perfilador activo en el proceso: se perfila solo
+  el hilo principal y el resto de hilos queda cubierto por el muestreo de pilas.
+- Muestreo periódico de las pilas de todos los hilos (sys._current_frames) con atribución
+  por subsistema: matching, movimiento, persistencia, gui, reportes.
+- Al detener (o al salir del proceso) escribe en el directorio de salida:
+  - <hilo>.pstats por hilo y total.pstats combinado.
+  - stacks.collapsed (formato "pila;de;frames N" compatible con flamegraph.pl/speedscope).
+  - subsistemas.txt con el reparto de muestras por subsistema.
+"""
+
+import cProfile
+import pstats
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+PERFIL_POR_HILO = sys.version_info < (3, 12)  # un cProfile.Profile activo por hilo
+
+# Reglas de atribución: (archivo, función o None para todo el archivo) -> subsistema.
+# Se evalúan desde el frame más interno hacia afuera; gana la primera coincidencia.
+REGLAS_SUBSISTEMA = [
+    ("sistema_atencion.py", "persistir_viajes", "persistencia"),
+    ("sistema_atencion.py", "persistir_contabilidad", "persistencia"),
+    ("sistema_atencion.py", "_persist_list", "persistencia"),
+    ("contabilidad.py", "volcar_asientos", "persistencia"),
+    ("afiliacion.py", "_persist", "persistencia"),
+    ("historial.py", None, "persistencia"),
+    ("checkpoint.py", None, "persistencia"),
+    ("formato_binario.py", None, "persistencia"),
+    ("almacen_analitico.py", None, "persistencia"),
+    ("almacen_viajes.py", "escribir_json", "persistencia"),
+    ("json", None, "persistencia"),
+    ("reportes.py", None, "reportes"),
+    ("sistema_atencion.py", "agregacion_calidad_por_taxi", "reportes"),
+    ("sistema_atencion.py", "agregacion_calidad_por_cliente", "reportes"),
+    ("sistema_atencion.py", "seleccionar_taxi_cliente", "matching"),
+    ("sistema_atencion.py", "procesar_solicitudes", "matching"),
+    ("sistema_atencion.py", "asignar_viaje", "matching"),
+    ("sistema_atencion.py", "_emparejar_lote", "matching"),
+    ("sistema_atencion.py", "_registrar_viajes", "matching"),
+    ("sistema_atencion.py", "recibir_solicitud", "matching"),
+    ("taxi.py", None, "movimiento"),
+    ("demanda.py", None, "movimiento"),
+    ("utils.py", "mover_hacia", "movimiento"),
+    ("gui.py", None, "gui"),
+    ("mapa.py", None, "gui"),
+    ("tkinter", None, "gui"),
+]
+
+
+def clasificar_pila(pila):
+    """
+    Subsistema de una pila de (archivo, función), ordenada de externa a interna.
+    Devuelve "otros" si ninguna regla aplica.
+    """
+    for archivo, funcion in reversed(pila):
+        for reg_archivo, reg_funcion, subsistema in REGLAS_SUBSISTEMA:
+            if reg_archivo in archivo and (reg_funcion is None or reg_funcion == funcion):
+                return subsistema
+    return "otros"
+
+
+def _nombre_archivo(nombre_hilo):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", nombre_hilo)
+
+
+class Perfilador:
+    def __init__(self, directorio="perfiles", intervalo_muestreo=0.005):
+        self.directorio = Path(directorio)
+        self.intervalo = intervalo_muestreo
+        self.perfiles = {}         # nombre de hilo -> cProfile.Profile
+        self.pilas = {}            # "hilo;archivo:func;..." -> muestras
+        self.subsistemas = {}      # subsistema -> muestras
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._run_original = None
+        self._hilo_muestreo = None
+        self._detenido = False
+
+    # ---------------------------
+    # Ciclo de vida
+    # ---------------------------
+    def iniciar(self):
+        """Perfila el hilo actual, instala el perfilado por hilo (si se puede) y arranca el muestreo."""
+        self._habilitar(threading.current_thread().name)
+        if PERFIL_POR_HILO:
+            perfilador = self
+            run_original = self._run_original = threading.Thread.run
+
+            def run_perfilado(hilo):
+                if hilo is perfilador._hilo_muestreo:
+                    return run_original(hilo)
+                prof = perfilador._habilitar(hilo.name)
+                try:
+                    return run_original(hilo)
+                finally:
+                    if prof is not None:
+                        prof.disable()
+
+            threading.Thread.run = run_perfilado
+        self._hilo_muestreo = threading.Thread(target=self._muestrear, name="Perfilador-Muestreo", daemon=True)
+        self._hilo_muestreo.start()
+        return self
+
+    def detener(self):
+        """Detiene el muestreo, restaura threading y escribe pstats, pilas y resumen."""
+        if self._detenido:
+            return
+        self._detenido = True
+        self._detener.set()
+        if self._run_original is not None:
+            threading.Thread.run = self._run_original
+        self._hilo_muestreo.join(timeout=1.0)
+        self.escribir()
+
+    def _habilitar(self, nombre):
+        """
+        Registra y activa un Profile para el hilo 'nombre'. None si el intérprete ya tiene otro
+        perfilador activo (el hilo sigue sin cProfile; el muestreo lo cubre).
+        """
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:  # "Another profiling tool is already active"
+            return None
+        with self._lock:
+            clave, i = nombre, 1
+            while clave in self.perfiles:
+                i += 1
+                clave = f"{nombre}-{i}"
+            self.perfiles[clave] = prof
+        return prof
+
+    # ---------------------------
+    # Muestreo de pilas
+    # ---------------------------
+    def _muestrear(self):
+        propio = threading.get_ident()
+        while not self._detener.wait(self.intervalo):
+            nombres = {h.ident: h.name for h in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == propio:
+                    continue
+                pila = []
+                while frame is not None:
+                    pila.append((frame.f_code.co_filename, frame.f_code.co_name))
+                    frame = frame.f_back
+                pila.reverse()
+                self.registrar_muestra(nombres.get(ident, str(ident)), pila)
+
+    def registrar_muestra(self, nombre_hilo, pila):
+        """Acumula una muestra (pila externa->interna de (archivo, función)) del hilo dado."""
+        clave = ";".join([nombre_hilo.split("-")[0]] + [f"{Path(a).stem}:{f}" for a, f in pila])
+        subsistema = clasificar_pila(pila)
+        with self._lock:
+            self.pilas[clave] = self.pilas.get(clave, 0) + 1
+            self.subsistemas[subsistema] = self.subsistemas.get(subsistema, 0) + 1
+
+    # ---------------------------
+    # Salida
+    # ---------------------------
+    def escribir(self):
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        total = None
+        with self._lock:
+            perfiles = dict(self.perfiles)
+            pilas = dict(self.pilas)
+            subsistemas = dict(self.subsistemas)
+        for nombre, prof in perfiles.items():
+            try:
+                prof.disable()
+                stats = pstats.Stats(prof)
+            except (TypeError, ValueError):
+                continue  # hilo sin datos recogidos
+            stats.dump_stats(self.directorio / f"{_nombre_archivo(nombre)}.pstats")
+            if total is None:
+                total = stats
+            else:
+                total.add(stats)
+        if total is not None:
+            total.dump_stats(self.directorio / "total.pstats")
+
+        with open(self.directorio / "stacks.collapsed", "w", encoding="utf-8") as f:
+            for pila, n in sorted(pilas.items()):
+                f.write(f"{pila} {n}\n")
+
+        muestras = sum(subsistemas.values()) or 1
+        lineas = [f"Perfil UNIETAXI ({time.strftime('%Y-%m-%d %H:%M:%S')}) - {sum(subsistemas.values())} muestras"]
+        for subsistema, n in sorted(subsistemas.items(), key=lambda kv: kv[1], reverse=True):
+            lineas.append(f"{subsistema:<14}{n:>8}  {100.0 * n / muestras:5.1f}%")
+        (self.directorio / "subsistemas.txt").write_text("\n".join(lineas) + "\n", encoding="utf-8")
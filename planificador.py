@@ -0,0 +1,248 @@
+# planificador.py
+"""
+Planificador único de las tareas periódicas del sistema (cierre, reporte, auditorías, volcados):
+- Un solo hilo con un heap de próximas ejecuciones; duerme hasta la más cercana (o hasta que se
+  agregue una anterior) en vez de sondear el reloj cada pocos segundos.
+- Especificaciones tipo cron de 5 campos "minuto hora día mes día_semana" (*, listas a,b,
+  rangos a-b y pasos */n o a-b/n; domingo = 0 o 7) o intervalos fijos en segundos.
+- Una ejecución que llega tarde (proceso ocupado o reloj saltado) se ejecuta igual; varias
+  perdidas se agrupan en una sola.
+- Recuperación tras reinicios: la última ejecución de cada tarea se guarda en
+  data/planificador.json y, con recuperar=True, una ejecución perdida mientras el proceso estaba
+  caído se hace al arrancar. Las escrituras de ese archivo se serializan; si fallan, el error
+  queda en error_estado y el planificador sigue.
+- Las tareas corren en un pool de hilos; una tarea nunca se solapa consigo misma.
+- estado() expone por tarea la próxima ejecución, la última, su duración y los errores; con un
+  RegistroMetricas también se exportan como métricas.
+"""
+
+import heapq
+import itertools
+import json
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+
+RUTA_ESTADO = Path("data") / "planificador.json"
+ESPERA_MAXIMA = 60.0  # segundos: revisa el reloj al menos así de seguido (saltos de hora, suspensión)
+
+EstadoTarea = namedtuple("EstadoTarea", "nombre especificacion proxima ultima duracion ejecuciones errores ultimo_error")
+
+
+class Cron:
+    """Expresión cron de 5 campos; siguiente(t) da el primer instante posterior a t (epoch)."""
+    RANGOS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expresion):
+        campos = expresion.split()
+        if len(campos) != 5:
+            raise ValueError(f"Expresión cron inválida (se esperan 5 campos): {expresion!r}")
+        self.expresion = expresion
+        self.minutos, self.horas, self.dias, self.meses, dias_semana = (
+            self._campo(c, lo, hi) for c, (lo, hi) in zip(campos, self.RANGOS))
+        self.dias_semana = {d % 7 for d in dias_semana}
+        # Como en cron: si se restringen día del mes y de la semana, basta con que coincida uno
+        self._dia_o_semana = campos[2] != "*" and campos[4] != "*"
+
+    @staticmethod
+    def _campo(texto, lo, hi):
+        valores = set()
+        for parte in texto.split(","):
+            rango, _, paso = parte.partition("/")
+            if rango == "*":
+                a, b = lo, hi
+            elif "-" in rango:
+                a, b = (int(x) for x in rango.split("-"))
+            else:
+                a = b = int(rango)
+                if paso:
+                    b = hi
+            if not (lo <= a <= b <= hi):
+                raise ValueError(f"Campo cron fuera de rango [{lo}, {hi}]: {texto!r}")
+            valores.update(range(a, b + 1, int(paso) if paso else 1))
+        return valores
+
+    def _dia_valido(self, t):
+        en_mes = t.day in self.dias
+        en_semana = (t.weekday() + 1) % 7 in self.dias_semana
+        return (en_mes or en_semana) if self._dia_o_semana else (en_mes and en_semana)
+
+    def siguiente(self, instante):
+        t = datetime.fromtimestamp(instante).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limite = t + timedelta(days=366 * 5)
+        while t < limite:
+            if t.month not in self.meses:
+                t = (t.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._dia_valido(t):
+                t = t.replace(hour=0, minute=0) + timedelta(days=1)
+            elif t.hour not in self.horas:
+                t = t.replace(minute=0) + timedelta(hours=1)
+            elif t.minute not in self.minutos:
+                t += timedelta(minutes=1)
+            else:
+                return t.timestamp()
+        raise ValueError(f"La expresión cron {self.expresion!r} no tiene próximas ejecuciones")
+
+    def __str__(self):
+        return self.expresion
+
+
+class Intervalo:
+    """Cada 'segundos' segundos desde el arranque."""
+
+    def __init__(self, segundos):
+        if segundos <= 0:
+            raise ValueError("El intervalo debe ser positivo")
+        self.segundos = segundos
+
+    def siguiente(self, instante):
+        return instante + self.segundos
+
+    def __str__(self):
+        return f"cada {self.segundos:g}s"
+
+
+class _Tarea:
+    __slots__ = ("nombre", "funcion", "especificacion", "recuperar", "proxima", "ultima", "duracion",
+                 "ejecuciones", "errores", "ultimo_error", "m_duracion")
+
+    def __init__(self, nombre, funcion, especificacion, recuperar):
+        self.nombre = nombre
+        self.funcion = funcion
+        self.especificacion = especificacion
+        self.recuperar = recuperar
+        self.proxima = None
+        self.ultima = None
+        self.duracion = None
+        self.ejecuciones = 0
+        self.errores = 0
+        self.ultimo_error = None
+        self.m_duracion = None
+
+
+class Planificador:
+    def __init__(self, trabajadores=2, ruta_estado=RUTA_ESTADO, reloj=time.time, metricas=None):
+        self.ruta_estado = Path(ruta_estado) if ruta_estado is not None else None
+        self.reloj = reloj
+        self.metricas = metricas
+        self._tareas = {}
+        self._heap = []  # (instante, secuencia, tarea)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=trabajadores, thread_name_prefix="Tarea")
+        self._hilo = None
+        self._detenido = False
+        self._lock_estado = threading.Lock()  # los trabajadores del pool guardan el estado en paralelo
+        self.error_estado = None
+        self._ultimas = self._cargar_estado()
+
+    def _cargar_estado(self):
+        if self.ruta_estado is None or not self.ruta_estado.exists():
+            return {}
+        try:
+            return json.loads(self.ruta_estado.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar_estado(self):
+        if self.ruta_estado is None:
+            return
+        with self._cond:
+            ultimas = {n: t.ultima for n, t in self._tareas.items() if t.ultima is not None}
+        tmp = self.ruta_estado.with_name(self.ruta_estado.name + ".tmp")
+        with self._lock_estado:
+            try:
+                self.ruta_estado.parent.mkdir(parents=True, exist_ok=True)
+                tmp.write_text(json.dumps(ultimas, indent=2), encoding="utf-8")
+                tmp.replace(self.ruta_estado)
+                self.error_estado = None
+            except OSError as e:  # sin estado persistido solo se pierde la recuperación tras reinicio
+                self.error_estado = f"{type(e).__name__}: {e}"
+
+    def agregar(self, nombre, funcion, especificacion, recuperar=False):
+        """
+        Programa 'funcion' según 'especificacion': expresión cron (str), segundos (número) o un
+        objeto con siguiente(instante). Con recuperar=True, si la última ejecución registrada
+        dejó pendiente alguna, se ejecuta en cuanto arranque el planificador.
+        """
+        if isinstance(especificacion, str):
+            especificacion = Cron(especificacion)
+        elif isinstance(especificacion, (int, float)):
+            especificacion = Intervalo(especificacion)
+        tarea = _Tarea(nombre, funcion, especificacion, recuperar)
+        ahora = self.reloj()
+        tarea.ultima = self._ultimas.get(nombre)
+        if recuperar and tarea.ultima is not None and especificacion.siguiente(tarea.ultima) <= ahora:
+            tarea.proxima = ahora
+        else:
+            tarea.proxima = especificacion.siguiente(ahora)
+        if self.metricas is not None:
+            etiquetas = {"tarea": nombre}
+            tarea.m_duracion = self.metricas.histograma("tarea_segundos", "Duración de las tareas programadas", etiquetas)
+            self.metricas.medidor("tarea_proxima_ejecucion_timestamp", "Próxima ejecución de la tarea (epoch)",
+                                  etiquetas, funcion=lambda: tarea.proxima or 0.0)
+        with self._cond:
+            if nombre in self._tareas:
+                raise ValueError(f"Tarea ya programada: {nombre}")
+            self._tareas[nombre] = tarea
+            heapq.heappush(self._heap, (tarea.proxima, next(self._seq), tarea))
+            self._cond.notify()
+        return self
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self._bucle, name="Planificador", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self, esperar=True):
+        """Detiene el hilo del planificador y espera a las tareas en curso."""
+        with self._cond:
+            self._detenido = True
+            self._cond.notify()
+        if self._hilo is not None:
+            self._hilo.join()
+        self._pool.shutdown(wait=esperar)
+
+    def _bucle(self):
+        with self._cond:
+            while not self._detenido:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                instante, _, tarea = self._heap[0]
+                espera = instante - self.reloj()
+                if espera > 0:
+                    self._cond.wait(min(espera, ESPERA_MAXIMA))
+                    continue
+                heapq.heappop(self._heap)
+                self._pool.submit(self._ejecutar, tarea, instante)
+
+    def _ejecutar(self, tarea, programada):
+        inicio = time.perf_counter()
+        try:
+            tarea.funcion()
+        except Exception as e:  # una tarea fallida no detiene al planificador
+            tarea.errores += 1
+            tarea.ultimo_error = f"{type(e).__name__}: {e}"
+        tarea.duracion = time.perf_counter() - inicio
+        if tarea.m_duracion is not None:
+            tarea.m_duracion.observar(tarea.duracion)
+        with self._cond:
+            tarea.ejecuciones += 1
+            tarea.ultima = programada
+            # Ejecuciones perdidas mientras corría (o mientras el proceso estuvo ocupado): una sola
+            tarea.proxima = tarea.especificacion.siguiente(max(programada, self.reloj()))
+            if not self._detenido:
+                heapq.heappush(self._heap, (tarea.proxima, next(self._seq), tarea))
+                self._cond.notify()
+        self._guardar_estado()
+
+    def estado(self):
+        """Lista de EstadoTarea ordenada por próxima ejecución."""
+        with self._cond:
+            filas = [EstadoTarea(t.nombre, str(t.especificacion), t.proxima, t.ultima, t.duracion,
+                                 t.ejecuciones, t.errores, t.ultimo_error) for t in self._tareas.values()]
+        return sorted(filas, key=lambda e: e.proxima)
@@ -0,0 +1,111 @@
+# pooling.py
+"""
+Viajes compartidos (pooling):
+- La ruta de un taxi es una lista ordenada de paradas (RECOGER/DEJAR, cliente).
+- evaluar_insercion() prueba todas las posiciones para la recogida y la bajada de un cliente
+  nuevo y devuelve la de menor distancia añadida que respete:
+  - capacidad del taxi en todo el recorrido,
+  - desvío máximo de cada pasajero (distancia a bordo <= (1 + desvio_max) x directa + holgura),
+  - distancia máxima hasta la nueva recogida,
+  - longitud máxima de la ruta (MAX_PARADAS): acota las recogidas pendientes y el coste de la
+    búsqueda, que es cúbico en el número de paradas.
+- Los pasajeros de un viaje compartido pagan la tarifa individual con descuento (reparto).
+"""
+
+import math
+
+RECOGER = "recoger"
+DEJAR = "dejar"
+
+CAPACIDAD = 3             # pasajeros simultáneos
+DESVIO_MAX = 0.5          # 50% más de recorrido a bordo que el trayecto directo
+HOLGURA_DESVIO = 0.05     # unidades de mapa toleradas en trayectos muy cortos
+DESCUENTO_COMPARTIDO = 0.25
+MAX_PARADAS = 2 * CAPACIDAD  # paradas en ruta, incluida la nueva recogida y bajada
+
+
+def _d(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+def punto_parada(parada):
+    tipo, cliente = parada
+    return cliente.origen if tipo == RECOGER else cliente.destino
+
+
+def longitud_ruta(posicion, paradas):
+    total = 0.0
+    actual = posicion
+    for parada in paradas:
+        p = punto_parada(parada)
+        total += _d(actual, p)
+        actual = p
+    return total
+
+
+def _factible(posicion, paradas, a_bordo, recorrido, capacidad, desvio_max):
+    """Acumulados por parada si la ruta respeta capacidad y desvíos; None si no."""
+    carga = len(a_bordo)
+    acumulado = []
+    total = 0.0
+    actual = posicion
+    recogida_en = {}
+    for tipo, cliente in paradas:
+        p = cliente.origen if tipo == RECOGER else cliente.destino
+        total += _d(actual, p)
+        actual = p
+        acumulado.append(total)
+        if tipo == RECOGER:
+            carga += 1
+            if carga > capacidad:
+                return None
+            recogida_en[cliente.id_cliente] = total
+        else:
+            carga -= 1
+            inicio = recogida_en.get(cliente.id_cliente)
+            a_bordo_dist = total - inicio if inicio is not None else recorrido.get(cliente.id_cliente, 0.0) + total
+            if a_bordo_dist > (1.0 + desvio_max) * _d(cliente.origen, cliente.destino) + HOLGURA_DESVIO:
+                return None
+    return acumulado
+
+
+def evaluar_insercion(posicion, paradas, a_bordo, recorrido, cliente, capacidad=CAPACIDAD,
+                      desvio_max=DESVIO_MAX, max_recogida=None, max_paradas=MAX_PARADAS):
+    """
+    Mejor inserción de 'cliente' en la ruta: (distancia_añadida, nuevas_paradas, distancia_hasta_recogida)
+    o None si ninguna posición es factible. 'a_bordo' son los clientes ya recogidos y 'recorrido'
+    (id_cliente -> distancia) lo que ya llevan a bordo.
+    """
+    n = len(paradas)
+    if n + 2 > max_paradas:
+        return None
+    # Distancia acumulada hasta cada parada de la ruta actual: poda recogidas demasiado lejanas
+    previas = [0.0]
+    actual = posicion
+    for parada in paradas:
+        p = punto_parada(parada)
+        previas.append(previas[-1] + _d(actual, p))
+        actual = p
+    base = previas[-1]
+    mejor = None
+    for i in range(n + 1):
+        if max_recogida is not None:
+            if previas[i] > max_recogida:
+                break
+            anterior = posicion if i == 0 else punto_parada(paradas[i - 1])
+            if previas[i] + _d(anterior, cliente.origen) > max_recogida:
+                continue
+        for j in range(i, n + 1):
+            nuevas = list(paradas)
+            nuevas.insert(j, (DEJAR, cliente))
+            nuevas.insert(i, (RECOGER, cliente))
+            acumulado = _factible(posicion, nuevas, a_bordo, recorrido, capacidad, desvio_max)
+            if acumulado is None:
+                continue
+            hasta_recogida = acumulado[i]
+            if max_recogida is not None and hasta_recogida > max_recogida:
+                continue
+            costo = acumulado[-1] - base
+            if mejor is None or costo < mejor[0]:
+                mejor = (costo, nuevas, hasta_recogida)
+    return mejor
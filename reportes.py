@@ -5,12 +5,15 @@ Módulo de reportes:
   - Viajes finalizados.
   - Ganancia empresa y por taxi.
   - Calificaciones promedio por taxi y por cliente.
-- Usa data/contabilidad.json y data/viajes.json como fuentes.
+- Usa data/viajes.json como fuente (o data/viajes.bin mapeado, leyendo solo la columna de
+  estados, si el sistema persiste en formato binario); ganancias (consolidadas del libro
+  contable) y calificaciones salen del último snapshot publicado por el sistema.
 """
 
 import json
 from pathlib import Path
 from datetime import datetime
+import formato_binario
 
 DATA_DIR = Path("data")
 DOCS_DIR = Path("docs")
@@ -22,23 +25,21 @@ class Reportes:
 
     def generar_reporte_mensual(self):
         """Escribe docs/reporte_mensual.md con datos agregados del sistema."""
-        contabilidad = {}
-        fcont = DATA_DIR / "contabilidad.json"
-        if fcont.exists():
-            with open(fcont, "r", encoding="utf-8") as f:
-                contabilidad = json.load(f)
-
-        por_taxi = self.sistema.agregacion_calidad_por_taxi()
-        por_cliente = self.sistema.agregacion_calidad_por_cliente()
-
-        fviajes = DATA_DIR / "viajes.json"
-        viajes = []
-        if fviajes.exists():
-            with open(fviajes, "r", encoding="utf-8") as f:
-                viajes = json.load(f)
-        viajes_total = len([v for v in viajes if v.get("estado") == "finalizado"])
-        ganancias_empresa = contabilidad.get("ganancia_empresa", 0.0)
-        ganancias_por_taxi = contabilidad.get("ganancias_por_taxi", {})
+        snap = self.sistema.obtener_snapshot()
+        por_taxi = snap.calidad_por_taxi
+        por_cliente = snap.calidad_por_cliente
+
+        if getattr(self.sistema, "formato_datos", "json") == "binario":
+            viajes_total = formato_binario.contar_estado(DATA_DIR / "viajes.bin", "finalizado")
+        else:
+            fviajes = DATA_DIR / "viajes.json"
+            viajes = []
+            if fviajes.exists():
+                with open(fviajes, "r", encoding="utf-8") as f:
+                    viajes = json.load(f)
+            viajes_total = len([v for v in viajes if v.get("estado") == "finalizado"])
+        ganancias_empresa = snap.ganancia_empresa
+        ganancias_por_taxi = snap.ganancias_por_taxi
 
         ts = datetime.now().strftime("%Y-%m-%d %H:%M")
         lines = [
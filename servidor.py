@@ -0,0 +1,185 @@
+# servidor.py
+"""
+Servidor asyncio de ingreso de solicitudes (JSON por líneas sobre TCP):
+- Cada línea del cliente es un objeto JSON con "op"; cada respuesta o evento es una línea JSON.
+  - {"op": "solicitar", "origen": [x, y], "destino": [x, y], "cliente_id": opcional, "ref": opcional}
+    -> {"ok": true, "op": "solicitar", "cliente_id": ..., "ref": ...}
+    Un cliente_id propio debe ser >= PRIMER_CLIENTE_REMOTO: los menores son de los clientes
+    simulados y pisarían sus solicitudes y viajes.
+  - {"op": "cancelar", "cliente_id": ...} -> {"ok": true|false, "op": "cancelar", "cliente_id": ...}
+  - {"op": "ping"} -> {"ok": true, "op": "ping", "ts": ...}
+- Eventos empujados por la misma conexión que hizo la solicitud (streaming):
+  {"evento": "asignado", ...} y {"evento": "finalizado", ...}.
+- Un único hilo despachador ejecuta procesar_solicitudes y las cancelaciones en serie, así
+  un taxi nunca se asigna dos veces; el bucle de eventos solo parsea y escribe.
+- Al cerrarse una conexión se cancelan sus solicitudes pendientes.
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from cliente import Cliente
+
+PUERTO = 7070
+INTERVALO_DESPACHO = 0.05
+BACKLOG = 4096
+PRIMER_CLIENTE_REMOTO = 1_000_000  # ids remotos (automáticos o propios), lejos de los clientes simulados
+
+
+def _punto(valor):
+    x, y = valor
+    return (min(1.0, max(0.0, float(x))), min(1.0, max(0.0, float(y))))
+
+
+class ServidorSolicitudes:
+    def __init__(self, sistema, host="127.0.0.1", puerto=PUERTO, intervalo_despacho=INTERVALO_DESPACHO):
+        self.sistema = sistema
+        self.host = host
+        self.puerto = puerto
+        self.intervalo_despacho = intervalo_despacho
+        self.conexiones = 0
+        self._clientes = {}      # cliente_id -> [Cliente, writer, asignado] con solicitud viva
+        self._ids = itertools.count(PRIMER_CLIENTE_REMOTO)
+        self._despachador = ThreadPoolExecutor(max_workers=1, thread_name_prefix="Servidor-Despacho")
+        self._server = None
+        self._loop = None
+        self._tarea_despacho = None
+        self._cerrado = False
+
+    # ---------------------------
+    # Ciclo de vida
+    # ---------------------------
+    async def iniciar(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._atender, self.host, self.puerto, backlog=BACKLOG)
+        self.puerto = self._server.sockets[0].getsockname()[1]
+        self.sistema.oyentes.append(self._al_evento)
+        self._tarea_despacho = asyncio.create_task(self._despachar())
+        return self
+
+    async def detener(self):
+        self._cerrado = True
+        if self._al_evento in self.sistema.oyentes:
+            self.sistema.oyentes.remove(self._al_evento)
+        if self._tarea_despacho is not None:
+            self._tarea_despacho.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self._despachador.shutdown(wait=False)
+
+    async def _despachar(self):
+        while True:
+            if not self.sistema.solicitudes.empty():
+                await self._loop.run_in_executor(self._despachador, self.sistema.procesar_solicitudes)
+            await asyncio.sleep(self.intervalo_despacho)
+
+    # ---------------------------
+    # Conexiones
+    # ---------------------------
+    async def _atender(self, reader, writer):
+        self.conexiones += 1
+        propios = set()
+        try:
+            while True:
+                linea = await reader.readline()
+                if not linea:
+                    break
+                try:
+                    msg = json.loads(linea)
+                    respuesta = await self._operar(msg, writer, propios)
+                except (ValueError, TypeError, KeyError) as e:
+                    respuesta = {"ok": False, "error": str(e)}
+                self._escribir(writer, respuesta)
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.conexiones -= 1
+            for cid in propios:
+                entrada = self._clientes.pop(cid, None)
+                if entrada is not None and not entrada[2] and not self._cerrado:
+                    await self._loop.run_in_executor(self._despachador, self.sistema.cancelar_solicitud, entrada[0])
+            writer.close()
+
+    async def _operar(self, msg, writer, propios):
+        op = msg["op"]
+        if op == "solicitar":
+            cid = msg.get("cliente_id")
+            if cid is None:
+                cid = next(self._ids)
+                while cid in self._clientes:  # ocupado por un id propio de otro cliente remoto
+                    cid = next(self._ids)
+            elif int(cid) < PRIMER_CLIENTE_REMOTO:
+                raise ValueError(f"cliente_id debe ser >= {PRIMER_CLIENTE_REMOTO}")
+            cid = int(cid)
+            if cid in self._clientes:
+                return {"ok": False, "op": op, "cliente_id": cid, "error": "solicitud en curso"}
+            cliente = Cliente(cid, self.sistema, origen=_punto(msg["origen"]), destino=_punto(msg["destino"]))
+            self._clientes[cid] = [cliente, writer, False]
+            propios.add(cid)
+            cliente.empujar_solicitud()
+            return {"ok": True, "op": op, "cliente_id": cid, "ref": msg.get("ref")}
+        if op == "cancelar":
+            cid = int(msg["cliente_id"])
+            entrada = self._clientes.get(cid)
+            ok = False
+            if entrada is not None and entrada[1] is writer:
+                ok = await self._loop.run_in_executor(self._despachador, self.sistema.cancelar_solicitud, entrada[0])
+                if ok:
+                    self._clientes.pop(cid, None)
+                    propios.discard(cid)
+            return {"ok": ok, "op": op, "cliente_id": cid}
+        if op == "ping":
+            return {"ok": True, "op": op, "ts": time.time()}
+        raise ValueError(f"op desconocida: {op}")
+
+    @staticmethod
+    def _escribir(writer, obj):
+        if not writer.is_closing():
+            writer.write(json.dumps(obj, separators=(",", ":")).encode() + b"\n")
+
+    # ---------------------------
+    # Eventos del sistema (desde el hilo despachador o de los taxis)
+    # ---------------------------
+    def _al_evento(self, evento):
+        self._loop.call_soon_threadsafe(self._empujar, evento)
+
+    def _empujar(self, evento):
+        cid = evento["cliente_id"]
+        entrada = self._clientes.get(cid)
+        if entrada is None:
+            return
+        if evento["evento"] == "asignado":
+            entrada[2] = True
+        elif evento["evento"] == "finalizado":
+            del self._clientes[cid]
+        self._escribir(entrada[1], evento)
+
+
+def iniciar_en_hilo(sistema, host="127.0.0.1", puerto=PUERTO):
+    """Arranca el servidor en un hilo daemon con su propio bucle asyncio; devuelve el servidor listo."""
+    servidor = ServidorSolicitudes(sistema, host, puerto)
+    listo = threading.Event()
+    errores = []
+
+    def correr():
+        async def principal():
+            try:
+                await servidor.iniciar()
+            except OSError as e:
+                errores.append(e)
+                return
+            finally:
+                listo.set()
+            await asyncio.Event().wait()
+        asyncio.run(principal())
+
+    threading.Thread(target=correr, name="Servidor-Solicitudes", daemon=True).start()
+    listo.wait()
+    if errores:
+        raise errores[0]
+    return servidor
@@ -2,45 +2,129 @@
 """
 Núcleo del sistema de atención UNIETAXI.
 Gestiona:
-- Cola de solicitudes y lista de taxis disponibles (con locks).
-- Matching cliente-taxi por distancia y desempate por calificación.
-- Asignación de viaje con datos del taxi y ETA.
+- Cola de solicitudes (con cancelación) y lista de taxis disponibles (con locks).
+- Oyentes de eventos de asignación y finalización (servidor.py los empuja a clientes remotos).
+- Matching cliente-taxi por distancia y desempate por calificación; también considera taxis a
+  punto de terminar su viaje y les encadena el siguiente servicio.
+- Estimación de demanda por zona y reposicionamiento de taxis libres (demanda.py).
+- Analítica por zona en ventanas deslizantes de 1, 5 y 60 minutos (analitica.py).
+- Asignación de viaje con datos del taxi, ETA y cotización única (tarifas.py).
+- Modo de viajes compartidos: inserción en rutas activas y reparto de tarifas (pooling.py).
 - Progreso, ETA en tiempo real y finalización con contabilidad (20% empresa).
-- Seguimiento de calidad y persistencia en JSON.
-- Agregación de calificaciones por taxi y por cliente.
+- Libro contable en céntimos con acumuladores por hilo (contabilidad.py).
+- Viajes en un almacén columnar con vistas tipo dict (almacen_viajes.py).
+- Seguimiento de calidad con cuota diaria y muestreo por reservorio (auditoria.py).
+- Persistencia fuera de lock_viajes en JSON o en formato binario mapeable (formato_binario.py),
+  incremental en ambos: solo se escribe desde el primer viaje que pudo cambiar.
+- Viajes finalizados anexados a un almacén analítico mapeado en memoria (almacen_analitico.py).
+- Agregación de calificaciones por taxi y por cliente con sumas acumuladas al finalizar.
+- Publicación de snapshots inmutables del estado para lectores (snapshot.py).
+- Métricas de cola, matching, viajes y persistencia (metricas.py).
+- Perfilado opcional de contención de locks (perfil_locks.py).
+- Checkpoint binario y restauración rápida del estado (checkpoint.py).
 """
 
-import threading
+import itertools
 import time
-import random
 import json
 from queue import Queue
 from pathlib import Path
-from utils import distancia_euclidiana, calcular_costo_viaje, to_eta, ensure_data_files
+from utils import distancia_euclidiana
+from tarifas import MotorTarifas, eta_recogida, eta_restante, VELOCIDAD_RECOGIDA
+from demanda import EstimadorDemanda, Rebalanceador
+from analitica import AnaliticaZonas
+from pooling import evaluar_insercion, RECOGER, DEJAR, DESCUENTO_COMPARTIDO
+from snapshot import construir_snapshot, snapshot_vacio, PublicadorSnapshots
+from metricas import RegistroMetricas, BUCKETS_ETA, BUCKETS_DURACION_VIAJE
+from perfil_locks import crear_lock, perfilado_habilitado, reporte_locks
+from contabilidad import LibroContable, a_centimos, a_euros
+from almacen_viajes import ArchivoViajesJSON, ColumnasViajes, promedios_calificaciones, sumar_calificaciones
+from almacen_analitico import AlmacenAnalitico
+from auditoria import MuestreoAuditoria
+import checkpoint
+import formato_binario
 
 DATA_DIR = Path("data")
 
+# Modo de cada asignación del matching
+DEDICADO = "dedicado"        # taxi libre reclamado para el cliente
+COMPARTIDO = "compartido"    # cliente insertado en la ruta de un taxi ocupado (pooling)
+ENCADENADO = "encadenado"    # siguiente servicio de un taxi a punto de terminar su viaje
+
 class SistemaAtencion:
-    def __init__(self):
-        # Estructuras compartidas
+    def __init__(self, perfilar_locks=None):
+        self.metricas = RegistroMetricas()
+
+        # Estructuras compartidas (locks instrumentados si perfilar_locks o UNIETAXI_PERFIL_LOCKS=1)
         self.solicitudes = Queue()
         self.taxis_disponibles = []
-        self.lock_taxis = threading.Lock()
-        self.lock_contabilidad = threading.Lock()
-        self.lock_viajes = threading.Lock()
+        self.perfilar_locks = perfilado_habilitado(perfilar_locks)
+        self.lock_taxis = crear_lock("lock_taxis", self.perfilar_locks, self.metricas)
+        self.lock_contabilidad = crear_lock("lock_contabilidad", self.perfilar_locks, self.metricas)
+        self.lock_viajes = crear_lock("lock_viajes", self.perfilar_locks, self.metricas)
+        self.lock_persistencia = crear_lock("lock_persistencia", self.perfilar_locks, self.metricas)  # antes de lock_viajes
 
         # Estado del sistema
-        self.viajes = []
-        self.ganancias_por_taxi = {}
-        self.ganancia_empresa = 0.0
+        self.viajes = ColumnasViajes()     # viajes de esta ejecución (columnar; elementos = vistas dict)
+        self.historico = ColumnasViajes()  # viajes restaurados de un checkpoint
+        self.libro = LibroContable()  # ganancias en céntimos, acumuladas por hilo
+        self.tarifas = MotorTarifas()
+        self.demanda = EstimadorDemanda()
+        self.rebalanceador = Rebalanceador(self, self.demanda)
+        self.analitica = AnaliticaZonas()
+        self.almacen_analitico = AlmacenAnalitico(DATA_DIR / "analitica")  # viajes finalizados por columnas
         self.rating_taxi = {}  # taxi_id -> (promedio, n)
+        # Calificaciones de viajes finalizados, acumuladas al finalizar (con lock_contabilidad)
+        self._calidad_por_taxi = {}     # taxi_id -> (suma, n)
+        self._calidad_por_cliente = {}  # cliente_id -> (suma, n)
+        self._calidad_pendiente = None  # histórico restaurado aún sin sumar (se suma al primer uso)
+        self._seq_viajes = itertools.count(1)
+
+        # Contadores de versión: permiten a lectores (GUI) saltarse refrescos sin cambios
+        self.version_viajes = 0        # cualquier cambio en viajes (alta, progreso, fin, auditoría)
+        self.version_contabilidad = 0  # ganancias y ratings por taxi
+
+        # Entidades conocidas (para snapshots) y último snapshot publicado
+        self.flota = []
+        self.clientes = []
+        self.snapshot = snapshot_vacio()
+        self._publicador = None
+
+        # Métricas (referencias directas para no buscar por nombre en caminos calientes)
+        m = self.metricas
+        m.medidor("cola_solicitudes", "Solicitudes en cola", funcion=self.num_solicitudes)
+        self._m_viajes_activos = m.medidor("viajes_activos", "Viajes activos")
+        self._m_solicitudes = m.contador("solicitudes_total", "Solicitudes recibidas")
+        self._m_reencoladas = m.contador("solicitudes_reencoladas_total", "Solicitudes reencoladas por falta de taxi cercano")
+        self._m_asignados = m.contador("viajes_asignados_total", "Viajes asignados")
+        self._m_finalizados = m.contador("viajes_finalizados_total", "Viajes finalizados")
+        self._m_procesar = m.histograma("procesar_solicitudes_segundos", "Duración de procesar_solicitudes")
+        self._m_asignar = m.histograma("asignar_viaje_segundos", "Duración de asignar_viaje")
+        self._m_finalizar = m.histograma("finalizar_viaje_segundos", "Duración de finalizar_viaje")
+        self._m_latencia_matching = m.histograma("latencia_matching_segundos", "Tiempo desde la solicitud hasta la asignación", buckets=BUCKETS_ETA)
+        self._m_eta_pickup = m.histograma("eta_pickup_segundos", "ETA de recogida estimada al asignar", buckets=BUCKETS_ETA)
+        self._m_duracion_viaje = m.histograma("duracion_viaje_segundos", "Duración total del viaje (asignación a fin)", buckets=BUCKETS_DURACION_VIAJE)
+        self._m_persistir_viajes = m.histograma("persistencia_segundos", "Duración de la persistencia", etiquetas={"archivo": "viajes"})
+        self._m_persistir_contabilidad = m.histograma("persistencia_segundos", "Duración de la persistencia", etiquetas={"archivo": "contabilidad"})
+        self._ts_solicitud = {}  # id_cliente -> instante de recepción (latencia de matching)
+        self._cancelados = set()  # clientes cancelados aún en la cola o en un lote en emparejamiento
+        self._m_canceladas = m.contador("solicitudes_canceladas_total", "Solicitudes canceladas antes de asignarse")
+
+        # Oyentes de eventos (asignado/finalizado): fn(evento_dict), llamados desde el hilo que procesa
+        self.oyentes = []
 
         # Parámetros
         self.radio_busqueda = 0.2
-        self.max_seguimientos_diarios = 5
-
-        # Inicializa archivos
-        ensure_data_files()
+        self.pooling = False          # viajes compartidos: insertar clientes en rutas activas
+        self.encadenar = True         # considerar taxis a punto de terminar su viaje
+        self.horizonte_encadenado = 1.0  # segundos máximos de viaje restante para encadenar
+        self._en_ruta = set()         # taxis ocupados con ruta cargada (pooling y encadenado)
+        self._activos = {}            # id_cliente -> vista del viaje activo
+        self.auditoria = MuestreoAuditoria(cuota=5, ruta=DATA_DIR / "auditorias.jsonl")
+        self.formato_datos = "json"   # "binario": viajes en data/viajes.bin (formato_binario.py)
+        self._archivo_json = ArchivoViajesJSON(DATA_DIR / "viajes.json")  # reescribe solo lo que cambió
+        self._archivo_binario = formato_binario.ArchivoViajesBinario(DATA_DIR / "viajes.bin")  # ídem, en su sitio
+        # Sin E/S de arranque: afiliacion.py carga clientes/taxis y cada persistencia crea su archivo
 
     # ---------------------------
     # Registro y validación
@@ -95,6 +179,7 @@ class SistemaAtencion:
         Añade un item a un archivo JSON tipo lista (clientes/taxis), creando si es necesario.
         """
         fp = DATA_DIR / fname
+        DATA_DIR.mkdir(exist_ok=True)
         try:
             with open(fp, "r", encoding="utf-8") as f:
                 content = f.read().strip()
@@ -114,12 +199,52 @@ class SistemaAtencion:
             if taxi not in self.taxis_disponibles:
                 self.taxis_disponibles.append(taxi)
 
+    def registrar_taxis_disponibles(self, taxis):
+        """Agrega un lote de taxis admitidos a disponibles con una sola adquisición del lock."""
+        with self.lock_taxis:
+            presentes = set(self.taxis_disponibles)
+            for taxi in taxis:
+                if taxi.admitido and taxi not in presentes:
+                    self.taxis_disponibles.append(taxi)
+                    presentes.add(taxi)
+
     def desregistrar_taxi_disponible(self, taxi):
         """Elimina el taxi de la lista de disponibles (con exclusión mutua)."""
         with self.lock_taxis:
             if taxi in self.taxis_disponibles:
                 self.taxis_disponibles.remove(taxi)
 
+    def registrar_entidades(self, taxis, clientes):
+        """Registra la flota y los clientes de la simulación para incluirlos en los snapshots."""
+        self.flota = list(taxis)
+        self.clientes = list(clientes)
+
+    # ---------------------------
+    # Snapshots para lectores
+    # ---------------------------
+    def publicar_snapshot(self):
+        """Construye y publica (reemplazo atómico de referencia) un nuevo snapshot inmutable."""
+        self.snapshot = construir_snapshot(self, self.snapshot)
+        return self.snapshot
+
+    def obtener_snapshot(self):
+        """Último snapshot publicado; si no hay publicador activo, publica uno al momento."""
+        if self._publicador is not None and self._publicador.activo:
+            return self.snapshot
+        return self.publicar_snapshot()
+
+    def iniciar_publicacion_snapshots(self, intervalo=0.25):
+        """Lanza el hilo que publica snapshots a intervalo fijo."""
+        if self._publicador is None or not self._publicador.activo:
+            self._publicador = PublicadorSnapshots(self, intervalo)
+            self.publicar_snapshot()
+            self._publicador.iniciar()
+        return self._publicador
+
+    def reporte_locks(self):
+        """Reporte de contención de los locks del sistema ("" si el perfilado está deshabilitado)."""
+        return reporte_locks([self.lock_taxis, self.lock_viajes, self.lock_contabilidad, self.lock_persistencia])
+
     # ---------------------------
     # Métricas rápidas
     # ---------------------------
@@ -128,108 +253,359 @@ class SistemaAtencion:
 
     def viajes_activos(self):
         with self.lock_viajes:
-            return len([v for v in self.viajes if v.get("estado") == "activo"])
+            return len(self._activos)
 
     def listar_viajes_activos(self):
         with self.lock_viajes:
-            return [v for v in self.viajes if v.get("estado") == "activo"]
+            return list(self._activos.values())
 
     # ---------------------------
     # Solicitudes y matching
     # ---------------------------
     def recibir_solicitud(self, cliente):
-        """Encola la solicitud del cliente."""
+        """Encola la solicitud del cliente y la suma al estimador de demanda y a la analítica."""
+        self._ts_solicitud[cliente.id_cliente] = time.perf_counter()
+        self._m_solicitudes.inc()
+        self.demanda.registrar(cliente.origen)
+        self.analitica.registrar_solicitud(cliente.origen)
         self.solicitudes.put(cliente)
 
+    def recibir_solicitudes_lote(self, clientes):
+        """Encola un lote de solicitudes con una sola adquisición del mutex de la cola."""
+        clientes = list(clientes)
+        ahora = time.perf_counter()
+        for cliente in clientes:
+            self._ts_solicitud[cliente.id_cliente] = ahora
+            self.demanda.registrar(cliente.origen)
+            self.analitica.registrar_solicitud(cliente.origen)
+        self._m_solicitudes.inc(len(clientes))
+        self._encolar_lote(clientes)
+
+    def _encolar_lote(self, clientes):
+        if not clientes:
+            return
+        cola = self.solicitudes
+        with cola.mutex:
+            cola.queue.extend(clientes)
+            cola.unfinished_tasks += len(clientes)
+            cola.not_empty.notify(len(clientes))
+
+    def _vaciar_cola(self):
+        """Extrae de una vez todas las solicitudes en cola, descartando las canceladas."""
+        cola = self.solicitudes
+        with cola.mutex:
+            pendientes = list(cola.queue)
+            cola.queue.clear()
+            cola.not_full.notify_all()
+        if not self._cancelados:
+            return pendientes
+        vigentes = []
+        for cliente in pendientes:
+            if cliente in self._cancelados:
+                self._cancelados.discard(cliente)
+            else:
+                vigentes.append(cliente)
+        return vigentes
+
+    def cancelar_solicitud(self, cliente):
+        """
+        Cancela la solicitud pendiente del cliente (se descarta al salir de la cola o, si ya se
+        estaba emparejando, al registrar el lote). Devuelve False si no estaba pendiente (ya
+        asignada o nunca recibida). Con lock_viajes: _registrar_viajes la ve o ya la asignó.
+        """
+        with self.lock_viajes:
+            if self._ts_solicitud.pop(cliente.id_cliente, None) is None:
+                return False
+            self._cancelados.add(cliente)
+        cliente.solicitud_enviada = False
+        self._m_canceladas.inc()
+        return True
+
+    def _notificar(self, evento):
+        for oyente in list(self.oyentes):
+            oyente(evento)
+
     def procesar_solicitudes(self, callback_historial=None):
         """
-        Intenta asignar taxis a las solicitudes en cola.
-        Reencola si no hay taxis cercanos para evitar bucles vacíos.
-        """
-        nuevas_solicitudes = []
-        while not self.solicitudes.empty():
-            cliente = self.solicitudes.get()
-            taxi_asignado = self.seleccionar_taxi_cliente(cliente)
-            if taxi_asignado:
-                viaje_info = self.asignar_viaje(cliente, taxi_asignado)
-                # Llamamos al callback para registrar en historial
-                if callback_historial:
-                    callback_historial(viaje_info, cliente, taxi_asignado)
-            else:
-                nuevas_solicitudes.append(cliente)
+        Asigna taxis a todas las solicitudes en cola en un solo lote:
+        - Emparejamiento en orden de llegada con una adquisición de lock_taxis.
+        - Alta de los viajes con una adquisición de lock_viajes y una sola persistencia.
+        Reencola las que no tienen taxi cercano para evitar bucles vacíos.
+        """
+        with self._m_procesar.medir():
+            pares, sin_taxi = self._emparejar_lote(self._vaciar_cola())
+            for (cliente, taxi, _, _), viaje_info in zip(pares, self._registrar_viajes(pares)):
+                # Llamamos al callback para registrar en historial (None: cancelada durante el lote)
+                if callback_historial and viaje_info is not None:
+                    callback_historial(viaje_info, cliente, taxi)
 
-        # Reencolar las solicitudes que no se pudieron atender
-        for c in nuevas_solicitudes:
-            self.solicitudes.put(c)
+            # Reencolar las solicitudes que no se pudieron atender
+            self._encolar_lote(sin_taxi)
+            self._m_reencoladas.inc(len(sin_taxi))
 
     def seleccionar_taxi_cliente(self, cliente):
         """
         Selecciona el taxi más cercano dentro del radio; desempata por calificación del taxi.
         """
-        candidatos = []
+        candidato = self._mejor_candidato(cliente)
+        return candidato[1] if candidato else None
+
+    def _mejor_candidato(self, cliente, libres=None):
+        """(distancia, taxi) del mejor taxi libre dentro del radio, o None."""
+        if libres is None:
+            with self.lock_taxis:
+                libres = list(self.taxis_disponibles)
+        mejor = None
+        for taxi in libres:
+            if taxi.ocupado:
+                continue
+            d = distancia_euclidiana(taxi.ubicacion, cliente.origen)
+            if d <= self.radio_busqueda and (mejor is None or (d, -taxi.calificacion) < (mejor[0], -mejor[1].calificacion)):
+                mejor = (d, taxi)
+        return mejor
+
+    def _emparejar_lote(self, clientes):
+        """
+        Empareja cada cliente (en orden) con el mejor taxi libre restante y reclama los elegidos,
+        todo con una sola adquisición de lock_taxis. Con pooling, un cliente se inserta en la ruta
+        de un taxi ocupado si eso añade menos recorrido que un viaje dedicado. Con encadenado, un
+        taxi a punto de bajar a su pasajero gana si recogería antes que el mejor taxi libre.
+        Devuelve ([(cliente, taxi, distancia_recogida, modo)], sin_taxi).
+        """
+        pares, sin_taxi = [], []
+        if not clientes:
+            return pares, sin_taxi
         with self.lock_taxis:
-            for taxi in self.taxis_disponibles:
-                if taxi.ocupado:
+            libres = [t for t in self.taxis_disponibles if not t.ocupado]
+            for cliente in clientes:
+                candidato = self._mejor_candidato(cliente, libres) if libres else None
+                insercion = self._mejor_insercion(cliente) if self.pooling and self._en_ruta else None
+                if insercion is not None:
+                    costo, taxi, paradas, hasta_recogida = insercion
+                    dedicado = None if candidato is None else candidato[0] + distancia_euclidiana(cliente.origen, cliente.destino)
+                    if dedicado is None or costo < dedicado:
+                        taxi.paradas[:] = paradas
+                        pares.append((cliente, taxi, hasta_recogida, COMPARTIDO))
+                        continue
+                encadenado = self._mejor_encadenado(cliente) if self.encadenar and self._en_ruta else None
+                if encadenado is not None and (candidato is None or encadenado[0] < eta_recogida(candidato[0])):
+                    espera, taxi = encadenado
+                    taxi.paradas.extend([(RECOGER, cliente), (DEJAR, cliente)])
+                    # Distancia equivalente a la velocidad de recogida: eta_pickup == espera
+                    pares.append((cliente, taxi, espera * VELOCIDAD_RECOGIDA, ENCADENADO))
                     continue
-                d = distancia_euclidiana(taxi.ubicacion, cliente.origen)
-                if d <= self.radio_busqueda:
-                    candidatos.append((d, taxi))
-        if not candidatos:
-            return None
-        candidatos.sort(key=lambda dt: (dt[0], -dt[1].calificacion))
-        return candidatos[0][1]
-
-    def asignar_viaje(self, cliente, taxi):
+                if candidato is None:
+                    sin_taxi.append(cliente)
+                    continue
+                distancia, taxi = candidato
+                taxi.ocupado = True
+                libres.remove(taxi)
+                pares.append((cliente, taxi, distancia, DEDICADO))
+            reclamados = {taxi for _, taxi, _, modo in pares if modo == DEDICADO}
+            if reclamados:
+                self.taxis_disponibles[:] = [t for t in self.taxis_disponibles if t not in reclamados]
+        return pares, sin_taxi
+
+    def _mejor_insercion(self, cliente):
+        """(distancia_añadida, taxi, nuevas_paradas, distancia_hasta_recogida) más barata, o None."""
+        mejor = None
+        alcance = 2 * self.radio_busqueda
+        for taxi in self._en_ruta:
+            if distancia_euclidiana(taxi.ubicacion, cliente.origen) > alcance:
+                continue
+            res = evaluar_insercion(taxi.ubicacion, taxi.paradas, taxi.a_bordo, taxi.recorrido, cliente,
+                                    max_recogida=alcance)
+            if res is not None and (mejor is None or res[0] < mejor[0]):
+                mejor = (res[0], taxi, res[1], res[2])
+        return mejor
+
+    def _mejor_encadenado(self, cliente):
+        """
+        (espera, taxi) del taxi ocupado que recogería antes al cliente tras bajar a su pasajero, o None.
+        Solo taxis cuya única parada es la bajada final y cuyo viaje restante (calcular_eta) no
+        supera el horizonte; la espera es ese resto más la recogida desde el punto de bajada y no
+        puede superar la de un taxi libre en el límite del radio de búsqueda.
+        Se llama con lock_taxis; los viajes activos se leen sin lock_viajes (lectura de un dict).
+        """
+        limite = eta_recogida(self.radio_busqueda)  # la misma espera máxima que un taxi libre
+        mejor = None
+        for taxi in self._en_ruta:
+            if len(taxi.paradas) != 1 or taxi.paradas[0][0] != DEJAR:
+                continue
+            pasajero = taxi.paradas[0][1]
+            v = self._activos.get(pasajero.id_cliente)
+            if v is None:
+                continue
+            resto = self.calcular_eta(v)
+            if resto > self.horizonte_encadenado:
+                continue
+            espera = resto + eta_recogida(distancia_euclidiana(pasajero.destino, cliente.origen))
+            if espera > limite:
+                continue
+            if mejor is None or espera < mejor[0]:
+                mejor = (espera, taxi)
+        return mejor
+
+    def asignar_viaje(self, cliente, taxi, distancia_recogida=None):
         """
         Crea un viaje activo con datos del taxi y ETA de recogida, y asigna el servicio al taxi.
+        El viaje se cotiza aquí una única vez (costo y duración quedan en el registro);
+        'distancia_recogida' reutiliza la distancia ya calculada por el matching.
+        Devuelve None si la solicitud del cliente se canceló entretanto.
         """
         taxi.ocupado = True
         self.desregistrar_taxi_disponible(taxi)
+        if distancia_recogida is None:
+            distancia_recogida = distancia_euclidiana(taxi.ubicacion, cliente.origen)
+        return self._registrar_viajes([(cliente, taxi, distancia_recogida, DEDICADO)])[0]
 
-        costo = calcular_costo_viaje(cliente.origen, cliente.destino)
-        eta_pickup = to_eta(taxi.ubicacion, cliente.origen, velocidad=0.2)
-        viaje = {
-            "cliente_id": cliente.id_cliente,
-            "taxi_id": taxi.id_taxi,
-            "origen": cliente.origen,
-            "destino": cliente.destino,
-            "estado": "activo",
-            "inicio_ts": time.time(),
-            "costo_estimado": costo,
-            "calificacion_cliente": None,
-            "placa_taxi": taxi.placa,
-            "conductor": taxi.nombre_conductor,
-            "eta_pickup": eta_pickup,
-            "progreso": 0.0,
-            "taxi_calificacion": taxi.calificacion
-        }
+    def asignar_lote(self, clientes):
+        """
+        Empareja y asigna un lote de clientes (sin pasar por la cola).
+        Devuelve ([(cliente, taxi, info_viaje)], clientes_sin_taxi).
+        """
+        pares, sin_taxi = self._emparejar_lote(list(clientes))
+        infos = self._registrar_viajes(pares)
+        return [(c, t, info) for (c, t, _, _), info in zip(pares, infos) if info is not None], sin_taxi
+
+    def _registrar_viajes(self, pares):
+        """
+        Crea los viajes de los pares (cliente, taxi ya reclamado, distancia de recogida, modo)
+        con una cotización en lote (MotorTarifas.cotizar), una adquisición de lock_viajes y una
+        persistencia (fuera del lock); devuelve la info de cada viaje.
+        En un viaje compartido todos los pasajeros del taxi pagan la tarifa con descuento.
+        Los viajes compartidos y encadenados ya tienen sus paradas en la ruta del taxi.
+        Un cliente cancelado mientras se emparejaba no recibe viaje (info None) y su taxi se libera.
+        """
+        if not pares:
+            return []
+        inicio = time.perf_counter()
+        viajes = []
+        costos, duraciones = self.tarifas.cotizar([c.origen for c, _, _, _ in pares], [c.destino for c, _, _, _ in pares])
+        for (cliente, taxi, distancia, modo), costo, duracion in zip(pares, costos, duraciones):
+            costo, duracion = float(costo), float(duracion)
+            if modo == COMPARTIDO:
+                costo = round(costo * (1 - DESCUENTO_COMPARTIDO), 2)
+            viajes.append({
+                "id": None,  # se numera al registrarlo, para no dejar huecos por cancelaciones
+                "cliente_id": cliente.id_cliente,
+                "taxi_id": taxi.id_taxi,
+                "origen": cliente.origen,
+                "destino": cliente.destino,
+                "estado": "activo",
+                "inicio_ts": time.time(),
+                "costo_estimado": costo,
+                "duracion_estimada": duracion,
+                "calificacion_cliente": None,
+                "placa_taxi": taxi.placa,
+                "conductor": taxi.nombre_conductor,
+                "eta_pickup": eta_recogida(distancia),
+                "progreso": 0.0,
+                "taxi_calificacion": taxi.calificacion,
+                **({modo: True} if modo != DEDICADO else {}),
+            })
+        registrados, descartados = [], []
         with self.lock_viajes:
-            self.viajes.append(viaje)
-            self.persistir_viajes()
+            for k, (par, viaje) in enumerate(zip(pares, viajes)):
+                cliente = par[0]
+                if cliente in self._cancelados:
+                    self._cancelados.discard(cliente)
+                    descartados.append(par)
+                    continue
+                viaje["id"] = next(self._seq_viajes)
+                self._activos[viaje["cliente_id"]] = self.viajes.agregar(viaje)
+                ts_solicitud = self._ts_solicitud.pop(cliente.id_cliente, None)
+                registrados.append((k, par, viaje, ts_solicitud))
+            for _, (_, taxi, _, modo), _, _ in registrados:
+                if modo == COMPARTIDO:
+                    self._repartir_tarifas(taxi)
+            self.version_viajes += 1
+        self.persistir_viajes()
+        if descartados:
+            self._devolver_taxis(descartados)
+
+        infos = [None] * len(pares)
+        por_viaje = (time.perf_counter() - inicio) / len(pares)
+        for k, (cliente, taxi, _, modo), viaje, ts_solicitud in registrados:
+            if modo == DEDICADO:
+                taxi.asignar_servicio(cliente)
+            elif taxi.cliente_actual is None:
+                taxi.cliente_actual = cliente
+            eta_pickup = viaje["eta_pickup"]
+            espera = inicio - ts_solicitud if ts_solicitud is not None else 0.0
+            if ts_solicitud is not None:
+                self._m_latencia_matching.observar(espera)
+            self.analitica.registrar_asignacion(cliente.origen, espera)
+            self._m_eta_pickup.observar(eta_pickup)
+            self._m_asignar.observar(por_viaje)
+            info = {"viaje_id": viaje["id"], "placa": taxi.placa, "conductor": taxi.nombre_conductor, "eta_pickup": eta_pickup}
+            if self.oyentes:
+                self._notificar({"evento": "asignado", "cliente_id": cliente.id_cliente, "taxi_id": taxi.id_taxi,
+                                 "costo_estimado": viaje["costo_estimado"], **info})
+            infos[k] = info
+        # Admiten inserciones y encadenados desde el próximo lote, ya con su ruta cargada
+        with self.lock_taxis:
+            self._en_ruta.update(taxi for _, (_, taxi, _, modo), _, _ in registrados if modo == DEDICADO)
+        self._m_asignados.inc(len(registrados))
+        self._m_viajes_activos.inc(len(registrados))
+        return infos
 
-        taxi.asignar_servicio(cliente)
-        return {"placa": taxi.placa, "conductor": taxi.nombre_conductor, "eta_pickup": eta_pickup}
+    def _devolver_taxis(self, pares):
+        """Deshace el emparejamiento de pares cancelados: libera el taxi dedicado o quita las paradas añadidas."""
+        with self.lock_taxis:
+            for cliente, taxi, _, modo in pares:
+                if modo == DEDICADO:
+                    taxi.ocupado = False
+                    if taxi not in self.taxis_disponibles:
+                        self.taxis_disponibles.append(taxi)
+                else:
+                    taxi.paradas[:] = [p for p in taxi.paradas if p[1] is not cliente]
+
+    def _repartir_tarifas(self, taxi):
+        """Aplica el descuento de viaje compartido a los pasajeros del taxi que aún no lo tienen (con lock_viajes)."""
+        for _, cliente in taxi.paradas:
+            v = self._activos.get(cliente.id_cliente)
+            if v is not None and v["taxi_id"] == taxi.id_taxi and not v.get("compartido"):
+                v["costo_estimado"] = round(v["costo_estimado"] * (1 - DESCUENTO_COMPARTIDO), 2)
+                v["compartido"] = True
+
+    def completar_parada(self, taxi, parada):
+        """
+        Retira la parada alcanzada de la ruta y sube/baja al pasajero (con lock_taxis, para que el
+        pooling vea rutas y pasajeros coherentes). False si la ruta cambió y ya no es la primera.
+        """
+        tipo, cliente = parada
+        with self.lock_taxis:
+            if not taxi.paradas or taxi.paradas[0] is not parada:
+                return False
+            taxi.paradas.pop(0)
+            if tipo == RECOGER:
+                taxi.a_bordo.append(cliente)
+                taxi.recorrido[cliente.id_cliente] = 0.0
+            elif cliente in taxi.a_bordo:
+                taxi.a_bordo.remove(cliente)
+            return True
 
     # ---------------------------
     # Progreso y ETA
     # ---------------------------
-    def actualizar_progreso(self, taxi, progreso):
-        """Actualiza el progreso (0..1) del viaje activo asociado al taxi."""
+    def actualizar_progreso(self, taxi, progreso, cliente=None):
+        """Actualiza el progreso (0..1) del viaje activo del cliente (por defecto, el actual del taxi)."""
+        cliente = cliente or taxi.cliente_actual
+        if cliente is None:
+            return
         with self.lock_viajes:
-            for v in self.viajes:
-                if v["estado"] == "activo" and v["taxi_id"] == taxi.id_taxi and taxi.cliente_actual and v["cliente_id"] == taxi.cliente_actual.id_cliente:
-                    v["progreso"] = max(0.0, min(1.0, progreso))
-                    break
+            v = self._activos.get(cliente.id_cliente)
+            if v is not None and v["taxi_id"] == taxi.id_taxi:
+                v["progreso"] = max(0.0, min(1.0, progreso))
+                self.version_viajes += 1
 
     def calcular_eta(self, viaje):
         """
         Calcula ETA restante del trayecto activo:
-        - Aproximación con distancia origen->destino y velocidad media 0.24.
+        - Duración cotizada al asignar (velocidad media 0.24) escalada por el progreso.
         """
-        dist_total = distancia_euclidiana(viaje["origen"], viaje["destino"])
-        t_total = dist_total / 0.24
-        p = viaje.get("progreso", 0.0)
-        return max(0.0, (1.0 - p) * t_total)
+        return eta_restante(viaje)
 
     # ---------------------------
     # Finalización y contabilidad
@@ -244,105 +620,280 @@ class SistemaAtencion:
     def finalizar_viaje(self, taxi, cliente, calificacion):
         """
         Finaliza el viaje:
-        - Calcula comisiones (20% empresa) y pagos por taxi.
-        - Actualiza registro del viaje y libera taxi.
+        - Actualiza registro del viaje.
+        - Registra el asiento contable (20% empresa, resto taxista) en céntimos, sin lock global.
+        - Actualiza rating y libera el taxi si no le quedan paradas.
         """
-        costo = calcular_costo_viaje(cliente.origen, cliente.destino)
-        comision_empresa = costo * 0.20
-        pago_taxista = costo - comision_empresa
+        inicio = time.perf_counter()
 
-        # Actualiza contabilidad
-        with self.lock_contabilidad:
-            self.ganancia_empresa += comision_empresa
-            self.ganancias_por_taxi[taxi.id_taxi] = self.ganancias_por_taxi.get(taxi.id_taxi, 0.0) + pago_taxista
-            self.persistir_contabilidad()
-
-        # Marca viaje como finalizado
+        # Marca viaje como finalizado (el costo es el cotizado al asignar)
+        viaje_id = None
+        costo = None
+        finalizado = None
         with self.lock_viajes:
-            for v in self.viajes:
-                if v["cliente_id"] == cliente.id_cliente and v["taxi_id"] == taxi.id_taxi and v["estado"] == "activo":
-                    v["estado"] = "finalizado"
-                    v["fin_ts"] = time.time()
-                    v["calificacion_cliente"] = calificacion
-                    break
-            self.persistir_viajes()
+            v = self._activos.get(cliente.id_cliente)
+            if v is not None and v["taxi_id"] == taxi.id_taxi:
+                finalizado = v
+                del self._activos[cliente.id_cliente]
+                viaje_id = v.get("id")
+                costo = v["costo_estimado"]
+                v["estado"] = "finalizado"
+                v["fin_ts"] = time.time()
+                v["calificacion_cliente"] = calificacion
+                self._m_duracion_viaje.observar(v["fin_ts"] - v["inicio_ts"])
+            self.version_viajes += 1
+        self.persistir_viajes()
+        if finalizado is not None:
+            self.auditoria.ofrecer(finalizado.almacen, finalizado.indice)
+            self.almacen_analitico.anexar(finalizado)
+
+        # Contabilidad: asiento en el shard del hilo actual (sin lock global)
+        if costo is None:  # sin viaje activo registrado: se cotiza al momento
+            costo = self.tarifas.cotizar_viaje(cliente.origen, cliente.destino).costo
+        self.libro.registrar_viaje(taxi.id_taxi, costo, viaje_id)
+        self.analitica.registrar_finalizacion(cliente.origen)
 
         # Métrica de calidad
-        self.actualizar_rating_taxi(taxi.id_taxi, calificacion)
-
-        # Libera taxi
-        taxi.ocupado = False
-        self.registrar_taxi_disponible(taxi)
+        with self.lock_contabilidad:
+            self.actualizar_rating_taxi(taxi.id_taxi, calificacion)
+            if finalizado is not None and calificacion is not None:
+                for agregado, clave in ((self._calidad_por_taxi, taxi.id_taxi),
+                                        (self._calidad_por_cliente, cliente.id_cliente)):
+                    suma, n = agregado.get(clave, (0.0, 0))
+                    agregado[clave] = (suma + calificacion, n + 1)
+            self.version_contabilidad += 1
+
+        # Libera el taxi si su ruta quedó vacía (puede seguir con pasajeros compartidos o encadenados)
+        with self.lock_taxis:
+            taxi.paradas[:] = [p for p in taxi.paradas if p[1] is not cliente]
+            if cliente in taxi.a_bordo:
+                taxi.a_bordo.remove(cliente)
+            taxi.recorrido.pop(cliente.id_cliente, None)
+            libre = not taxi.paradas
+            taxi.cliente_actual = None if libre else taxi.paradas[0][1]
+            if libre:
+                taxi.ocupado = False
+                self._en_ruta.discard(taxi)
+                if taxi not in self.taxis_disponibles:
+                    self.taxis_disponibles.append(taxi)
+        self._m_finalizados.inc()
+        if finalizado is not None:
+            self._m_viajes_activos.dec()
+        self._m_finalizar.observar(time.perf_counter() - inicio)
+        if self.oyentes:
+            self._notificar({"evento": "finalizado", "cliente_id": cliente.id_cliente, "taxi_id": taxi.id_taxi,
+                             "viaje_id": viaje_id, "costo": costo})
 
     # ---------------------------
     # Seguimiento de calidad
     # ---------------------------
+    @property
+    def max_seguimientos_diarios(self):
+        return self.auditoria.cuota
+
+    @max_seguimientos_diarios.setter
+    def max_seguimientos_diarios(self, cuota):
+        self.auditoria.cuota = cuota
+
     def seguimiento_calidad(self):
-        """Marca hasta 5 viajes finalizados como auditados aleatoriamente."""
-        with self.lock_viajes:
-            finalizados = [v for v in self.viajes if v.get("estado") == "finalizado"]
-        if not finalizados:
-            return
-        seleccion = random.sample(finalizados, k=min(self.max_seguimientos_diarios, len(finalizados)))
-        with self.lock_viajes:
-            for v in seleccion:
-                v["seguimiento_auditoria"] = True
-            self.persistir_viajes()
+        """
+        Audita la muestra uniforme de los viajes finalizados desde el último seguimiento, hasta
+        la cuota del día. Solo persiste las banderas marcadas. Devuelve cuántos viajes auditó.
+        """
+        muestra = self.auditoria.tomar()
+        if not muestra:
+            return 0
+        with self.lock_persistencia, self.lock_viajes:
+            for almacen, i in muestra:
+                almacen.marcar_auditado(i)
+            # En JSON las filas ya escritas no se tocan: la bandera queda en data/auditorias.jsonl
+            # (leer_json la aplica al cargar) y llega al archivo si la fila se reescribe. El
+            # binario se parchea en su sitio.
+            self.version_viajes += 1
+            if self.formato_datos == "binario" and self._archivo_binario.ruta.exists():
+                base = len(self.historico)
+                self._archivo_binario.marcar_bandera(
+                    "auditado", [i if almacen is self.historico else base + i for almacen, i in muestra])
+        return len(muestra)
 
     # ---------------------------
     # Contabilidad y persistencia
     # ---------------------------
+    @property
+    def ganancia_empresa(self):
+        """Total consolidado de comisiones de la empresa (euros, exacto al céntimo)."""
+        return self.libro.ganancia_empresa()
+
+    @property
+    def ganancias_por_taxi(self):
+        """taxi_id -> pagos acumulados (euros, exactos al céntimo), consolidados del libro."""
+        return self.libro.ganancias_por_taxi()
+
     def cierre_contable(self):
-        """Persiste el estado contable; pensado para ejecución manual."""
+        """Consolida el libro, persiste totales y vuelca los asientos nuevos a data/libro_contable.jsonl."""
         with self.lock_contabilidad:
             self.persistir_contabilidad()
+            self.libro.volcar_asientos(DATA_DIR / "libro_contable.jsonl")
 
     def cierre_contable_programado(self):
         """Alias del cierre contable para el scheduler diario."""
         self.cierre_contable()
 
     def persistir_viajes(self):
-        """Guarda el listado de viajes en data/viajes.json."""
-        DATA_DIR.mkdir(exist_ok=True)
-        with open(DATA_DIR / "viajes.json", "w", encoding="utf-8") as f:
-            json.dump(self.viajes, f, ensure_ascii=False, indent=2)
+        """
+        Guarda los viajes en data/viajes.json (o data/viajes.bin en formato binario). Llamar sin
+        lock_viajes: lo toma solo el tiempo de leer las columnas.
+        - Solo se escribe desde el primer viaje que pudo cambiar (ArchivoViajesJSON o
+          ArchivoViajesBinario): con lock_viajes se copian esas filas, y el histórico restaurado
+          y los viajes cerrados no se vuelven a codificar. El binario se parchea en su sitio.
+        lock_persistencia ordena las escrituras: la última en escribirse es la más reciente.
+        """
+        archivo = self._archivo_binario if self.formato_datos == "binario" else self._archivo_json
+        with self._m_persistir_viajes.medir(), self.lock_persistencia:
+            DATA_DIR.mkdir(exist_ok=True)
+            desde = archivo.pendiente(self.historico, self.viajes)
+            with self.lock_viajes:
+                historico, viajes = self.historico, self.viajes
+                estables = min((v.indice for v in self._activos.values() if v.almacen is viajes),
+                               default=len(viajes))
+                cola = viajes.tramo(desde)
+            archivo.guardar(historico, viajes, desde, cola, estables)
 
     def persistir_contabilidad(self):
         """Guarda contabilidad en data/contabilidad.json."""
-        DATA_DIR.mkdir(exist_ok=True)
-        payload = {
-            "ganancias_por_taxi": self.ganancias_por_taxi,
-            "ganancia_empresa": self.ganancia_empresa,
-            "ts": time.time()
-        }
-        with open(DATA_DIR / "contabilidad.json", "w", encoding="utf-8") as f:
-            json.dump(payload, f, ensure_ascii=False, indent=2)
+        with self._m_persistir_contabilidad.medir():
+            DATA_DIR.mkdir(exist_ok=True)
+            empresa, por_taxi = self.libro.totales()
+            payload = {
+                "ganancias_por_taxi": {tid: a_euros(monto) for tid, monto in por_taxi.items()},
+                "ganancia_empresa": a_euros(empresa),
+                "ts": time.time()
+            }
+            with open(DATA_DIR / "contabilidad.json", "w", encoding="utf-8") as f:
+                json.dump(payload, f, ensure_ascii=False, indent=2)
+
+    # ---------------------------
+    # Checkpoint y restauración
+    # ---------------------------
+    def guardar_checkpoint(self, ruta=checkpoint.RUTA_CHECKPOINT):
+        """
+        Escribe un checkpoint binario con viajes, contabilidad, ratings y secuencia de ids, y el
+        prefijo de data/viajes.json que ya contiene esos viajes (para no reescribirlo al restaurar).
+        """
+        with self.lock_persistencia, self.lock_viajes:
+            columnas = self.historico.copiar()
+            columnas.extender(self.viajes)  # copia de arrays, sin dicts
+            siguiente_id = next(self._seq_viajes)
+            self._seq_viajes = itertools.count(siguiente_id + 1)
+            marca_json = self._archivo_json.marca() if self.formato_datos == "json" else None
+        self._sembrar_calidad()
+        with self.lock_contabilidad:
+            empresa, por_taxi = self.libro.totales()
+            contabilidad = {
+                "ganancias_por_taxi": {tid: a_euros(monto) for tid, monto in por_taxi.items()},
+                "ganancia_empresa": a_euros(empresa),
+                "rating_taxi": dict(self.rating_taxi),
+                "calidad_por_taxi": dict(self._calidad_por_taxi),
+                "calidad_por_cliente": dict(self._calidad_por_cliente),
+            }
+        return checkpoint.guardar({
+            "viajes": columnas,
+            "siguiente_id": siguiente_id,
+            "viajes_json": marca_json,
+            **contabilidad,
+        }, ruta)
+
+    def restaurar_checkpoint(self, ruta=checkpoint.RUTA_CHECKPOINT):
+        """
+        Restaura el estado desde un checkpoint (si existe). Devuelve True si se restauró.
+        Debe llamarse al arrancar, antes de persistir nada, para no pisar la contabilidad previa.
+        No escribe los viajes: data/viajes.json se retoma donde lo dejó el checkpoint y el primer
+        guardado solo agrega lo posterior (se reescribe entero si el archivo ya no es ese).
+        """
+        estado = checkpoint.cargar(ruta)
+        if estado is None:
+            return False
+        with self.lock_persistencia, self.lock_viajes:
+            self.historico = estado["viajes"]
+            self.historico.marcar_interrumpidos()
+            self.viajes = ColumnasViajes()
+            self._seq_viajes = itertools.count(estado["siguiente_id"])
+            self.version_viajes += 1
+            self._archivo_json.adoptar(self.historico, self.viajes, estado.get("viajes_json"))
+        self._sembrar_auditoria()
+        with self.lock_contabilidad:
+            self.libro = LibroContable()
+            self.libro.cargar_saldos(a_centimos(estado["ganancia_empresa"]),
+                                     {tid: a_centimos(m) for tid, m in estado["ganancias_por_taxi"].items()})
+            self.rating_taxi = dict(estado["rating_taxi"])
+            if "calidad_por_taxi" in estado:
+                self._calidad_por_taxi = dict(estado["calidad_por_taxi"])
+                self._calidad_por_cliente = dict(estado["calidad_por_cliente"])
+                self._calidad_pendiente = None
+            else:  # checkpoint anterior a las sumas: se calculan del histórico al primer uso
+                self._calidad_por_taxi, self._calidad_por_cliente = {}, {}
+                self._calidad_pendiente = self.historico
+            self.version_contabilidad += 1
+        return True
+
+    def restaurar_viajes(self, ruta=DATA_DIR / "viajes.bin"):
+        """
+        Arranque sin checkpoint en formato binario: mapea los viajes persistidos como histórico
+        (se decodifican al tocarlos) y continúa la secuencia de ids. True si había archivo.
+        """
+        ruta = Path(ruta)
+        if not ruta.exists():
+            return False
+        historico = formato_binario.abrir(ruta)
+        historico.marcar_interrumpidos()
+        with self.lock_persistencia, self.lock_viajes:
+            self.historico = historico
+            self.viajes = ColumnasViajes()
+            self._seq_viajes = itertools.count(max(historico.columnas["id"], default=0) + 1)
+            self.version_viajes += 1
+        with self.lock_contabilidad:
+            self._calidad_por_taxi, self._calidad_por_cliente = {}, {}
+            self._calidad_pendiente = historico  # se suma al primer uso, no al arrancar
+            self.version_contabilidad += 1
+        self._sembrar_auditoria()
+        return True
+
+    def _sembrar_auditoria(self):
+        """Tras restaurar: los finalizados de hoy sin auditar del histórico vuelven a la muestra."""
+        inicio_dia = time.mktime(self.auditoria.hoy().timetuple())
+        fin_ts, auditado = self.historico.columnas["fin_ts"], self.historico.columnas["auditado"]
+        self.auditoria.reiniciar((self.historico, i) for i in self.historico.indices_finalizados()
+                                 if fin_ts[i] >= inicio_dia and not auditado[i])
+
+    def _sembrar_calidad(self):
+        """
+        Suma una vez las calificaciones del histórico restaurado pendiente, recorriendo sus
+        columnas sin lock (no cambian), y las agrega a las acumuladas al finalizar.
+        """
+        historico = self._calidad_pendiente
+        if historico is None:
+            return
+        por_taxi = historico.sumas_calificaciones("taxi_id")
+        por_cliente = historico.sumas_calificaciones("cliente_id")
+        with self.lock_contabilidad:
+            if self._calidad_pendiente is historico:
+                sumar_calificaciones(self._calidad_por_taxi, por_taxi)
+                sumar_calificaciones(self._calidad_por_cliente, por_cliente)
+                self._calidad_pendiente = None
 
     # ---------------------------
     # Agregaciones de calidad
     # ---------------------------
     def agregacion_calidad_por_taxi(self):
-        """Devuelve taxi_id -> (promedio, cantidad) usando viajes finalizados."""
-        res = {}
-        with self.lock_viajes:
-            for v in self.viajes:
-                if v.get("estado") == "finalizado" and v.get("calificacion_cliente") is not None:
-                    tid = v["taxi_id"]
-                    prom, n = res.get(tid, (0.0, 0))
-                    n2 = n + 1
-                    prom2 = (prom * n + v["calificacion_cliente"]) / n2
-                    res[tid] = (prom2, n2)
-        return res
+        """Devuelve taxi_id -> (promedio, cantidad) usando viajes finalizados (sumas acumuladas al finalizar)."""
+        self._sembrar_calidad()
+        with self.lock_contabilidad:
+            sumas = dict(self._calidad_por_taxi)
+        return promedios_calificaciones(sumas)
 
     def agregacion_calidad_por_cliente(self):
-        """Devuelve cliente_id -> (promedio, cantidad) usando viajes finalizados."""
-        res = {}
-        with self.lock_viajes:
-            for v in self.viajes:
-                if v.get("estado") == "finalizado" and v.get("calificacion_cliente") is not None:
-                    cid = v["cliente_id"]
-                    prom, n = res.get(cid, (0.0, 0))
-                    n2 = n + 1
-                    prom2 = (prom * n + v["calificacion_cliente"]) / n2
-                    res[cid] = (prom2, n2)
-        return res
+        """Devuelve cliente_id -> (promedio, cantidad) usando viajes finalizados (sumas acumuladas al finalizar)."""
+        self._sembrar_calidad()
+        with self.lock_contabilidad:
+            sumas = dict(self._calidad_por_cliente)
+        return promedios_calificaciones(sumas)
@@ -0,0 +1,144 @@
+# snapshot.py
+"""
+Snapshots inmutables del estado del sistema para lectores (GUI, reportes, exportación):
+- Registros de solo lectura (namedtuple / MappingProxyType) con los mismos nombres de atributo
+  que Taxi y Cliente, para que los lectores no toquen objetos mutados por otros hilos.
+- Copy-on-write: las partes sin cambios (según los contadores de versión) se comparten con el
+  snapshot anterior; solo se reconstruye lo que cambió.
+- Publicación periódica desde un hilo propio: el reemplazo de la referencia es atómico, los
+  lectores nunca toman los locks del sistema.
+- Exportación a dict/JSON para otros consumidores.
+"""
+
+import json
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+from contabilidad import a_euros
+from almacen_viajes import promedios_calificaciones
+
+TaxiSnap = namedtuple("TaxiSnap", "id_taxi ubicacion ocupado calificacion placa nombre_conductor admitido")
+ClienteSnap = namedtuple("ClienteSnap", "id_cliente origen destino en_viaje solicitud_enviada admitido")
+Snapshot = namedtuple("Snapshot", [
+    "version", "ts",
+    "taxis", "clientes",
+    "viajes_activos", "viaje_por_cliente",
+    "num_solicitudes",
+    "ganancia_empresa", "ganancias_por_taxi", "rating_taxi",
+    "calidad_por_taxi", "calidad_por_cliente",
+    "version_viajes", "version_contabilidad",
+])
+
+_VACIO = MappingProxyType({})
+
+
+def construir_snapshot(sistema, previo=None):
+    """
+    Construye un Snapshot del sistema reutilizando del 'previo' las partes cuya versión no cambió.
+    Toma lock_viajes y lock_contabilidad como mucho una vez cada uno; la calidad por taxi y por
+    cliente se copia de las sumas que finalizar_viaje mantiene, sin recorrer los viajes.
+    """
+    taxis = tuple(TaxiSnap(t.id_taxi, t.ubicacion, t.ocupado, t.calificacion, t.placa, t.nombre_conductor, t.admitido)
+                  for t in list(sistema.flota))
+    clientes = tuple(ClienteSnap(c.id_cliente, c.origen, c.destino, c.en_viaje, c.solicitud_enviada, c.admitido)
+                     for c in list(sistema.clientes))
+
+    version_viajes = sistema.version_viajes
+    if previo is not None and previo.version_viajes == version_viajes:
+        viajes_activos = previo.viajes_activos
+        viaje_por_cliente = previo.viaje_por_cliente
+    else:
+        with sistema.lock_viajes:
+            viajes_activos = tuple(MappingProxyType(dict(v)) for v in sistema._activos.values())
+        viaje_por_cliente = MappingProxyType({v["cliente_id"]: v for v in viajes_activos})
+
+    version_contabilidad = sistema.version_contabilidad
+    if previo is not None and previo.version_contabilidad == version_contabilidad:
+        ganancia_empresa = previo.ganancia_empresa
+        ganancias_por_taxi = previo.ganancias_por_taxi
+        rating_taxi = previo.rating_taxi
+        calidad_por_taxi = previo.calidad_por_taxi
+        calidad_por_cliente = previo.calidad_por_cliente
+    else:
+        empresa, por_taxi = sistema.libro.totales()  # consolida los shards sin tomar lock_contabilidad
+        ganancia_empresa = a_euros(empresa)
+        ganancias_por_taxi = MappingProxyType({tid: a_euros(monto) for tid, monto in por_taxi.items()})
+        sistema._sembrar_calidad()  # solo tras restaurar un histórico: lo recorre una vez, sin locks
+        with sistema.lock_contabilidad:  # sumas acumuladas al finalizar: se copian, sin recorrer viajes
+            rating_taxi = MappingProxyType(dict(sistema.rating_taxi))
+            por_taxi, por_cliente = dict(sistema._calidad_por_taxi), dict(sistema._calidad_por_cliente)
+        calidad_por_taxi = MappingProxyType(promedios_calificaciones(por_taxi))
+        calidad_por_cliente = MappingProxyType(promedios_calificaciones(por_cliente))
+
+    return Snapshot(
+        version=(previo.version + 1) if previo is not None else 1,
+        ts=time.time(),
+        taxis=taxis,
+        clientes=clientes,
+        viajes_activos=viajes_activos,
+        viaje_por_cliente=viaje_por_cliente,
+        num_solicitudes=sistema.num_solicitudes(),
+        ganancia_empresa=ganancia_empresa,
+        ganancias_por_taxi=ganancias_por_taxi,
+        rating_taxi=rating_taxi,
+        calidad_por_taxi=calidad_por_taxi,
+        calidad_por_cliente=calidad_por_cliente,
+        version_viajes=version_viajes,
+        version_contabilidad=version_contabilidad,
+    )
+
+
+def snapshot_vacio():
+    """Snapshot inicial (versión 0) sin entidades ni viajes."""
+    return Snapshot(0, 0.0, (), (), (), _VACIO, 0, 0.0, _VACIO, _VACIO, _VACIO, _VACIO, -1, -1)
+
+
+def snapshot_a_dict(snap):
+    """Convierte un Snapshot en estructuras JSON-serializables."""
+    return {
+        "version": snap.version,
+        "ts": snap.ts,
+        "taxis": [t._asdict() for t in snap.taxis],
+        "clientes": [c._asdict() for c in snap.clientes],
+        "viajes_activos": [dict(v) for v in snap.viajes_activos],
+        "num_solicitudes": snap.num_solicitudes,
+        "ganancia_empresa": snap.ganancia_empresa,
+        "ganancias_por_taxi": {str(k): v for k, v in snap.ganancias_por_taxi.items()},
+        "rating_taxi": {str(k): list(v) for k, v in snap.rating_taxi.items()},
+        "calidad_por_taxi": {str(k): list(v) for k, v in snap.calidad_por_taxi.items()},
+        "calidad_por_cliente": {str(k): list(v) for k, v in snap.calidad_por_cliente.items()},
+    }
+
+
+def exportar_snapshot(snap, ruta):
+    """Escribe el snapshot en 'ruta' como JSON compacto."""
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(snapshot_a_dict(snap), f, ensure_ascii=False, separators=(",", ":"))
+
+
+class PublicadorSnapshots:
+    """Hilo que publica un snapshot del sistema a intervalo fijo."""
+
+    def __init__(self, sistema, intervalo=0.25):
+        self.sistema = sistema
+        self.intervalo = intervalo
+        self._detener = threading.Event()
+        self._hilo = None
+
+    def iniciar(self):
+        """Lanza el hilo publicador (daemon)."""
+        self._hilo = threading.Thread(target=self._run, name="Publicador-Snapshots", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        self._detener.set()
+
+    @property
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive() and not self._detener.is_set()
+
+    def _run(self):
+        while not self._detener.is_set():
+            self.sistema.publicar_snapshot()
+            self._detener.wait(self.intervalo)
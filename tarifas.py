@@ -0,0 +1,116 @@
+# tarifas.py
+"""
+Motor de tarifas y ETA de UNIETAXI:
+- Cotiza cada viaje una sola vez al asignarlo (costo y duración estimada del trayecto);
+  el resultado queda en el registro del viaje y lo reutilizan finalización, GUI y reportes.
+- cotizar(origenes, destinos): cotización en lote para el despachador. Usa NumPy si está
+  instalado (acepta arrays Nx2; se importa en la primera cotización en lote, no al arrancar) y,
+  si no, un camino en Python puro que devuelve listas.
+- Tablas zona a zona opcionales: con 'zonas' > 0 el mapa se divide en una rejilla zonas x zonas
+  y la tarifa entre dos zonas se lee de una tabla precalculada (tiempo constante, tarifa plana
+  por par de zonas calculada entre sus centros).
+"""
+
+import functools
+import math
+from array import array
+from collections import namedtuple
+
+TARIFA_BASE = 3.0
+TARIFA_POR_UNIDAD = 10.0
+VELOCIDAD_RECOGIDA = 0.2   # unidades de mapa por segundo hasta el cliente
+VELOCIDAD_TRAYECTO = 0.24  # unidades de mapa por segundo con el cliente a bordo
+
+Cotizacion = namedtuple("Cotizacion", "costo duracion distancia")
+
+
+@functools.lru_cache(maxsize=None)
+def _numpy():
+    """NumPy importado en el primer uso (None si no está instalado): importar el módulo no lo carga."""
+    try:
+        import numpy
+    except ImportError:  # NumPy es opcional
+        return None
+    return numpy
+
+
+def tarifa(distancia):
+    """Tarifa simple: base fija + distancia * factor, redondeada al céntimo."""
+    return round(TARIFA_BASE + distancia * TARIFA_POR_UNIDAD, 2)
+
+
+def eta_recogida(distancia, velocidad=VELOCIDAD_RECOGIDA):
+    """Segundos hasta recoger al cliente a partir de una distancia ya calculada."""
+    return distancia / max(1e-6, velocidad)
+
+
+def eta_restante(viaje):
+    """ETA restante de un viaje activo usando la duración cotizada al asignarlo."""
+    duracion = viaje.get("duracion_estimada")
+    if duracion is None:  # viajes anteriores al motor de tarifas
+        ox, oy = viaje["origen"]
+        dx, dy = viaje["destino"]
+        duracion = math.hypot(ox - dx, oy - dy) / VELOCIDAD_TRAYECTO
+    return max(0.0, (1.0 - viaje.get("progreso", 0.0)) * duracion)
+
+
+class MotorTarifas:
+    def __init__(self, zonas=0):
+        self.zonas = zonas
+        self.tabla = self._construir_tabla(zonas) if zonas > 0 else None
+
+    @staticmethod
+    def _construir_tabla(zonas):
+        """Tabla plana zonas²×zonas² de tarifas entre centros de zona."""
+        centros = [((i + 0.5) / zonas, (j + 0.5) / zonas) for i in range(zonas) for j in range(zonas)]
+        return [array("d", (tarifa(math.hypot(ox - dx, oy - dy)) for dx, dy in centros)) for ox, oy in centros]
+
+    def zona(self, punto):
+        """Índice de la celda de la rejilla que contiene el punto (coordenadas en [0,1])."""
+        n = self.zonas
+        x, y = punto
+        i = min(n - 1, max(0, int(x * n)))
+        j = min(n - 1, max(0, int(y * n)))
+        return i * n + j
+
+    def cotizar_viaje(self, origen, destino):
+        """Cotización de un viaje: tarifa de tabla si hay zonas, exacta si no."""
+        dist = math.hypot(origen[0] - destino[0], origen[1] - destino[1])
+        if self.tabla is not None:
+            costo = self.tabla[self.zona(origen)][self.zona(destino)]
+        else:
+            costo = tarifa(dist)
+        return Cotizacion(costo, dist / VELOCIDAD_TRAYECTO, dist)
+
+    def cotizar(self, origenes, destinos):
+        """
+        Cotización en lote. origenes/destinos: secuencias de pares (x, y) o arrays Nx2.
+        Devuelve (costos, duraciones): ndarrays con NumPy, listas de float sin él.
+        """
+        np = _numpy()
+        if np is not None:
+            o = np.asarray(origenes, dtype=float).reshape(-1, 2)
+            d = np.asarray(destinos, dtype=float).reshape(-1, 2)
+            dist = np.hypot(o[:, 0] - d[:, 0], o[:, 1] - d[:, 1])
+            if self.tabla is not None:
+                n = self.zonas
+                zo = self._zonas_np(np, o, n)
+                zd = self._zonas_np(np, d, n)
+                costos = np.asarray(self.tabla)[zo, zd]
+            else:
+                costos = np.round(TARIFA_BASE + dist * TARIFA_POR_UNIDAD, 2)
+            return costos, dist / VELOCIDAD_TRAYECTO
+        # Sin NumPy: comprensiones sobre floats (sin una Cotizacion ni un append por viaje)
+        hypot = math.hypot
+        dist = [hypot(ox - dx, oy - dy) for (ox, oy), (dx, dy) in zip(origenes, destinos)]
+        if self.tabla is not None:
+            tabla, zona = self.tabla, self.zona
+            costos = [tabla[zona(o)][zona(d)] for o, d in zip(origenes, destinos)]
+        else:
+            costos = [round(TARIFA_BASE + x * TARIFA_POR_UNIDAD, 2) for x in dist]
+        return costos, [x / VELOCIDAD_TRAYECTO for x in dist]
+
+    @staticmethod
+    def _zonas_np(np, puntos, n):
+        idx = np.clip((puntos * n).astype(int), 0, n - 1)
+        return idx[:, 0] * n + idx[:, 1]
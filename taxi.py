@@ -1,18 +1,27 @@
 # taxi.py
 """
 Hilo Taxi:
-- Si tiene servicio, se mueve a origen y luego a destino.
-- Actualiza progreso del viaje para calcular ETA en tiempo real.
-- Al finalizar, reporta calificación y libera disponibilidad.
-- Si no tiene servicio, patrulla con pequeños movimientos.
+- Si tiene servicio, recorre su ruta de paradas (recogidas y bajadas); con viajes compartidos
+  puede llevar varios pasajeros a la vez (pooling.py).
+- Actualiza progreso de cada viaje para calcular ETA en tiempo real.
+- Al bajar a un cliente, reporta calificación; el sistema libera el taxi al vaciarse la ruta.
+- Si no tiene servicio, se reposiciona hacia zonas con demanda (demanda.py) o patrulla con
+  pequeños movimientos.
 """
 
 import time
 import random
 from utils import mover_hacia, distancia_euclidiana
+from pooling import RECOGER, DEJAR
+
+PASO_REPOSICION = 0.01  # desplazamiento por ciclo de patrulla al reposicionarse
 
 class Taxi:
-    def __init__(self, id_taxi, sistema, ubicacion_inicial, placa=None, calificacion=4.5, nombre_conductor=None, admitido=True):
+    # Sin __dict__ por instancia: flotas grandes ocupan menos memoria
+    __slots__ = ("id_taxi", "sistema", "ubicacion", "placa", "calificacion", "nombre_conductor", "ocupado",
+                 "cliente_actual", "admitido", "paradas", "a_bordo", "recorrido")
+
+    def __init__(self, id_taxi, sistema, ubicacion_inicial, placa=None, calificacion=4.5, nombre_conductor=None, admitido=True, registrar=True):
         self.id_taxi = id_taxi
         self.sistema = sistema
         self.ubicacion = ubicacion_inicial
@@ -22,68 +31,76 @@ class Taxi:
         self.ocupado = False
         self.cliente_actual = None
         self.admitido = admitido
+        self.paradas = []       # ruta: [(RECOGER|DEJAR, cliente)], la primera es la próxima
+        self.a_bordo = []       # clientes recogidos y aún no bajados
+        self.recorrido = {}     # id_cliente -> distancia recorrida a bordo
 
-        # Registrar como disponible si está admitido
-        if self.admitido:
+        # Registrar como disponible si está admitido (registrar=False para altas en lote)
+        if self.admitido and registrar:
             self.sistema.registrar_taxi_disponible(self)
 
     def run(self):
         """Bucle principal del hilo taxi: servicio o patrulla."""
         while True:
-            if self.cliente_actual and self.ocupado:
+            if self.paradas:
                 self.realizar_servicio()
             else:
                 self.patrullar()
             time.sleep(0.2)
 
     def asignar_servicio(self, cliente):
-        """El sistema asigna un cliente; el taxi entra en estado ocupado."""
-        self.cliente_actual = cliente
+        """El sistema asigna un cliente: recogida y bajada al final de la ruta; el taxi queda ocupado."""
+        self.paradas.extend([(RECOGER, cliente), (DEJAR, cliente)])
+        if self.cliente_actual is None:
+            self.cliente_actual = cliente
         self.ocupado = True
 
     def realizar_servicio(self):
         """
-        Flujo del servicio:
-        1) Mover a origen (pickup).
-        2) Mover a destino, actualizando progreso.
-        3) Finalizar, calificar y liberar.
+        Recorre la ruta parada a parada hasta vaciarla:
+        1) Recogida: se mueve al origen del cliente y lo sube.
+        2) Bajada: se mueve al destino actualizando el progreso de cada pasajero.
+        3) Al bajar a un cliente se finaliza su viaje (calificación y contabilidad).
         """
-        cliente = self.cliente_actual
-        if not cliente:
-            return
-
-        # 1) Pickup: moverse al origen del cliente
-        while distancia_euclidiana(self.ubicacion, cliente.origen) > 0.01:
-            self.ubicacion = mover_hacia(self.ubicacion, cliente.origen, paso=0.01)
-            # progreso 0 mientras va al pickup (se muestra la ETA de pickup)
-            self.sistema.actualizar_progreso(self, progreso=0.0)
+        while self.paradas:
+            self.avanzar()
             time.sleep(0.05)
 
-        # 2) Traslado: moverse al destino
-        cliente.en_viaje = True
-        dist_total = distancia_euclidiana(cliente.origen, cliente.destino)
-        dist_recorrida = 0.0
-        prev = self.ubicacion
-        while distancia_euclidiana(self.ubicacion, cliente.destino) > 0.01:
-            self.ubicacion = mover_hacia(self.ubicacion, cliente.destino, paso=0.012)
-            inc = distancia_euclidiana(prev, self.ubicacion)
-            dist_recorrida += inc
-            prev = self.ubicacion
-            progreso = min(1.0, dist_recorrida / max(1e-6, dist_total))
-            self.sistema.actualizar_progreso(self, progreso=progreso)
-            time.sleep(0.05)
-
-        # 3) Finalización
-        cliente.en_viaje = False
-        calificacion = cliente.calificar_servicio()
-        self.sistema.finalizar_viaje(self, cliente, calificacion)
+    def avanzar(self):
+        """Un paso hacia la próxima parada (0.01 vacío, 0.012 con pasajeros); la atiende al llegar."""
+        if not self.paradas:
+            return
+        parada = self.paradas[0]
+        tipo, cliente = parada
+        meta = cliente.origen if tipo == RECOGER else cliente.destino
+        if distancia_euclidiana(self.ubicacion, meta) > 0.01:
+            previa = self.ubicacion
+            self.ubicacion = mover_hacia(self.ubicacion, meta, paso=0.012 if self.a_bordo else 0.01)
+            if self.a_bordo:
+                avance = distancia_euclidiana(previa, self.ubicacion)
+                for c in list(self.a_bordo):
+                    self.recorrido[c.id_cliente] = self.recorrido.get(c.id_cliente, 0.0) + avance
+                    directa = distancia_euclidiana(c.origen, c.destino)
+                    self.sistema.actualizar_progreso(self, min(1.0, self.recorrido[c.id_cliente] / max(1e-6, directa)), c)
+            return
 
-        # Liberar
-        self.cliente_actual = None
-        self.ocupado = False
+        if not self.sistema.completar_parada(self, parada):
+            return  # la ruta cambió mientras llegábamos
+        if tipo == RECOGER:
+            cliente.en_viaje = True
+        else:
+            cliente.en_viaje = False
+            self.sistema.finalizar_viaje(self, cliente, cliente.calificar_servicio())
 
     def patrullar(self):
-        """Movimiento aleatorio pequeño para simular disponibilidad."""
+        """
+        Sin servicio: se dirige a la zona que indique el rebalanceador (demanda > oferta);
+        si no hay destino, movimiento aleatorio pequeño para simular disponibilidad.
+        """
+        destino = self.sistema.rebalanceador.destino(self)
+        if destino is not None and distancia_euclidiana(self.ubicacion, destino) > PASO_REPOSICION:
+            self.ubicacion = mover_hacia(self.ubicacion, destino, paso=PASO_REPOSICION)
+            return
         jitter = (random.uniform(-0.003, 0.003), random.uniform(-0.003, 0.003))
         nx = min(1.0, max(0.0, self.ubicacion[0] + jitter[0]))
         ny = min(1.0, max(0.0, self.ubicacion[1] + jitter[1]))
@@ -0,0 +1,86 @@
+# tests/test_almacen_analitico.py
+"""
+Valida el almacén analítico de viajes finalizados:
+- agrupar/contar/histograma coinciden con el cálculo directo sobre los dicts.
+- Los filtros combinan condiciones y excluyen calificaciones ausentes.
+- Los datos persisten entre instancias y un volcado a medias se recorta al reabrir.
+- finalizar_viaje anexa el viaje al almacén del sistema.
+"""
+
+import os
+import tempfile
+import unittest
+from collections import defaultdict
+from pathlib import Path
+from almacen_analitico import AlmacenAnalitico, CAMPOS
+from almacen_viajes import codificar_viajes
+from benchmarks.bench_core import viajes_sinteticos
+from sistema_atencion import SistemaAtencion
+from cliente import Cliente
+from taxi import Taxi
+
+
+class TestAlmacenAnalitico(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name) / "analitica"
+        self.viajes = viajes_sinteticos(400)
+        self.viajes[0]["calificacion_cliente"] = None
+        self.almacen = AlmacenAnalitico(self.dir, lote=64)
+        for v in self.viajes:
+            self.almacen.anexar(v)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_agrupar_como_calculo_directo(self):
+        ingresos, calificaciones = defaultdict(float), defaultdict(list)
+        for v in self.viajes:
+            ingresos[v["taxi_id"]] += v["costo_estimado"]
+            if v["calificacion_cliente"] is not None:
+                calificaciones[v["taxi_id"]].append(v["calificacion_cliente"])
+        self.assertEqual(self.almacen.agrupar("taxi_id", "costo", "suma"), dict(ingresos))
+        medias = self.almacen.agrupar("taxi_id", "calificacion", "media")
+        self.assertEqual(medias.keys(), calificaciones.keys())
+        for tid, cals in calificaciones.items():
+            self.assertAlmostEqual(medias[tid], sum(cals) / len(cals))
+        self.assertEqual(self.almacen.agrupar("taxi_id", "calificacion", "max"),
+                         {tid: max(c) for tid, c in calificaciones.items()})
+        self.assertEqual(sum(self.almacen.agrupar("calificacion").values()), 399)
+
+    def test_filtros_e_histograma(self):
+        t0 = self.viajes[100]["fin_ts"]
+        esperado = sum(1 for v in self.viajes if v["fin_ts"] >= t0 and v["taxi_id"] < 250)
+        self.assertEqual(self.almacen.contar([("fin_ts", ">=", t0), ("taxi_id", "entre", (0, 250))]), esperado)
+        cuentas = self.almacen.histograma("distancia", [0.0, 0.5, 1.0, 1.5])
+        self.assertEqual(sum(cuentas), 400)
+        self.assertEqual(self.almacen.histograma("calificacion", [3.5, 5.0], [("taxi_id", "==", -1)]), [0])
+        with self.assertRaises(ValueError):
+            self.almacen.agrupar("taxi_id", "costo", "mediana")
+
+    def test_persistencia_y_reparacion(self):
+        self.almacen.volcar()
+        with open(self.dir / "costo.bin", "ab") as f:  # volcado interrumpido en una sola columna
+            f.write(b"\0" * 8)
+        reabierto = AlmacenAnalitico(self.dir)
+        self.assertEqual(len(reabierto), 400)
+        self.assertTrue(all((self.dir / f"{c}.bin").stat().st_size == 400 * 8 for c in CAMPOS))
+        self.assertEqual(reabierto.importar(codificar_viajes(self.viajes[:10])), 10)
+        self.assertEqual(reabierto.contar([("viaje_id", "<=", 10)]), 20)
+
+    def test_finalizar_viaje_anexa(self):
+        cwd = os.getcwd()
+        os.chdir(self._tmp.name)
+        try:
+            sistema = SistemaAtencion()
+            cliente = Cliente(1, sistema, origen=(0.5, 0.5), destino=(0.6, 0.6))
+            taxi = Taxi(1, sistema, ubicacion_inicial=(0.51, 0.51))
+            sistema.asignar_viaje(cliente, taxi)
+            sistema.finalizar_viaje(taxi, cliente, 4.5)
+            self.assertEqual(sistema.almacen_analitico.agrupar("taxi_id", "calificacion", "media"), {1: 4.5})
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    unittest.main()
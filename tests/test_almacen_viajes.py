@@ -0,0 +1,105 @@
+# tests/test_almacen_viajes.py
+"""
+Valida el almacén columnar de viajes:
+- Agregar y leer un viaje conserva todas sus claves (también las no reconocidas).
+- Las vistas escriben directamente en las columnas y se comportan como dicts.
+- Checkpoints sin las columnas nuevas se restauran rellenándolas.
+- escribir_json produce los mismos bytes que json.dump de los dicts en el orden del sistema.
+- Ocupa al menos 5 veces menos memoria por viaje que la lista de dicts.
+"""
+
+import io
+import json
+import pickle
+import tracemalloc
+import unittest
+from almacen_viajes import ColumnasViajes, FILAS_POR_BLOQUE, codificar_viajes, escribir_json
+from benchmarks.bench_core import viajes_sinteticos
+
+VIAJE = {
+    "id": 7, "cliente_id": 3, "taxi_id": 2, "origen": (0.1, 0.2), "destino": (0.3, 0.4), "estado": "activo",
+    "inicio_ts": 1.7e9, "costo_estimado": 5.5, "duracion_estimada": 1.2, "calificacion_cliente": None,
+    "placa_taxi": "UNI-002", "conductor": "Conductor-2", "eta_pickup": 0.5, "progreso": 0.0,
+    "taxi_calificacion": 4.5, "compartido": True, "nota": "ventanilla",
+}
+
+
+class TestAlmacenViajes(unittest.TestCase):
+    def test_ida_y_vuelta(self):
+        almacen = ColumnasViajes()
+        vista = almacen.agregar(VIAJE)
+        self.assertEqual(dict(vista), VIAJE)
+        self.assertEqual(almacen[0], VIAJE)
+        self.assertEqual(almacen[-1].a_dict(), VIAJE)
+        self.assertIsNone(vista.get("fin_ts"))
+        self.assertNotIn("encadenado", vista)
+
+    def test_vista_escribe_en_columnas(self):
+        almacen = codificar_viajes([VIAJE])
+        v = almacen[0]
+        v["estado"] = "finalizado"
+        v["fin_ts"] = 1.7e9 + 30
+        v["calificacion_cliente"] = 4.5
+        v["seguimiento_auditoria"] = True
+        del v["nota"]
+        self.assertEqual(almacen.indices_finalizados(), [0])
+        self.assertEqual(almacen.viaje(0)["fin_ts"], 1.7e9 + 30)
+        self.assertTrue(almacen.viaje(0)["seguimiento_auditoria"])
+        self.assertNotIn("nota", almacen.viaje(0))
+        self.assertEqual(almacen.agregacion_calificaciones("taxi_id"), {2: (4.5, 1)})
+        with self.assertRaises(KeyError):
+            del v["taxi_id"]
+
+    def test_estado_anterior_sin_banderas(self):
+        almacen = codificar_viajes([VIAJE])
+        estado = almacen.__getstate__()
+        for c in ("compartido", "encadenado", "duracion_estimada"):
+            del estado["columnas"][c]
+        antiguo = ColumnasViajes.__new__(ColumnasViajes)
+        antiguo.__setstate__(pickle.loads(pickle.dumps(estado)))
+        antiguo.marcar_interrumpidos()
+        v = antiguo.viaje(0)
+        self.assertEqual(v["estado"], "interrumpido")
+        self.assertNotIn("compartido", v)
+        self.assertNotIn("duracion_estimada", v)
+
+    def test_json_identico_al_dump(self):
+        # Claves en el orden en que las agrega el sistema: alta (y modo), fin, auditoría
+        base = {k: v for k, v in VIAJE.items() if k not in ("compartido", "nota")}
+        plantillas = [
+            dict(base, estado="finalizado", calificacion_cliente=4.5, fin_ts=1.7e9 + 30, seguimiento_auditoria=True),
+            dict(base, compartido=True),
+            dict(base, encadenado=True, estado="finalizado", fin_ts=1.7e9 + 0.1, conductor="Ñandú \"el rápido\""),
+            dict(base, estado="interrumpido", nota="ventanilla"),
+            {k: v for k, v in base.items() if k != "duracion_estimada"},
+        ]
+        viajes = [dict(plantillas[i % len(plantillas)], id=i) for i in range(FILAS_POR_BLOQUE + 10)]
+        esperado = json.dumps(viajes, ensure_ascii=False, indent=2)
+        for almacenes in ([codificar_viajes(viajes)], [codificar_viajes(viajes[:7]), codificar_viajes(viajes[7:])]):
+            f = io.StringIO()
+            self.assertEqual(escribir_json(f, *almacenes), len(viajes))
+            self.assertEqual(f.getvalue(), esperado)
+        self.assertEqual([json.dumps(v) for v in codificar_viajes(viajes[:5]).dicts()],
+                         [json.dumps(v) for v in viajes[:5]])
+        f = io.StringIO()
+        escribir_json(f, ColumnasViajes())
+        self.assertEqual(f.getvalue(), json.dumps([]))
+
+    def test_memoria_por_viaje(self):
+        n = 20000
+        viajes = viajes_sinteticos(n)
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        como_dicts = pickle.loads(pickle.dumps(viajes))
+        bytes_dicts = tracemalloc.get_traced_memory()[0] - base
+        del como_dicts
+        base = tracemalloc.get_traced_memory()[0]
+        almacen = codificar_viajes(viajes)
+        bytes_columnas = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+        self.assertEqual(len(almacen), n)
+        self.assertGreater(bytes_dicts / bytes_columnas, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+# tests/test_analitica.py
+"""
+Valida la analítica por zona:
+- Solicitudes por minuto, ratio de atención y espera media en la ventana.
+- Los eventos salen de la ventana con el tiempo y la memoria no crece con él.
+"""
+
+import unittest
+from analitica import AnaliticaZonas
+
+class TestAnaliticaZonas(unittest.TestCase):
+    def setUp(self):
+        self.reloj = [1000.0]
+        self.analitica = AnaliticaZonas(celdas=4, reloj=lambda: self.reloj[0])
+
+    def test_estadisticas_por_zona(self):
+        a = self.analitica
+        for _ in range(4):
+            a.registrar_solicitud((0.1, 0.1))
+        a.registrar_asignacion((0.1, 0.1), 2.0)
+        a.registrar_asignacion((0.1, 0.1), 4.0)
+        a.registrar_finalizacion((0.1, 0.1))
+        a.registrar_solicitud((0.9, 0.9))
+        z = a.consultar(60)[(0, 0)]
+        self.assertEqual((z.solicitudes, z.asignados, z.finalizados), (4, 2, 1))
+        self.assertAlmostEqual(z.solicitudes_por_minuto, 4.0)
+        self.assertAlmostEqual(z.ratio_atencion, 0.5)
+        self.assertAlmostEqual(z.espera_media, 3.0)
+        self.assertIsNone(a.consultar(60)[(3, 3)].espera_media)
+        self.assertEqual(a.total(300).solicitudes, 5)
+
+    def test_ventana_deslizante_y_memoria_acotada(self):
+        a = self.analitica
+        a.registrar_solicitud((0.5, 0.5))
+        self.reloj[0] += 120
+        self.assertEqual(a.consultar(60), {})
+        self.assertEqual(a.consultar(300)[(2, 2)].solicitudes, 1)
+        for _ in range(5000):
+            self.reloj[0] += 7
+            a.registrar_solicitud((0.5, 0.5))
+        anillos = a._zonas[(2, 2)]
+        self.assertEqual({v: len(an.epocas) for v, an in anillos.items()}, {60: 12, 300: 20, 3600: 60})
+        self.assertLessEqual(a.consultar(3600)[(2, 2)].solicitudes, 3600 // 7 + 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+# tests/test_auditoria.py
+"""
+Valida el muestreo de auditorías:
+- El reservorio elige cada viaje con la misma probabilidad y nunca más que la cuota.
+- La cuota diaria se respeta entre reinicios y se renueva al cambiar de día.
+- seguimiento_calidad solo audita hasta la cuota y no reescribe data/viajes.json.
+"""
+
+import os
+import random
+import tempfile
+import unittest
+from collections import Counter
+from datetime import date, timedelta
+from pathlib import Path
+from auditoria import MuestreoAuditoria
+from almacen_viajes import codificar_viajes
+from benchmarks.bench_core import viajes_sinteticos
+from sistema_atencion import SistemaAtencion
+from cliente import Cliente
+from taxi import Taxi
+
+
+class TestMuestreoAuditoria(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.ruta = Path(self._tmp.name) / "auditorias.jsonl"
+        self.almacen = codificar_viajes(viajes_sinteticos(20))
+        self.dia = date(2026, 10, 19)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_muestra_uniforme(self):
+        elegidos = Counter()
+        rng = random.Random(3)
+        for _ in range(2000):
+            muestreo = MuestreoAuditoria(cuota=5, ruta=self.ruta, hoy=lambda: self.dia, rng=rng)
+            for i in range(20):
+                muestreo.ofrecer(self.almacen, i)
+            muestra = muestreo.tomar()
+            self.assertEqual(len({i for _, i in muestra}), 5)
+            elegidos.update(i for _, i in muestra)
+            self.ruta.unlink()
+        for i in range(20):
+            self.assertAlmostEqual(elegidos[i] / 2000, 0.25, delta=0.05)
+
+    def test_cuota_entre_reinicios_y_dias(self):
+        muestreo = MuestreoAuditoria(cuota=5, ruta=self.ruta, hoy=lambda: self.dia)
+        for i in range(3):
+            muestreo.ofrecer(self.almacen, i)
+        self.assertEqual(len(muestreo.tomar()), 3)
+        reiniciado = MuestreoAuditoria(cuota=5, ruta=self.ruta, hoy=lambda: self.dia)
+        self.assertEqual(reiniciado.restantes, 2)
+        for i in range(3, 20):
+            reiniciado.ofrecer(self.almacen, i)
+        self.assertEqual(len(reiniciado.tomar()), 2)
+        reiniciado.ofrecer(self.almacen, 0)
+        self.assertEqual(reiniciado.tomar(), [])
+        self.dia += timedelta(days=1)
+        self.assertEqual(reiniciado.restantes, 5)
+
+    def test_seguimiento_del_sistema(self):
+        cwd = os.getcwd()
+        os.chdir(self._tmp.name)
+        try:
+            sistema = SistemaAtencion()
+            for k in range(8):
+                cliente = Cliente(k + 1, sistema, origen=(0.1 * k, 0.5), destino=(0.1 * k, 0.6))
+                taxi = Taxi(k + 1, sistema, ubicacion_inicial=(0.1 * k, 0.51))
+                sistema.asignar_viaje(cliente, taxi)
+                sistema.finalizar_viaje(taxi, cliente, 4.0)
+            antes = Path("data/viajes.json").read_text(encoding="utf-8")
+            self.assertEqual(sistema.seguimiento_calidad(), 5)
+            self.assertEqual(sum(1 for v in sistema.viajes if v.get("seguimiento_auditoria")), 5)
+            self.assertEqual(Path("data/viajes.json").read_text(encoding="utf-8"), antes)
+            self.assertEqual(sistema.seguimiento_calidad(), 0)
+            self.assertEqual(SistemaAtencion().auditoria.restantes, 0)
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    unittest.main()
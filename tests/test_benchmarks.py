@@ -0,0 +1,27 @@
+# tests/test_benchmarks.py
+"""
+Valida la comparación de benchmarks:
+- Marca regresión solo cuando el tiempo supera la baseline más allá del umbral.
+- Los casos sin baseline se listan y la baseline del repositorio cubre todos los casos rápidos.
+"""
+
+import json
+import unittest
+from benchmarks.bench_core import CASOS, RAIZ, comparar, sin_baseline
+
+class TestBenchmarks(unittest.TestCase):
+    def test_comparar_umbral(self):
+        base = {"resultados": {"a": {"segundos_por_op": 1.0}, "b": {"segundos_por_op": 1.0}}}
+        nuevo = {"resultados": {"a": {"segundos_por_op": 1.1}, "b": {"segundos_por_op": 1.5}, "c": {"segundos_por_op": 9.0}}}
+        filas = {clave: regresion for clave, _, _, _, regresion in comparar(base, nuevo, umbral=0.2)}
+        self.assertEqual(filas, {"a": False, "b": True})
+        self.assertEqual(sin_baseline(base, nuevo), ["c"])
+
+    def test_baseline_cubre_los_casos(self):
+        base = json.loads((RAIZ / "benchmarks" / "baselines" / "base_rapido.json").read_text(encoding="utf-8"))
+        self.assertTrue(base["meta"]["rapido"])
+        rapidos = {nombre for nombre, _, rapido in CASOS if rapido}
+        self.assertEqual(rapidos - set(base["meta"].get("casos", [])), set())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+# tests/test_checkpoint.py
+"""
+Valida el checkpoint binario:
+- Guardar y restaurar conserva viajes, contabilidad, ratings y la secuencia de ids.
+- Los viajes activos al guardar se restauran como interrumpidos.
+- Restaurar no escribe data/viajes.json: el primer guardado retoma el archivo tras el prefijo que
+  guardó el checkpoint y cada guardado solo codifica los viajes nuevos o que cambiaron; el
+  archivo queda igual que escribir_json de todo el estado (entero si ya no era el del checkpoint).
+- Auditar viajes del histórico no reescribe el archivo: cargado con las banderas de
+  data/auditorias.jsonl coincide con el estado.
+- data/viajes.json se escribe sin lock_viajes (solo se copian con él las filas a reescribir).
+"""
+
+import io
+import itertools
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import almacen_viajes
+from almacen_viajes import codificar_viajes, escribir_json, leer_json
+from auditoria import viajes_auditados
+from benchmarks.bench_core import viajes_sinteticos
+from sistema_atencion import SistemaAtencion
+from cliente import Cliente
+from taxi import Taxi
+
+class TestCheckpoint(unittest.TestCase):
+    def test_guardar_y_restaurar(self):
+        sistema = SistemaAtencion()
+        c1 = Cliente(1, sistema, origen=(0.5, 0.5), destino=(0.6, 0.6))
+        c2 = Cliente(2, sistema, origen=(0.2, 0.2), destino=(0.3, 0.3))
+        t1 = Taxi(1, sistema, ubicacion_inicial=(0.51, 0.51))
+        Taxi(2, sistema, ubicacion_inicial=(0.21, 0.21))
+        for c in (c1, c2):
+            sistema.recibir_solicitud(c)
+        sistema.procesar_solicitudes()
+        sistema.finalizar_viaje(t1, c1, 4.5)
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta = Path(tmp) / "estado.ckpt"
+            sistema.guardar_checkpoint(ruta)
+            nuevo = SistemaAtencion()
+            self.assertTrue(nuevo.restaurar_checkpoint(ruta))
+        self.assertAlmostEqual(nuevo.ganancia_empresa, sistema.ganancia_empresa)
+        self.assertEqual(nuevo.rating_taxi, sistema.rating_taxi)
+        estados = {v["cliente_id"]: v["estado"] for v in nuevo.historico}
+        self.assertEqual(estados, {1: "finalizado", 2: "interrumpido"})
+        self.assertEqual(nuevo.agregacion_calidad_por_taxi(), {1: (4.5, 1)})
+        self.assertGreater(next(nuevo._seq_viajes), 2)
+
+    def test_sin_checkpoint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.assertFalse(SistemaAtencion().restaurar_checkpoint(Path(tmp) / "no.ckpt"))
+
+    def test_persistencia_incremental_tras_restaurar(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                previo = SistemaAtencion()
+                previo.viajes = codificar_viajes(viajes_sinteticos(5000))
+                previo._seq_viajes = itertools.count(5001)
+                anteriores = [Cliente(8000 + k, previo, origen=(0.1 * k, 0.5), destino=(0.1 * k, 0.6)) for k in range(2)]
+                taxis_previos = [Taxi(8000 + k, previo, ubicacion_inicial=(0.1 * k, 0.51)) for k in range(2)]
+                previo.asignar_lote(anteriores)
+                previo.finalizar_viaje(taxis_previos[1], anteriores[1], 4.0)
+                previo.guardar_checkpoint("estado.ckpt")
+                previo.finalizar_viaje(taxis_previos[0], anteriores[0], 3.0)  # tras el checkpoint
+
+                sistema = SistemaAtencion()
+                clientes = [Cliente(9000 + k, sistema, origen=(0.1 * k, 0.5), destino=(0.1 * k, 0.6)) for k in range(3)]
+                taxis = [Taxi(9000 + k, sistema, ubicacion_inicial=(0.1 * k, 0.51)) for k in range(3)]
+                with mock.patch.object(almacen_viajes, "_filas_json", wraps=almacen_viajes._filas_json) as filas:
+                    sistema.restaurar_checkpoint("estado.ckpt")
+                    self.assertEqual(filas.call_count, 0)  # restaurar no escribe viajes.json
+                    sistema.asignar_lote(clientes[:2])
+                    sistema.finalizar_viaje(taxis[1], clientes[1], 4.0)
+                    sistema.asignar_viaje(clientes[2], taxis[2])
+                    sistema.finalizar_viaje(taxis[2], clientes[2], 5.0)
+                codificadas = sum(llamada.args[2] - llamada.args[1] for llamada in filas.call_args_list)
+                # El primer guardado retoma el archivo tras el prefijo del checkpoint (solo las 2 filas
+                # del histórico que estaban activas) y cada guardado reescribe desde el primer viaje aún
+                # activo: nunca las 5000 del histórico
+                self.assertEqual(codificadas, 2 + 2 + 2 + 3 + 3)
+                self._comprobar_archivo(sistema)
+
+                sistema.auditoria.ofrecer(sistema.historico, 0)
+                with mock.patch.object(almacen_viajes, "_filas_json", wraps=almacen_viajes._filas_json) as filas:
+                    self.assertEqual(sistema.seguimiento_calidad(), 4)  # con el del histórico finalizado hoy
+                    sistema.finalizar_viaje(taxis[0], clientes[0], 3.0)
+                # Las banderas del histórico quedan en data/auditorias.jsonl: solo se reescriben las
+                # filas desde el viaje que seguía activo
+                self.assertEqual(sum(llamada.args[2] - llamada.args[1] for llamada in filas.call_args_list), 3)
+                self._comprobar_archivo(sistema, auditorias=True)
+
+                Path("data/viajes.json").write_text("[]", encoding="utf-8")  # cambiado por fuera
+                sistema.persistir_viajes()
+                self._comprobar_archivo(sistema)
+
+                otro = SistemaAtencion()  # el archivo ya no es el del checkpoint: se reescribe entero
+                otro.restaurar_checkpoint("estado.ckpt")
+                otro.persistir_viajes()
+                self._comprobar_archivo(otro)
+            finally:
+                os.chdir(cwd)
+
+    def test_escribe_el_json_sin_lock_viajes(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                sistema = SistemaAtencion()
+                c = Cliente(1, sistema, origen=(0.5, 0.5), destino=(0.6, 0.6))
+                t = Taxi(1, sistema, ubicacion_inicial=(0.51, 0.51))
+                bloqueado = []
+                original = almacen_viajes._escribir_filas
+
+                def escribir_filas(*args, **kwargs):
+                    bloqueado.append(sistema.lock_viajes.locked())
+                    return original(*args, **kwargs)
+
+                with mock.patch.object(almacen_viajes, "_escribir_filas", escribir_filas):
+                    sistema.asignar_lote([c])
+                    sistema.finalizar_viaje(t, c, 5.0)
+                self.assertTrue(bloqueado)
+                self.assertFalse(any(bloqueado))
+                self._comprobar_archivo(sistema)
+            finally:
+                os.chdir(cwd)
+
+    def _comprobar_archivo(self, sistema, auditorias=False):
+        """Sin auditorías recientes el archivo es escribir_json del estado; con ellas, al cargarlo."""
+        if auditorias:
+            cargado = leer_json("data/viajes.json", viajes_auditados("data/auditorias.jsonl"))
+            estado = sistema.historico.copiar()
+            estado.extender(sistema.viajes)
+            self.assertEqual(list(cargado.dicts()), list(estado.dicts()))
+            return
+        esperado = io.StringIO()
+        escribir_json(esperado, sistema.historico, sistema.viajes)
+        self.assertEqual(Path("data/viajes.json").read_text(encoding="utf-8"), esperado.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# tests/test_contabilidad.py
+"""
+Valida el libro contable:
+- Importes exactos en céntimos (sin deriva de floats) y comisión del 20%.
+- Consolidación de los acumuladores de varios hilos.
+- Volcado incremental a JSON Lines; tras volcar, el shard queda vacío.
+"""
+
+import json
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from contabilidad import LibroContable
+
+class TestLibroContable(unittest.TestCase):
+    def test_totales_exactos(self):
+        libro = LibroContable()
+        for _ in range(3):
+            libro.registrar_viaje(7, 4.04)
+        # 4.04 -> 81 céntimos de comisión y 323 para el taxi por viaje
+        self.assertEqual(libro.totales(), (243, {7: 969}))
+        self.assertEqual(libro.ganancia_empresa(), 2.43)
+        self.assertEqual(libro.ganancias_por_taxi(), {7: 9.69})
+
+    def test_consolidacion_entre_hilos(self):
+        libro = LibroContable()
+
+        def trabajar(tid):
+            for _ in range(1000):
+                libro.registrar_viaje(tid, 5.55)
+
+        hilos = [threading.Thread(target=trabajar, args=(i % 2,)) for i in range(4)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        empresa, por_taxi = libro.totales()
+        self.assertEqual(empresa + sum(por_taxi.values()), 4000 * 555)
+        self.assertEqual(por_taxi[0], por_taxi[1])
+        self.assertEqual(len(libro.asientos()), 4000)
+
+    def test_volcado_incremental(self):
+        libro = LibroContable()
+        libro.registrar_viaje(1, 10.0, viaje_id=1, ts=1.0)
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta = Path(tmp) / "libro.jsonl"
+            self.assertEqual(libro.volcar_asientos(ruta), 1)
+            self.assertEqual(libro._shard().asientos, [])  # lo volcado no sigue en memoria
+            self.assertEqual(libro.asientos(), [])
+            libro.registrar_viaje(2, 3.0, viaje_id=2, ts=2.0)
+            self.assertEqual(libro.volcar_asientos(ruta), 1)
+            lineas = [json.loads(l) for l in ruta.read_text(encoding="utf-8").splitlines()]
+        self.assertEqual([l["viaje_id"] for l in lineas], [1, 2])
+        self.assertEqual(lineas[0]["comision_cent"], 200)
+
+    def test_saldos_de_apertura(self):
+        libro = LibroContable()
+        libro.cargar_saldos(100, {3: 400})
+        libro.registrar_viaje(3, 1.0)
+        self.assertEqual(libro.totales(), (120, {3: 480}))
+        self.assertEqual(libro.asientos()[0][2], 3)
+
+if __name__ == "__main__":
+    unittest.main()
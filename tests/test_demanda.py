@@ -0,0 +1,46 @@
+# tests/test_demanda.py
+"""
+Valida la estimación de demanda y el reposicionamiento:
+- Los conteos por celda decaen con la vida media.
+- El rebalanceador envía taxis libres de celdas sin demanda hacia celdas con demanda.
+- En la simulación, reposicionar reduce los reencolados frente a la patrulla aleatoria.
+"""
+
+import unittest
+from demanda import EstimadorDemanda, Rebalanceador
+from sistema_atencion import SistemaAtencion
+from taxi import Taxi
+from benchmarks.simulacion import simular
+
+class TestDemanda(unittest.TestCase):
+    def test_decaimiento(self):
+        reloj = [0.0]
+        est = EstimadorDemanda(celdas=4, vida_media=10.0, reloj=lambda: reloj[0])
+        est.registrar((0.1, 0.1))
+        est.registrar((0.2, 0.2))
+        reloj[0] = 10.0
+        self.assertAlmostEqual(est.demanda()[(0, 0)], 1.0)
+
+    def test_rebalanceo_hacia_demanda(self):
+        sistema = SistemaAtencion()
+        est = EstimadorDemanda(celdas=4, reloj=lambda: 0.0)
+        rebal = Rebalanceador(sistema, est)
+        t1 = Taxi(1, sistema, ubicacion_inicial=(0.9, 0.9))
+        t2 = Taxi(2, sistema, ubicacion_inicial=(0.1, 0.1))
+        for _ in range(5):
+            est.registrar((0.1, 0.1))
+            est.registrar((0.1, 0.9))
+        plan = rebal.planificar()
+        self.assertEqual(plan, {1: (0.125, 0.875)})
+        self.assertIsNone(rebal.destino(t2))
+        rebal.activo = False
+        self.assertIsNone(rebal.destino(t1))
+
+    def test_simulacion_reduce_reencolados(self):
+        patrulla = simular(rebalanceo=False, taxis=20, ticks=150)
+        rebalanceo = simular(rebalanceo=True, taxis=20, ticks=150)
+        self.assertLess(rebalanceo["reencoladas"], patrulla["reencoladas"])
+        self.assertGreater(rebalanceo["asignados"], patrulla["asignados"])
+
+if __name__ == "__main__":
+    unittest.main()
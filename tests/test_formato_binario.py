@@ -0,0 +1,134 @@
+# tests/test_formato_binario.py
+"""
+Valida el formato binario de viajes:
+- Escribir y mapear conserva todos los viajes (también de varios almacenes con textos distintos).
+- Los conversores JSON <-> binario son inversos y el binario ocupa menos de un tercio; a-binario
+  aplica las banderas de data/auditorias.jsonl.
+- En formato binario el sistema persiste data/viajes.bin, los reportes cuentan desde el archivo
+  mapeado y un reinicio continúa con el histórico y la secuencia de ids.
+- data/viajes.bin se actualiza en su sitio: solo se reescribe entero la primera vez o al agotar
+  la capacidad reservada, y siempre coincide con el estado.
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+from pathlib import Path
+import formato_binario
+from almacen_viajes import codificar_viajes
+from benchmarks.bench_core import viajes_sinteticos
+from sistema_atencion import SistemaAtencion
+from reportes import Reportes
+from cliente import Cliente
+from taxi import Taxi
+
+
+class TestFormatoBinario(unittest.TestCase):
+    def setUp(self):
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)
+        self.dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_ida_y_vuelta(self):
+        viajes = viajes_sinteticos(50)
+        viajes[3]["calificacion_cliente"] = None
+        viajes[4]["compartido"] = True
+        viajes[5]["nota"] = "ñandú"
+        otros = codificar_viajes([dict(viajes[0], id=99, placa_taxi="OTRA-1", conductor="Otro")])
+        ruta = self.dir / "viajes.bin"
+        self.assertEqual(formato_binario.escribir(ruta, codificar_viajes(viajes), otros), 51)
+        mapeado = formato_binario.abrir(ruta)
+        esperado = codificar_viajes(viajes)
+        esperado.extender(otros)
+        self.assertEqual(list(mapeado.dicts()), list(esperado.dicts()))
+        self.assertEqual(formato_binario.contar_estado(ruta, "finalizado"), 51)
+
+    def test_conversores(self):
+        ruta_json, ruta_bin, vuelta = self.dir / "v.json", self.dir / "v.bin", self.dir / "vuelta.json"
+        with open(ruta_json, "w", encoding="utf-8") as f:
+            from almacen_viajes import escribir_json
+            escribir_json(f, codificar_viajes(viajes_sinteticos(2000)))
+        self.assertEqual(formato_binario.json_a_binario(ruta_json, ruta_bin), 2000)
+        self.assertEqual(formato_binario.binario_a_json(ruta_bin, vuelta), 2000)
+        self.assertEqual(vuelta.read_text(encoding="utf-8"), ruta_json.read_text(encoding="utf-8"))
+        self.assertLess(ruta_bin.stat().st_size, ruta_json.stat().st_size / 3)
+
+        # Las auditorías de filas ya escritas solo constan en el registro junto al JSON
+        (self.dir / "auditorias.jsonl").write_text('{"fecha": "2024-01-01", "viaje_id": 3, "ts": 0}\n', encoding="utf-8")
+        formato_binario.json_a_binario(ruta_json, ruta_bin)
+        self.assertEqual([v["id"] for v in formato_binario.abrir(ruta_bin) if v.get("seguimiento_auditoria")], [3])
+
+    def test_archivo_invalido(self):
+        ruta = self.dir / "x.bin"
+        ruta.write_bytes(b"no es un archivo de viajes")
+        with self.assertRaises(formato_binario.FormatoInvalido):
+            formato_binario.abrir(ruta)
+
+    def test_sistema_en_formato_binario(self):
+        sistema = SistemaAtencion()
+        sistema.formato_datos = "binario"
+        c1 = Cliente(1, sistema, origen=(0.5, 0.5), destino=(0.6, 0.6))
+        c2 = Cliente(2, sistema, origen=(0.2, 0.2), destino=(0.3, 0.3))
+        t1 = Taxi(1, sistema, ubicacion_inicial=(0.51, 0.51))
+        Taxi(2, sistema, ubicacion_inicial=(0.21, 0.21))
+        sistema.asignar_lote([c1, c2])
+        sistema.finalizar_viaje(t1, c1, 4.0)
+        self.assertTrue((self.dir / "data" / "viajes.bin").exists())
+        sistema.publicar_snapshot()
+        Reportes(sistema).generar_reporte_mensual()
+        self.assertIn("Viajes finalizados en el mes: 1", (self.dir / "docs" / "reporte_mensual.md").read_text(encoding="utf-8"))
+
+        nuevo = SistemaAtencion()
+        nuevo.formato_datos = "binario"
+        self.assertTrue(nuevo.restaurar_viajes())
+        self.assertEqual({v["cliente_id"]: v["estado"] for v in nuevo.historico}, {1: "finalizado", 2: "interrumpido"})
+        self.assertEqual(nuevo.agregacion_calidad_por_taxi(), {1: (4.0, 1)})
+        self.assertEqual(next(nuevo._seq_viajes), 3)
+        self.assertEqual(nuevo.seguimiento_calidad(), 1)  # parchea la bandera en el archivo
+        self.assertTrue(formato_binario.abrir(self.dir / "data" / "viajes.bin")[0]["seguimiento_auditoria"])
+
+    def test_persistencia_en_su_sitio(self):
+        ruta = self.dir / "data" / "viajes.bin"
+        sistema = SistemaAtencion()
+        sistema.formato_datos = "binario"
+        sistema.historico = codificar_viajes(viajes_sinteticos(300))
+        with mock.patch.object(formato_binario, "_escribir", wraps=formato_binario._escribir) as completo:
+            self._viajes(sistema, ruta, 20)
+        # Solo el primer guardado escribe el archivo entero (con el histórico)
+        self.assertEqual(completo.call_count, 1)
+
+        # Sin capacidad de sobra se reescribe al agotarla, con el mismo contenido
+        sistema = SistemaAtencion()
+        sistema.formato_datos = "binario"
+        sistema.max_seguimientos_diarios = 10  # el anterior agotó la cuota de hoy
+        with mock.patch.object(formato_binario, "FILAS_RESERVA", 1), \
+                mock.patch.object(formato_binario, "BYTES_RESERVA", 1), \
+                mock.patch.object(formato_binario, "_escribir", wraps=formato_binario._escribir) as completo:
+            self._viajes(sistema, ruta, 12)
+        self.assertGreater(completo.call_count, 1)
+
+    def _viajes(self, sistema, ruta, n):
+        """n viajes con taxis nuevos (textos nuevos), una clave extra, finales y una auditoría."""
+        for k in range(n):
+            c = Cliente(100 + k, sistema, origen=(0.05 * k, 0.5), destino=(0.05 * k, 0.6))
+            t = Taxi(100 + k, sistema, ubicacion_inicial=(0.05 * k, 0.51))
+            if k == 5:
+                sistema.viajes[-1]["nota"] = "ventanilla"  # viaje aún activo: llega en el próximo guardado
+            sistema.asignar_viaje(c, t)
+            if k % 2:
+                sistema.finalizar_viaje(t, c, 4.0)
+            if k == n // 2:
+                self.assertGreater(sistema.seguimiento_calidad(), 0)
+            estado = sistema.historico.copiar()
+            estado.extender(sistema.viajes)
+            self.assertEqual(list(formato_binario.abrir(ruta).dicts()), list(estado.dicts()))
+
+
+if __name__ == "__main__":
+    unittest.main()
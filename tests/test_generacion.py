@@ -0,0 +1,58 @@
+# tests/test_generacion.py
+"""
+Valida la generación de entidades iniciales:
+- Con solo_admitidos=True y suficientes admitidos se generan exactamente N entidades admitidas.
+- Con menos admitidos que N se usan todos, sin repetir placa, conductor ni cliente, y el resto
+  hasta N se genera sin afiliación.
+- Los taxis generados quedan registrados como disponibles en lote.
+"""
+
+import unittest
+from sistema_atencion import SistemaAtencion
+from utils import generar_taxis_iniciales, generar_clientes_iniciales, muestrear_registros
+
+class TestGeneracion(unittest.TestCase):
+    def test_taxis_exactos_con_alto_rechazo(self):
+        sistema = SistemaAtencion()
+        registros = [{"id": i, "conductor": f"C-{i}", "placa": f"UNI-{i:04d}",
+                      "estado": "admitido" if i % 50 == 0 else "rechazado"} for i in range(5000)]
+        taxis = generar_taxis_iniciales(40, sistema, solo_admitidos=True, registros=registros)
+        self.assertEqual(len(taxis), 40)
+        self.assertTrue(all(t.admitido for t in taxis))
+        self.assertEqual(len({t.placa for t in taxis}), 40)
+        self.assertEqual(len(sistema.taxis_disponibles), 40)
+
+    def test_taxis_sin_repetidos_si_faltan_admitidos(self):
+        sistema = SistemaAtencion()
+        registros = [{"id": i, "conductor": f"C-{i}", "placa": f"UNI-{i:03d}",
+                      "estado": "admitido" if i % 50 == 0 else "rechazado"} for i in range(500)]
+        taxis = generar_taxis_iniciales(40, sistema, solo_admitidos=True, registros=registros)
+        self.assertEqual(len(taxis), 40)
+        placas = {r["placa"] for r in registros if r["estado"] == "admitido"}
+        self.assertEqual(placas & {t.placa for t in taxis}, placas)
+        self.assertEqual(len({t.placa for t in taxis}), 40)
+        self.assertEqual(len({t.nombre_conductor for t in taxis}), 40)
+        self.assertTrue(all(t.admitido for t in taxis))
+        self.assertEqual(len(sistema.taxis_disponibles), 40)
+
+    def test_clientes_sin_repetidos_si_faltan_admitidos(self):
+        sistema = SistemaAtencion()
+        registros = [{"id": i, "nombre": f"Cliente-{i}", "tarjeta": "4111-xxxx-0000",
+                      "estado": "admitido" if i == 0 else "rechazado"} for i in range(100)]
+        clientes = generar_clientes_iniciales(25, sistema, solo_admitidos=True, registros=registros)
+        self.assertEqual(len(clientes), 25)
+        self.assertIn("Cliente-0", [c.nombre for c in clientes])
+        self.assertEqual(len({c.nombre for c in clientes}), 25)
+        self.assertTrue(all(c.admitido for c in clientes))
+
+    def test_muestra_exactamente_n(self):
+        registros = [{"id": i, "estado": "admitido" if i < 3 else "rechazado"} for i in range(10)]
+        muestra = muestrear_registros(registros, 5, solo_admitidos=True)
+        self.assertEqual(len(muestra), 5)
+        self.assertEqual(sorted(r["id"] for r in muestra if r is not None), [0, 1, 2])
+        self.assertEqual(muestra.count(None), 2)
+        self.assertEqual(len(muestrear_registros(registros, 4)), 4)
+        self.assertEqual(muestrear_registros([], 2), [None, None])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+# tests/test_historial.py
+"""
+Valida el historial de solicitudes:
+- El buffer en memoria queda acotado a su capacidad.
+- El log rota por tamaño y se lee paginado en orden cronológico.
+"""
+
+import tempfile
+import unittest
+from pathlib import Path
+from historial import HistorialSolicitudes
+
+def evento(i):
+    return {"viaje_id": i, "cliente_id": i, "taxi_id": 1, "placa": "UNI-001", "conductor": "C",
+            "origen": [0.1, 0.2], "destino": [0.3, 0.4], "eta_pickup": 1.5, "distancia": 0.1}
+
+class TestHistorial(unittest.TestCase):
+    def test_buffer_acotado_y_paginas(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            h = HistorialSolicitudes(Path(tmp) / "historial.jsonl", capacidad=10, max_bytes=1000, max_archivos=50)
+            for i in range(60):
+                h.registrar(evento(i))
+            self.assertEqual(len(h.recientes()), 10)
+            self.assertEqual(h.recientes()[-1]["viaje_id"], 59)
+            self.assertTrue((Path(tmp) / "historial.jsonl.1").exists())
+            self.assertEqual([e["viaje_id"] for e in h.leer_pagina(1, tam=20)], list(range(20, 40)))
+            h.cerrar()
+
+    def test_formatear(self):
+        texto = HistorialSolicitudes.formatear(evento(3))
+        self.assertIn("Cliente C3", texto)
+        self.assertIn("ETA recogida: 1.5s", texto)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+# tests/test_main.py
+"""
+Valida el arranque del servicio:
+- --headless despacha, informa el arranque en frío y sale sin haber importado tkinter.
+- Importar el sistema, las tarifas y el almacén analítico no carga NumPy (se importa al usarlo).
+- Crear el sistema no escribe archivos: las afiliaciones se generan una sola vez en un data/ vacío.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+RAIZ = Path(__file__).resolve().parent.parent
+
+
+class TestArranque(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self._tmp.name)
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_headless_sin_tkinter(self):
+        codigo = (
+            "import sys, main\n"
+            "main.main(['--headless', '--duracion', '0.2', '--checkpoint-intervalo', '0'])\n"
+            "print('tkinter importado:', 'tkinter' in sys.modules)\n"
+        )
+        entorno = dict(os.environ, PYTHONPATH=str(RAIZ))
+        salida = subprocess.run([sys.executable, "-c", codigo], cwd=self.dir, env=entorno,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(salida.returncode, 0, salida.stderr)
+        self.assertIn("Arranque en frío hasta el primer despacho", salida.stdout)
+        self.assertIn("tkinter importado: False", salida.stdout)
+        registros = json.loads((self.dir / "data" / "clientes.json").read_text(encoding="utf-8"))
+        self.assertEqual(len(registros), 40)  # generadas por afiliacion.py, no un [] de relleno
+
+    def test_importar_sin_numpy(self):
+        codigo = (
+            "import sys, sistema_atencion, tarifas, almacen_analitico\n"
+            "print('numpy importado:', 'numpy' in sys.modules)\n"
+        )
+        entorno = dict(os.environ, PYTHONPATH=str(RAIZ))
+        salida = subprocess.run([sys.executable, "-c", codigo], cwd=self.dir, env=entorno,
+                                capture_output=True, text=True, timeout=60)
+        self.assertEqual(salida.returncode, 0, salida.stderr)
+        self.assertIn("numpy importado: False", salida.stdout)
+
+    def test_sistema_sin_escrituras(self):
+        cwd = os.getcwd()
+        os.chdir(self.dir)
+        try:
+            from sistema_atencion import SistemaAtencion
+            SistemaAtencion()
+            self.assertFalse((self.dir / "data").exists())
+        finally:
+            os.chdir(cwd)
+
+
+if __name__ == "__main__":
+    unittest.main()
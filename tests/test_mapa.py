@@ -0,0 +1,28 @@
+# tests/test_mapa.py
+"""
+Valida el viewport del mapa:
+- Sin zoom coincide con to_canvas_coords.
+- El zoom mantiene fijo el punto bajo el cursor y el culling descarta puntos fuera de vista.
+"""
+
+import unittest
+from mapa import Viewport
+from utils import to_canvas_coords
+
+class TestViewport(unittest.TestCase):
+    def test_sin_zoom_equivale_a_canvas_coords(self):
+        vp = Viewport(900, 560, 20)
+        self.assertEqual(vp.a_canvas(0.3, 0.7), to_canvas_coords(0.3, 0.7, 900, 560, 20))
+
+    def test_zoom_y_culling(self):
+        vp = Viewport(900, 560, 20)
+        antes = vp.a_mapa(450, 280)
+        vp.hacer_zoom(4.0, 450, 280)
+        despues = vp.a_mapa(450, 280)
+        self.assertAlmostEqual(antes[0], despues[0])
+        self.assertAlmostEqual(antes[1], despues[1])
+        self.assertTrue(vp.visible(0.5, 0.5))
+        self.assertFalse(vp.visible(0.05, 0.05))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+# tests/test_metricas.py
+"""
+Valida el subsistema de métricas:
+- Histograma con buckets fijos y exposición Prometheus acumulada.
+- El sistema instrumenta solicitudes, asignaciones y persistencia; viajes_activos nunca baja de 0.
+- El exportador HTTP sirve /metrics.
+"""
+
+import unittest
+import urllib.request
+from metricas import RegistroMetricas, ExportadorHTTP
+from sistema_atencion import SistemaAtencion
+from cliente import Cliente
+from taxi import Taxi
+
+class TestMetricas(unittest.TestCase):
+    def test_histograma_prometheus(self):
+        reg = RegistroMetricas(prefijo="t_")
+        h = reg.histograma("lat", "Latencia", buckets=(0.1, 1.0))
+        for v in (0.05, 0.5, 5.0):
+            h.observar(v)
+        texto = reg.exportar_prometheus()
+        self.assertIn('t_lat_bucket{le="0.1"} 1', texto)
+        self.assertIn('t_lat_bucket{le="1.0"} 2', texto)
+        self.assertIn('t_lat_bucket{le="+Inf"} 3', texto)
+        self.assertIn("t_lat_count 3", texto)
+
+    def test_instrumentacion_sistema(self):
+        sistema = SistemaAtencion()
+        c = Cliente(1, sistema, origen=(0.5, 0.5), destino=(0.6, 0.6))
+        Taxi(1, sistema, ubicacion_inicial=(0.51, 0.51))
+        sistema.recibir_solicitud(c)
+        sistema.procesar_solicitudes()
+        texto = sistema.metricas.exportar_prometheus()
+        self.assertIn("unietaxi_solicitudes_total 1", texto)
+        self.assertIn("unietaxi_viajes_asignados_total 1", texto)
+        self.assertIn("unietaxi_latencia_matching_segundos_count 1", texto)
+        self.assertIn('unietaxi_persistencia_segundos_count{archivo="viajes"} 1', texto)
+
+    def test_viajes_activos_no_negativo(self):
+        sistema = SistemaAtencion()
+        c = Cliente(1, sistema, origen=(0.5, 0.5), destino=(0.6, 0.6))
+        t = Taxi(1, sistema, ubicacion_inicial=(0.51, 0.51))
+        sistema.asignar_viaje(c, t)
+        sistema.finalizar_viaje(t, c, 4.0)
+        sistema.finalizar_viaje(t, c, 4.0)  # ya no está activo: no descuenta otra vez
+        self.assertIn("unietaxi_viajes_activos 0", sistema.metricas.exportar_prometheus())
+
+    def test_exportador_http(self):
+        reg = RegistroMetricas()
+        reg.contador("peticiones_total").inc(3)
+        exp = ExportadorHTTP(reg, puerto=0).iniciar()
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{exp.puerto}/metrics", timeout=5) as r:
+                self.assertIn("unietaxi_peticiones_total 3", r.read().decode("utf-8"))
+        finally:
+            exp.detener()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+# tests/test_perfil_locks.py
+"""
+Valida el perfilado de locks:
+- Deshabilitado, el sistema usa threading.Lock sin instrumentar.
+- Habilitado, registra adquisiciones y sitios de llamada y produce un reporte.
+"""
+
+import threading
+import unittest
+from perfil_locks import LockInstrumentado, crear_lock
+from sistema_atencion import SistemaAtencion
+from cliente import Cliente
+from taxi import Taxi
+
+class TestPerfilLocks(unittest.TestCase):
+    def test_deshabilitado_es_lock_normal(self):
+        self.assertIsInstance(crear_lock("x", habilitado=False), type(threading.Lock()))
+        self.assertEqual(SistemaAtencion(perfilar_locks=False).reporte_locks(), "")
+
+    def test_reporte_con_sitios(self):
+        sistema = SistemaAtencion(perfilar_locks=True)
+        self.assertIsInstance(sistema.lock_viajes, LockInstrumentado)
+        c = Cliente(1, sistema, origen=(0.5, 0.5), destino=(0.6, 0.6))
+        Taxi(1, sistema, ubicacion_inicial=(0.51, 0.51))
+        sistema.recibir_solicitud(c)
+        sistema.procesar_solicitudes()
+        reporte = sistema.reporte_locks()
+        self.assertIn("[lock_taxis]", reporte)
+        self.assertIn("_registrar_viajes", reporte)
+        self.assertGreater(sistema.lock_viajes.espera.total, 0)
+        self.assertIn('unietaxi_lock_espera_segundos_count{lock="lock_viajes"}', sistema.metricas.exportar_prometheus())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+# tests/test_perfilado.py
+"""
+Valida el modo de perfilado:
+- Clasificación de pilas por subsistema.
+- Perfilado de hilos lanzados tras iniciar() y escritura de pstats y pilas colapsadas.
+- Con un único perfilador posible (Python 3.12+) los hilos corren igual y el muestreo los cubre.
+"""
+
+import cProfile
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+import perfilado
+from perfilado import Perfilador, clasificar_pila
+from sistema_atencion import SistemaAtencion
+from taxi import Taxi
+
+class TestPerfilado(unittest.TestCase):
+    def test_clasificar_pila(self):
+        pila = [("main.py", "main"), ("sistema_atencion.py", "asignar_viaje"), ("sistema_atencion.py", "persistir_viajes")]
+        self.assertEqual(clasificar_pila(pila), "persistencia")
+        self.assertEqual(clasificar_pila([("taxi.py", "patrullar")]), "movimiento")
+        for archivo in ("checkpoint.py", "formato_binario.py", "almacen_analitico.py"):
+            self.assertEqual(clasificar_pila([("sistema_atencion.py", "y"), (archivo, "z")]), "persistencia")
+        self.assertEqual(clasificar_pila([("x.py", "y")]), "otros")
+
+    def test_perfila_hilos_y_escribe_salida(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            perfilador = Perfilador(tmp, intervalo_muestreo=0.001).iniciar()
+            try:
+                sistema = SistemaAtencion()
+                taxi = Taxi(1, sistema, ubicacion_inicial=(0.5, 0.5))
+                hilo = threading.Thread(target=lambda: [taxi.patrullar() for _ in range(20000)], name="Taxi-1")
+                hilo.start()
+                hilo.join()
+            finally:
+                perfilador.detener()
+            self.assertTrue((Path(tmp) / "Taxi-1.pstats").exists())
+            self.assertTrue((Path(tmp) / "total.pstats").exists())
+            self.assertTrue((Path(tmp) / "stacks.collapsed").exists())
+            self.assertIn("muestras", (Path(tmp) / "subsistemas.txt").read_text(encoding="utf-8"))
+
+    def test_un_solo_perfilador_activo(self):
+        class PerfilUnico(cProfile.Profile):  # como cProfile sobre sys.monitoring (3.12+)
+            activos = 0
+
+            def enable(self, *args, **kwargs):
+                if PerfilUnico.activos:
+                    raise ValueError("Another profiling tool is already active")
+                PerfilUnico.activos += 1
+                super().enable(*args, **kwargs)
+
+        for por_hilo in (True, False):
+            PerfilUnico.activos = 0
+            hechos = []
+            with tempfile.TemporaryDirectory() as tmp, \
+                    mock.patch.object(perfilado.cProfile, "Profile", PerfilUnico), \
+                    mock.patch.object(perfilado, "PERFIL_POR_HILO", por_hilo):
+                perfilador = Perfilador(tmp, intervalo_muestreo=0.001).iniciar()
+                try:
+                    taxi = Taxi(1, SistemaAtencion(), ubicacion_inicial=(0.5, 0.5))
+                    hilo = threading.Thread(target=lambda: hechos.append([taxi.patrullar() for _ in range(20000)]),
+                                            name="Taxi-1")
+                    hilo.start()
+                    hilo.join()
+                finally:
+                    perfilador.detener()
+                self.assertEqual(len(hechos), 1)  # el hilo corrió aunque no pudo tener su Profile
+                self.assertFalse((Path(tmp) / "Taxi-1.pstats").exists())
+                self.assertTrue((Path(tmp) / "total.pstats").exists())
+                self.assertIn("Taxi;", (Path(tmp) / "stacks.collapsed").read_text(encoding="utf-8"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+# tests/test_planificador.py
+"""
+Valida el planificador de tareas:
+- Las expresiones cron calculan la próxima ejecución (listas, rangos, pasos, día del mes o de la semana).
+- Las ejecuciones perdidas por retraso se agrupan en una sola.
+- Tras un reinicio se recupera la ejecución perdida solo en tareas con recuperar=True.
+- Las tareas no se solapan, los errores se cuentan y el estado expone próxima ejecución y duración.
+- Guardar el estado desde varios hilos no choca en el archivo temporal y un fallo de disco queda
+  en error_estado sin escapar.
+"""
+
+import json
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+from planificador import Cron, Planificador
+from metricas import RegistroMetricas
+
+
+def ts(*args):
+    return datetime(*args).timestamp()
+
+
+def esperar_hasta(condicion, limite=2.0):
+    fin = time.monotonic() + limite
+    while not condicion() and time.monotonic() < fin:
+        time.sleep(0.01)
+    return condicion()
+
+
+class TestCron(unittest.TestCase):
+    def test_siguiente(self):
+        self.assertEqual(Cron("0 12 * * *").siguiente(ts(2026, 10, 19, 13, 0)), ts(2026, 10, 20, 12, 0))
+        self.assertEqual(Cron("0 12 * * *").siguiente(ts(2026, 10, 19, 11, 59, 30)), ts(2026, 10, 19, 12, 0))
+        self.assertEqual(Cron("1 0 1 * *").siguiente(ts(2026, 10, 19)), ts(2026, 11, 1, 0, 1))
+        self.assertEqual(Cron("1 0 1 * *").siguiente(ts(2026, 12, 5)), ts(2027, 1, 1, 0, 1))
+        # Viernes 23-10-2026 17:50 -> lunes 09:00
+        self.assertEqual(Cron("*/15 9-17 * * 1-5").siguiente(ts(2026, 10, 23, 17, 50)), ts(2026, 10, 26, 9, 0))
+        # Día 1 o domingo: el domingo 25-10 llega antes que el 1-11
+        self.assertEqual(Cron("0 0 1 * 0").siguiente(ts(2026, 10, 19)), ts(2026, 10, 25))
+        self.assertEqual(Cron("0 0 * * 7").siguiente(ts(2026, 10, 19)), ts(2026, 10, 25))
+
+    def test_invalida(self):
+        for expr in ("* * * *", "60 * * * *", "0 12 32 * *", "0 0 30 2 *"):
+            with self.assertRaises(ValueError):
+                Cron(expr).siguiente(ts(2026, 1, 1))
+
+
+class TestPlanificador(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.ruta = Path(self._tmp.name) / "planificador.json"
+        self.ahora = [ts(2026, 10, 19, 10, 0)]
+        self.planes = []
+
+    def tearDown(self):
+        for p in self.planes:
+            p.detener()
+        self._tmp.cleanup()
+
+    def nuevo(self, **kwargs):
+        p = Planificador(ruta_estado=self.ruta, reloj=lambda: self.ahora[0], **kwargs)
+        self.planes.append(p)
+        return p
+
+    def test_retraso_agrupa_ejecuciones(self):
+        llamadas = []
+        p = self.nuevo().agregar("cada_hora", lambda: llamadas.append(self.ahora[0]), "0 * * * *")
+        self.ahora[0] = ts(2026, 10, 19, 13, 30)  # proceso ocupado durante tres ejecuciones
+        p.iniciar()
+        self.assertTrue(esperar_hasta(lambda: p.estado()[0].ejecuciones == 1))
+        time.sleep(0.05)
+        self.assertEqual(len(llamadas), 1)
+        self.assertEqual(p.estado()[0].proxima, ts(2026, 10, 19, 14, 0))
+
+    def test_recupera_tras_reinicio(self):
+        p = self.nuevo().agregar("cierre", lambda: None, "0 12 * * *", recuperar=True).iniciar()
+        self.ahora[0] = ts(2026, 10, 19, 12, 0)
+        with p._cond:
+            p._cond.notify()
+        self.assertTrue(esperar_hasta(lambda: p.estado()[0].ejecuciones == 1))
+        p.detener()
+        self.assertIn("cierre", self.ruta.read_text(encoding="utf-8"))
+
+        self.ahora[0] = ts(2026, 10, 21, 9, 0)  # caído durante el cierre del día 20
+        reiniciado = self.nuevo()
+        reiniciado.agregar("cierre", lambda: None, "0 12 * * *", recuperar=True)
+        reiniciado.agregar("sin_recuperar", lambda: None, "0 12 * * *")
+        estados = {e.nombre: e for e in reiniciado.estado()}
+        self.assertEqual(estados["cierre"].proxima, self.ahora[0])
+        self.assertEqual(estados["cierre"].ultima, ts(2026, 10, 19, 12, 0))
+        self.assertEqual(estados["sin_recuperar"].proxima, ts(2026, 10, 21, 12, 0))
+
+    def test_sin_solapes_errores_y_estado(self):
+        en_curso, maximo, lock = [0], [0], threading.Lock()
+
+        def lenta():
+            with lock:
+                en_curso[0] += 1
+                maximo[0] = max(maximo[0], en_curso[0])
+            time.sleep(0.03)
+            with lock:
+                en_curso[0] -= 1
+
+        def falla():
+            raise RuntimeError("sin disco")
+
+        metricas = RegistroMetricas()
+        p = Planificador(ruta_estado=None, trabajadores=4, metricas=metricas)
+        self.planes.append(p)
+        p.agregar("lenta", lenta, 0.01).agregar("falla", falla, 0.01).iniciar()
+        self.assertTrue(esperar_hasta(lambda: all(e.ejecuciones >= 3 for e in p.estado())))
+        p.detener()
+        estados = {e.nombre: e for e in p.estado()}
+        self.assertEqual(maximo[0], 1)
+        self.assertGreaterEqual(estados["lenta"].duracion, 0.03)
+        self.assertEqual(estados["falla"].errores, estados["falla"].ejecuciones)
+        self.assertEqual(estados["falla"].ultimo_error, "RuntimeError: sin disco")
+        self.assertEqual(str(estados["lenta"].especificacion), "cada 0.01s")
+        self.assertIn('unietaxi_tarea_segundos_count{tarea="lenta"}', metricas.exportar_prometheus())
+
+    def test_guardar_estado_concurrente_y_fallido(self):
+        p = self.nuevo()
+        for k in range(4):
+            p.agregar(f"t{k}", lambda: None, 60)
+            p._tareas[f"t{k}"].ultima = self.ahora[0]
+        hilos = [threading.Thread(target=lambda: [p._guardar_estado() for _ in range(50)]) for _ in range(4)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        self.assertIsNone(p.error_estado)
+        self.assertEqual(len(json.loads(self.ruta.read_text(encoding="utf-8"))), 4)
+
+        self.ruta.unlink()
+        self.ruta.mkdir()  # el destino ya no se puede reemplazar
+        p._guardar_estado()
+        self.assertIsNotNone(p.error_estado)
+
+
+if __name__ == "__main__":
+    unittest.main()
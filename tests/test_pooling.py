@@ -0,0 +1,86 @@
+# tests/test_pooling.py
+"""
+Valida los viajes compartidos:
+- evaluar_insercion respeta capacidad y desvío máximo y elige la inserción más barata.
+- Con pooling, un cliente en el camino de un taxi ocupado se inserta en su ruta y ambos
+  pasajeros pagan con descuento.
+- En la simulación de hora punta, el pooling aumenta los viajes por taxi-hora.
+"""
+
+import unittest
+from cliente import Cliente
+from pooling import evaluar_insercion, RECOGER, DEJAR, DESCUENTO_COMPARTIDO
+from sistema_atencion import SistemaAtencion
+from taxi import Taxi
+from benchmarks.simulacion import simular
+
+
+class _C:
+    def __init__(self, id_cliente, origen, destino):
+        self.id_cliente = id_cliente
+        self.origen = origen
+        self.destino = destino
+
+
+class TestInsercion(unittest.TestCase):
+    def test_insercion_en_el_camino(self):
+        a = _C(1, (0.0, 0.0), (1.0, 0.0))
+        b = _C(2, (0.2, 0.0), (0.8, 0.0))
+        res = evaluar_insercion((0.0, 0.0), [(RECOGER, a), (DEJAR, a)], [], {}, b)
+        costo, paradas, hasta_recogida = res
+        self.assertAlmostEqual(costo, 0.0)
+        self.assertEqual(paradas, [(RECOGER, a), (RECOGER, b), (DEJAR, b), (DEJAR, a)])
+        self.assertAlmostEqual(hasta_recogida, 0.2)
+
+    def test_desvio_maximo(self):
+        a = _C(1, (0.0, 0.0), (0.5, 0.0))
+        lejos = _C(2, (0.25, 0.9), (0.3, 0.9))
+        self.assertIsNone(evaluar_insercion((0.0, 0.0), [(DEJAR, a)], [a], {1: 0.0}, lejos, max_recogida=0.5))
+
+    def test_capacidad(self):
+        a = _C(1, (0.0, 0.0), (1.0, 0.0))
+        b = _C(2, (0.1, 0.0), (0.9, 0.0))
+        c = _C(3, (0.2, 0.0), (0.8, 0.0))
+        ruta = [(DEJAR, b), (DEJAR, a)]
+        _, paradas, _ = evaluar_insercion((0.05, 0.0), ruta, [a, b], {}, c, capacidad=3)
+        self.assertEqual(paradas[0], (RECOGER, c))
+        _, paradas, _ = evaluar_insercion((0.05, 0.0), ruta, [a, b], {}, c, capacidad=2)
+        self.assertGreater(paradas.index((RECOGER, c)), 0)
+
+
+class TestPoolingSistema(unittest.TestCase):
+    def test_cliente_en_ruta_comparte_taxi(self):
+        sistema = SistemaAtencion()
+        sistema.pooling = True
+        taxi = Taxi(1, sistema, ubicacion_inicial=(0.0, 0.0))
+        sistema.registrar_taxi_disponible(taxi)
+        a = Cliente(1, sistema, (0.0, 0.0), (1.0, 0.0))
+        b = Cliente(2, sistema, (0.2, 0.0), (0.8, 0.0))
+        asignados, _ = sistema.asignar_lote([a])
+        self.assertEqual(asignados[0][1], taxi)
+        costo_a = sistema.viajes[0]["costo_estimado"]
+        asignados, sin_taxi = sistema.asignar_lote([b])
+        self.assertEqual((asignados[0][1], sin_taxi), (taxi, []))
+        self.assertEqual([p[1].id_cliente for p in taxi.paradas], [1, 2, 2, 1])
+        va, vb = sistema.viajes
+        self.assertTrue(va["compartido"] and vb["compartido"])
+        self.assertAlmostEqual(va["costo_estimado"], round(costo_a * (1 - DESCUENTO_COMPARTIDO), 2))
+
+        for _ in range(400):
+            if not taxi.paradas:
+                break
+            taxi.avanzar()
+        self.assertEqual([v["estado"] for v in sistema.viajes], ["finalizado", "finalizado"])
+        self.assertFalse(taxi.ocupado)
+        self.assertIn(taxi, sistema.taxis_disponibles)
+
+
+class TestSimulacionPooling(unittest.TestCase):
+    def test_pooling_aumenta_viajes_por_taxi_hora(self):
+        individual = simular(rebalanceo=True, pooling=False, taxis=6, ticks=300, solicitudes_por_tick=1.0)
+        compartido = simular(rebalanceo=True, pooling=True, taxis=6, ticks=300, solicitudes_por_tick=1.0)
+        self.assertGreater(compartido["viajes_taxi_hora"], 1.3 * individual["viajes_taxi_hora"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+# tests/test_servidor.py
+"""
+Valida el servidor de solicitudes por red:
+- Una solicitud se acepta y el evento de asignación llega por la misma conexión.
+- Una solicitud sin taxis cercanos se puede cancelar y no se asigna después.
+- Un cliente_id propio de los clientes simulados se rechaza; los automáticos saltan los ocupados.
+"""
+
+import asyncio
+import json
+import unittest
+from sistema_atencion import SistemaAtencion
+from servidor import PRIMER_CLIENTE_REMOTO, ServidorSolicitudes
+from taxi import Taxi
+
+class TestServidor(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.sistema = SistemaAtencion()
+        self.servidor = await ServidorSolicitudes(self.sistema, puerto=0, intervalo_despacho=0.01).iniciar()
+        self.reader, self.writer = await asyncio.open_connection("127.0.0.1", self.servidor.puerto)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        await self.servidor.detener()
+
+    async def enviar(self, msg):
+        self.writer.write(json.dumps(msg).encode() + b"\n")
+        await self.writer.drain()
+        return json.loads(await asyncio.wait_for(self.reader.readline(), 5))
+
+    async def test_solicitud_y_evento_asignado(self):
+        Taxi(1, self.sistema, ubicacion_inicial=(0.5, 0.55))
+        ack = await self.enviar({"op": "solicitar", "origen": [0.5, 0.5], "destino": [0.9, 0.9], "ref": "a"})
+        self.assertTrue(ack["ok"])
+        self.assertEqual(ack["ref"], "a")
+        evento = json.loads(await asyncio.wait_for(self.reader.readline(), 5))
+        self.assertEqual(evento["evento"], "asignado")
+        self.assertEqual((evento["cliente_id"], evento["taxi_id"]), (ack["cliente_id"], 1))
+
+    async def test_cancelar(self):
+        cid = PRIMER_CLIENTE_REMOTO + 42
+        ack = await self.enviar({"op": "solicitar", "cliente_id": cid, "origen": [0.1, 0.1], "destino": [0.2, 0.2]})
+        self.assertTrue(ack["ok"])
+        respuesta = await self.enviar({"op": "cancelar", "cliente_id": cid})
+        self.assertTrue(respuesta["ok"])
+        Taxi(1, self.sistema, ubicacion_inicial=(0.1, 0.12))
+        await asyncio.sleep(0.1)
+        self.assertEqual(len(self.sistema.viajes), 0)
+        self.assertFalse((await self.enviar({"op": "cancelar", "cliente_id": cid}))["ok"])
+        self.assertFalse((await self.enviar({"op": "desconocida"}))["ok"])
+
+    async def test_cliente_id_remoto(self):
+        simulado = await self.enviar({"op": "solicitar", "cliente_id": 1, "origen": [0.1, 0.1], "destino": [0.2, 0.2]})
+        self.assertFalse(simulado["ok"])
+        self.assertNotIn(1, self.servidor._clientes)
+        propio = await self.enviar({"op": "solicitar", "cliente_id": PRIMER_CLIENTE_REMOTO,
+                                    "origen": [0.1, 0.1], "destino": [0.2, 0.2]})
+        self.assertTrue(propio["ok"])
+        automatico = await self.enviar({"op": "solicitar", "origen": [0.1, 0.1], "destino": [0.2, 0.2]})
+        self.assertTrue(automatico["ok"])
+        self.assertEqual(automatico["cliente_id"], PRIMER_CLIENTE_REMOTO + 1)
+
+if __name__ == "__main__":
+    unittest.main()
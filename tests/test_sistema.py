@@ -32,5 +32,72 @@ class TestSistema(unittest.TestCase):
         sistema.cierre_contable()  # No debe fallar aunque haya viajes activos
         self.assertTrue(True)
 
+    def test_versiones_y_id_de_viaje(self):
+        sistema = SistemaAtencion()
+        c = Cliente(4, sistema, origen=(0.4, 0.4), destino=(0.6, 0.6))
+        Taxi(4, sistema, ubicacion_inicial=(0.41, 0.41))
+        v0 = sistema.version_viajes
+        sistema.recibir_solicitud(c)
+        sistema.procesar_solicitudes()
+        self.assertGreater(sistema.version_viajes, v0)
+        self.assertEqual(sistema.listar_viajes_activos()[0]["id"], 1)
+
+    def test_lote_reclama_cada_taxi_una_vez(self):
+        sistema = SistemaAtencion()
+        clientes = [Cliente(10 + i, sistema, origen=(0.3, 0.3), destino=(0.6, 0.6)) for i in range(3)]
+        Taxi(10, sistema, ubicacion_inicial=(0.31, 0.31))
+        Taxi(11, sistema, ubicacion_inicial=(0.35, 0.35))
+        sistema.recibir_solicitudes_lote(clientes)
+        sistema.procesar_solicitudes()
+        self.assertEqual([v["taxi_id"] for v in sistema.viajes], [10, 11])
+        self.assertEqual(sistema.taxis_disponibles, [])
+        self.assertEqual(sistema.num_solicitudes(), 1)
+
+    def test_encadena_taxi_a_punto_de_terminar(self):
+        sistema = SistemaAtencion()
+        a = Taxi(20, sistema, ubicacion_inicial=(0.5, 0.5))
+        c1 = Cliente(20, sistema, origen=(0.5, 0.5), destino=(0.7, 0.5))
+        sistema.asignar_lote([c1])
+        for _ in range(16):
+            a.avanzar()
+        b = Taxi(21, sistema, ubicacion_inicial=(0.72, 0.68))  # libre, pero más lejos que la bajada de c1
+        c2 = Cliente(21, sistema, origen=(0.72, 0.5), destino=(0.9, 0.5))
+        sistema.recibir_solicitud(c2)
+        sistema.procesar_solicitudes()
+        self.assertEqual(sistema.viajes[1]["taxi_id"], 20)
+        self.assertTrue(sistema.viajes[1]["encadenado"])
+        self.assertLess(sistema.viajes[1]["eta_pickup"], 0.5)
+        self.assertFalse(b.ocupado)
+
+        while sistema.viajes[0]["estado"] == "activo":
+            a.avanzar()
+        # Sigue ocupado y sale directo a recoger a c2
+        self.assertTrue(a.ocupado)
+        self.assertIs(a.cliente_actual, c2)
+        self.assertNotIn(a, sistema.taxis_disponibles)
+        while a.paradas:
+            a.avanzar()
+        self.assertEqual(sistema.viajes[1]["estado"], "finalizado")
+        self.assertIn(a, sistema.taxis_disponibles)
+
+    def test_cancelacion_durante_el_emparejamiento(self):
+        sistema = SistemaAtencion()
+        c = Cliente(30, sistema, origen=(0.5, 0.5), destino=(0.6, 0.6))
+        t = Taxi(30, sistema, ubicacion_inicial=(0.51, 0.51))
+        sistema.recibir_solicitud(c)
+        # Otro hilo ya vació la cola y está emparejando cuando llega la cancelación
+        pares, _ = sistema._emparejar_lote(sistema._vaciar_cola())
+        self.assertTrue(sistema.cancelar_solicitud(c))
+        self.assertEqual(sistema._registrar_viajes(pares), [None])
+        self.assertEqual(len(sistema.viajes), 0)
+        self.assertFalse(t.ocupado)
+        self.assertIn(t, sistema.taxis_disponibles)
+        # La siguiente solicitud del mismo cliente se atiende con normalidad
+        sistema.recibir_solicitud(c)
+        sistema.procesar_solicitudes()
+        self.assertEqual([v["cliente_id"] for v in sistema.viajes], [30])
+        self.assertEqual(sistema.viajes[0]["id"], 1)
+        self.assertFalse(sistema.cancelar_solicitud(c))
+
 if __name__ == "__main__":
     unittest.main()
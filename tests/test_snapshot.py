@@ -0,0 +1,83 @@
+# tests/test_snapshot.py
+"""
+Valida los snapshots inmutables del sistema:
+- Reflejan taxis/viajes y no se pueden modificar.
+- Sin cambios de versión, se reutilizan las partes del snapshot anterior.
+- Se exportan a JSON.
+- La calidad por taxi y por cliente sale de las sumas acumuladas al finalizar: coincide con
+  recorrer los viajes, y el histórico restaurado se recorre una sola vez.
+"""
+
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import formato_binario
+from almacen_viajes import ColumnasViajes, codificar_viajes
+from benchmarks.bench_core import viajes_sinteticos
+from sistema_atencion import SistemaAtencion
+from cliente import Cliente
+from taxi import Taxi
+from snapshot import exportar_snapshot
+
+class TestSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.sistema = SistemaAtencion()
+        self.cliente = Cliente(1, self.sistema, origen=(0.5, 0.5), destino=(0.6, 0.6))
+        self.taxi = Taxi(1, self.sistema, ubicacion_inicial=(0.51, 0.51))
+        self.sistema.registrar_entidades([self.taxi], [self.cliente])
+        self.sistema.recibir_solicitud(self.cliente)
+        self.sistema.procesar_solicitudes()
+
+    def test_snapshot_inmutable(self):
+        snap = self.sistema.publicar_snapshot()
+        self.assertEqual(len(snap.viajes_activos), 1)
+        self.assertTrue(snap.taxis[0].ocupado)
+        self.assertIn(1, snap.viaje_por_cliente)
+        with self.assertRaises(TypeError):
+            snap.viajes_activos[0]["estado"] = "finalizado"
+        with self.assertRaises(AttributeError):
+            snap.taxis[0].ocupado = False
+
+    def test_copy_on_write(self):
+        s1 = self.sistema.publicar_snapshot()
+        s2 = self.sistema.publicar_snapshot()
+        self.assertGreater(s2.version, s1.version)
+        self.assertIs(s1.viajes_activos, s2.viajes_activos)
+        self.assertIs(s1.calidad_por_taxi, s2.calidad_por_taxi)
+
+    def test_exportar(self):
+        snap = self.sistema.publicar_snapshot()
+        with tempfile.TemporaryDirectory() as tmp:
+            ruta = Path(tmp) / "snap.json"
+            exportar_snapshot(snap, ruta)
+            data = json.loads(ruta.read_text(encoding="utf-8"))
+        self.assertEqual(data["viajes_activos"][0]["cliente_id"], 1)
+
+    def test_calidad_sin_recorrer_viajes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            formato_binario.escribir(Path(tmp) / "viajes.bin", codificar_viajes(viajes_sinteticos(500)))
+            self.assertTrue(self.sistema.restaurar_viajes(Path(tmp) / "viajes.bin"))
+        with mock.patch.object(ColumnasViajes, "sumas_calificaciones", autospec=True,
+                               side_effect=ColumnasViajes.sumas_calificaciones) as sumas:
+            self.sistema.publicar_snapshot()
+            self.assertEqual(sumas.call_count, 2)  # histórico: una vez por campo
+            for k in range(5):
+                c = Cliente(10 + k, self.sistema, origen=(0.1 * k, 0.5), destino=(0.1 * k, 0.6))
+                t = Taxi(10 + k, self.sistema, ubicacion_inicial=(0.1 * k, 0.51))
+                self.sistema.asignar_viaje(c, t)
+                self.sistema.finalizar_viaje(t, c, 3.0 + k * 0.5)
+                snap = self.sistema.publicar_snapshot()
+            self.assertEqual(sumas.call_count, 2)
+        todos = self.sistema.historico.copiar()
+        todos.extender(self.sistema.viajes)
+        for campo, calidad in (("taxi_id", snap.calidad_por_taxi), ("cliente_id", snap.calidad_por_cliente)):
+            esperado = todos.agregacion_calificaciones(campo)
+            self.assertEqual(calidad.keys(), esperado.keys())
+            for k, (prom, n) in esperado.items():
+                self.assertAlmostEqual(calidad[k][0], prom)
+                self.assertEqual(calidad[k][1], n)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+# tests/test_tarifas.py
+"""
+Valida el motor de tarifas:
+- La cotización individual coincide con la tarifa simple y el lote con la individual.
+- Las tablas zona a zona dan la tarifa entre centros de zona.
+- El viaje se cotiza una vez al asignar y la finalización cobra lo cotizado.
+"""
+
+import unittest
+from tarifas import MotorTarifas, eta_restante
+from utils import calcular_costo_viaje
+from sistema_atencion import SistemaAtencion
+from cliente import Cliente
+from taxi import Taxi
+
+class TestTarifas(unittest.TestCase):
+    def test_cotizacion_individual_y_lote(self):
+        motor = MotorTarifas()
+        origenes = [(0.1, 0.1), (0.5, 0.2), (0.9, 0.9)]
+        destinos = [(0.4, 0.5), (0.5, 0.8), (0.1, 0.3)]
+        costos, duraciones = motor.cotizar(origenes, destinos)
+        for i, (o, d) in enumerate(zip(origenes, destinos)):
+            c = motor.cotizar_viaje(o, d)
+            self.assertAlmostEqual(c.costo, calcular_costo_viaje(o, d))
+            self.assertAlmostEqual(float(costos[i]), c.costo)
+            self.assertAlmostEqual(float(duraciones[i]), c.duracion)
+
+    def test_tabla_zonas(self):
+        motor = MotorTarifas(zonas=4)
+        # Ambos puntos caen en zonas cuyos centros distan 0.5 en x
+        c = motor.cotizar_viaje((0.1, 0.1), (0.6, 0.2))
+        self.assertAlmostEqual(c.costo, 8.0)
+        costos, _ = motor.cotizar([(0.1, 0.1)], [(0.6, 0.2)])
+        self.assertAlmostEqual(float(costos[0]), 8.0)
+
+    def test_cotizacion_unica_por_viaje(self):
+        sistema = SistemaAtencion()
+        cliente = Cliente(1, sistema, origen=(0.5, 0.5), destino=(0.8, 0.9))
+        taxi = Taxi(1, sistema, ubicacion_inicial=(0.5, 0.6))
+        sistema.recibir_solicitud(cliente)
+        sistema.procesar_solicitudes()
+        viaje = sistema.viajes[0]
+        self.assertAlmostEqual(viaje["costo_estimado"], 8.0)
+        self.assertAlmostEqual(eta_restante(viaje), viaje["duracion_estimada"])
+        viaje["costo_estimado"] = 9.99  # la finalización cobra lo cotizado, no recalcula
+        sistema.finalizar_viaje(taxi, cliente, 5.0)
+        self.assertEqual(sistema.libro.totales(), (200, {1: 799}))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,14 +3,14 @@
 Utilidades del sistema:
 - Distancias euclidianas, movimiento incremental, costo de viaje, ETA aproximada.
 - Conversión de coordenadas a canvas (mapa normalizado).
-- Generación de entidades iniciales respetando afiliación (solo admitidos).
-- Inicialización de archivos JSON si están vacíos (data/*).
+- Generación de entidades iniciales respetando afiliación (muestreo sin reemplazo de admitidos, alta en lote).
 """
 
 import math
 import random
 import json
 from pathlib import Path
+from tarifas import tarifa, eta_recogida
 
 DATA_DIR = Path("data")
 
@@ -37,15 +37,12 @@ def mover_hacia(origen, destino, paso=0.01):
     return (nx, ny)
 
 def calcular_costo_viaje(origen, destino):
-    """Tarifa simple: base fija + distancia * factor."""
-    dist = distancia_euclidiana(origen, destino)
-    base = 3.0
-    factor = 10.0
-    return round(base + dist * factor, 2)
+    """Tarifa simple: base fija + distancia * factor (ver tarifas.py)."""
+    return tarifa(distancia_euclidiana(origen, destino))
 
-def rnd_coord():
-    """Genera coordenadas aleatorias dentro de un margen del mapa."""
-    return (round(random.uniform(0.05, 0.95), 3), round(random.uniform(0.05, 0.95), 3))
+def rnd_coord(rnd=random.random):
+    """Genera coordenadas aleatorias dentro de un margen del mapa (0.05..0.95, 3 decimales)."""
+    return (int(rnd() * 901 + 50) / 1000, int(rnd() * 901 + 50) / 1000)
 
 def to_canvas_coords(x, y, width, height, pad):
     """Convierte coordenadas normalizadas (0..1) a píxeles del canvas."""
@@ -55,91 +52,86 @@ def to_canvas_coords(x, y, width, height, pad):
 
 def to_eta(origen, destino, velocidad=0.2):
     """ETA aproximado (segundos) usando distancia/velocidad."""
-    dist = distancia_euclidiana(origen, destino)
-    return dist / max(1e-6, velocidad)
+    return eta_recogida(distancia_euclidiana(origen, destino), velocidad)
 
-def ensure_data_files():
+def cargar_registros_afiliacion(fname):
+    """Lee una sola vez un archivo de afiliación (data/<fname>); lista vacía si falta o es inválido."""
+    try:
+        with open(DATA_DIR / fname, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+            return json.loads(content) if content else []
+    except Exception:
+        return []
+
+def muestrear_registros(registros, n, solo_admitidos=False):
     """
-    Crea archivos JSON con contenido válido si están ausentes o vacíos.
-    Evita errores de JSONDecode al iniciar el sistema.
+    Devuelve exactamente n elementos: registros de afiliación distintos y, si no hay n registros
+    válidos, None (entidad sin afiliación, como cuando no hay registros) para completar.
+    El filtro de admitidos se aplica una sola vez antes de muestrear, sin reemplazo: nunca una
+    placa o conductor repetido.
     """
-    DATA_DIR.mkdir(exist_ok=True)
-    defaults = {
-        "clientes.json": [],
-        "taxis.json": [],
-        "viajes.json": [],
-        "contabilidad.json": {"ganancias_por_taxi": {}, "ganancia_empresa": 0.0, "ts": 0}
-    }
-    for fname, default in defaults.items():
-        fpath = DATA_DIR / fname
-        if not fpath.exists() or fpath.stat().st_size == 0:
-            with open(fpath, "w", encoding="utf-8") as f:
-                json.dump(default, f)
+    if not registros:
+        return [None] * n
+    pool = [r for r in registros if r.get("estado") == "admitido"] if solo_admitidos else list(registros)
+    muestra = random.sample(pool, min(n, len(pool)))
+    return muestra + [None] * (n - len(muestra))
 
-def generar_taxis_iniciales(num_taxis, sistema, solo_admitidos=False):
+def _libre(plantilla, i, usados):
+    """Primer plantilla.format(j), j >= i, que no esté en 'usados' (y lo reserva)."""
+    while plantilla.format(i) in usados:
+        i += 1
+    valor = plantilla.format(i)
+    usados.add(valor)
+    return valor
+
+def generar_taxis_iniciales(num_taxis, sistema, solo_admitidos=False, registros=None):
     """
-    Genera taxis iniciales apoyándose en data/taxis.json para respetar estados de afiliación.
-    Si solo_admitidos=True, descarta registros rechazados.
+    Genera num_taxis taxis apoyándose en data/taxis.json (o en 'registros' ya cargados)
+    para respetar estados de afiliación, uno por registro; si no alcanzan, el resto sin
+    afiliación. Si solo_admitidos=True, descarta registros rechazados. Los taxis admitidos se registran como disponibles en un único lote.
     """
     from taxi import Taxi
-    taxis_aff = []
-    try:
-        with open(DATA_DIR / "taxis.json", "r", encoding="utf-8") as f:
-            taxis_aff = json.load(f)
-    except Exception:
-        taxis_aff = []
-
+    if registros is None:
+        registros = cargar_registros_afiliacion("taxis.json")
+    rnd = random.random
     taxis = []
-    count = 0
-    for _ in range(1000):  # margen amplio para encontrar suficientes admitidos
-        if count >= num_taxis:
-            break
-        ubic = rnd_coord()
-        calif = round(random.uniform(4.0, 5.0), 2)
-        admitido = True
-        nombre = None
-        placa = None
-        if taxis_aff:
-            rec = random.choice(taxis_aff)
+    muestra = muestrear_registros(registros, num_taxis, solo_admitidos)
+    placas = {rec.get("placa") for rec in muestra if rec is not None}
+    conductores = {rec.get("conductor") for rec in muestra if rec is not None}
+    for i, rec in enumerate(muestra):
+        ubic = rnd_coord(rnd)
+        calif = int(rnd() * 101 + 400) / 100
+        if rec is None:  # sin afiliación: placa y conductor que no repitan los de los registros
+            admitido, nombre, placa = True, _libre("Conductor-{}", i, conductores), _libre("UNI-{:03d}", i, placas)
+        else:
             admitido = (rec.get("estado") == "admitido")
             nombre = rec.get("conductor")
             placa = rec.get("placa")
-        if solo_admitidos and not admitido:
-            continue
-        taxis.append(Taxi(count, sistema, ubicacion_inicial=ubic, calificacion=calif, nombre_conductor=nombre, placa=placa, admitido=admitido))
-        count += 1
+        taxis.append(Taxi(i, sistema, ubicacion_inicial=ubic, calificacion=calif, nombre_conductor=nombre, placa=placa, admitido=admitido, registrar=False))
+    sistema.registrar_taxis_disponibles(taxis)
     return taxis
 
-def generar_clientes_iniciales(num_clientes, sistema, solo_admitidos=False):
+def generar_clientes_iniciales(num_clientes, sistema, solo_admitidos=False, registros=None):
     """
-    Genera clientes iniciales apoyándose en data/clientes.json para respetar estados de afiliación.
-    Si solo_admitidos=True, descarta registros rechazados.
+    Genera num_clientes clientes apoyándose en data/clientes.json (o en 'registros'
+    ya cargados) para respetar estados de afiliación, uno por registro; si no alcanzan, el resto
+    sin afiliación. Si solo_admitidos=True, descarta registros rechazados.
     """
     from cliente import Cliente
-    clientes_aff = []
-    try:
-        with open(DATA_DIR / "clientes.json", "r", encoding="utf-8") as f:
-            clientes_aff = json.load(f)
-    except Exception:
-        clientes_aff = []
-
+    if registros is None:
+        registros = cargar_registros_afiliacion("clientes.json")
+    rnd = random.random
     clientes = []
-    count = 0
-    for _ in range(1000):
-        if count >= num_clientes:
-            break
-        orig = rnd_coord()
-        dest = rnd_coord()
-        admitido = True
-        nombre = None
-        tarjeta = "4111-xxxx-0000"
-        if clientes_aff:
-            rec = random.choice(clientes_aff)
+    muestra = muestrear_registros(registros, num_clientes, solo_admitidos)
+    nombres = {rec.get("nombre") for rec in muestra if rec is not None}
+    for i, rec in enumerate(muestra):
+        orig = rnd_coord(rnd)
+        dest = rnd_coord(rnd)
+        if rec is None:
+            admitido, nombre, tarjeta = True, _libre("Cliente-{}", i, nombres), "4111-xxxx-0000"
+        else:
             admitido = (rec.get("estado") == "admitido")
             nombre = rec.get("nombre")
-            tarjeta = rec.get("tarjeta", tarjeta)
-        if solo_admitidos and not admitido:
-            continue
-        clientes.append(Cliente(count, sistema, origen=orig, destino=dest, nombre=nombre, tarjeta=tarjeta, admitido=admitido))
-        count += 1
+            tarjeta = rec.get("tarjeta", "4111-xxxx-0000")
+        clientes.append(Cliente(i, sistema, origen=orig, destino=dest, nombre=nombre, tarjeta=tarjeta, admitido=admitido))
     return clientes